@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Dict, Generic, List
+from typing import Callable, Dict, Generic, List, Optional
 from problem import HeuristicFunction, Problem, S, A, Solution
 
 # This is an abstract class for all goal based agents
@@ -21,18 +21,29 @@ class HumanAgent(GoalBasedAgent[S, A]):
     def act(self, problem: Problem[S, A], state: S) -> A:
         return self.user_input_fn(problem, state)
 
+# The search agents can optionally share their solutions through a persistent solution cache (see solution_cache.py)
+# "cache_name" identifies the search (e.g. the algorithm and the heuristic) since different searches may find different solutions
+# If there is no solution cache, the agent searches every time it meets a state that is not in its policy
+# "complete" is False if the search may fail to find an existing solution (see SolutionCache.search)
+def cached_search(solution_cache, cache_name: str, problem: Problem[S, A], state: S, search: Callable[[], Solution], complete: bool = True) -> Solution:
+    if solution_cache is None:
+        return search()
+    return solution_cache.search(cache_name, problem, state, search, complete)
+
 # This agent applies an uninformed search algorithm to find the solution to goal for the given state
 class UninformedSearchAgent(GoalBasedAgent[S, A]):
-    def __init__(self, search_fn: Callable[[Problem[S, A], S], Solution]) -> None:
+    def __init__(self, search_fn: Callable[[Problem[S, A], S], Solution], solution_cache = None, cache_name: Optional[str] = None) -> None:
         super().__init__()
         self.search_fn = search_fn
+        self.solution_cache = solution_cache
+        self.cache_name = cache_name or getattr(search_fn, "__name__", "search")
         # The policy will store the action to do for each state so as not to search again after each observation
         self.policy: Dict[S, A] = {}
     
     def act(self, problem: Problem[S, A], state: S) -> A:
         # This state is not stored in the policy, we need to search for a solution 
         if state not in self.policy:
-            solution = self.search_fn(problem, state)
+            solution = cached_search(self.solution_cache, self.cache_name, problem, state, lambda: self.search_fn(problem, state))
             # if no solution was found, we return None
             if solution is None:
                 self.policy[state] = None
@@ -45,18 +56,26 @@ class UninformedSearchAgent(GoalBasedAgent[S, A]):
         return self.policy.get(state)
 
 # This agent applies an informed search algorithm to find the solution to goal for the given state
+# If a time budget (in seconds) is given, it is passed to the search function as the keyword argument "time_budget",
+# so the search function must be an anytime search (e.g. AnytimeRepairingAStar or BeamSearch) which returns the best solution found in time
 class InformedSearchAgent(GoalBasedAgent[S, A]):
-    def __init__(self, search_fn: Callable[[Problem[S, A], S, HeuristicFunction], Solution], heuristic: HeuristicFunction) -> None:
+    def __init__(self, search_fn: Callable[[Problem[S, A], S, HeuristicFunction], Solution], heuristic: HeuristicFunction,
+                 solution_cache = None, cache_name: Optional[str] = None, time_budget: Optional[float] = None) -> None:
         super().__init__()
         self.search_fn = search_fn
         self.heuristic = heuristic
+        self.solution_cache = solution_cache
+        self.time_budget = time_budget
+        self.cache_name = cache_name or getattr(search_fn, "__name__", "search") + ":" + getattr(heuristic, "__name__", "heuristic")
         # The policy will store the action to do for each state so as not to search again after each observation
         self.policy: Dict[S, A] = {}
     
     def act(self, problem: Problem[S, A], state: S) -> A:
         # This state is not stored in the policy, we need to search for a solution 
         if state not in self.policy:
-            solution = self.search_fn(problem, state, self.heuristic)
+            # A search with a time budget may stop before finding a solution
+            solution = cached_search(self.solution_cache, self.cache_name, problem, state, lambda: self.search(problem, state),
+                                     complete=self.time_budget is None)
             # if no solution was found, we return None
             if solution is None:
                 self.policy[state] = None
@@ -66,4 +85,9 @@ class InformedSearchAgent(GoalBasedAgent[S, A]):
             for action in solution:
                 self.policy[current] = action
                 current = problem.get_successor(current, action)
-        return self.policy.get(state)
\ No newline at end of file
+        return self.policy.get(state)
+
+    def search(self, problem: Problem[S, A], state: S) -> Solution:
+        if self.time_budget is None:
+            return self.search_fn(problem, state, self.heuristic)
+        return self.search_fn(problem, state, self.heuristic, time_budget=self.time_budget)
\ No newline at end of file
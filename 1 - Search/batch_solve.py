@@ -0,0 +1,161 @@
+from typing import Any, Dict, Iterable, List, Optional
+from search_benchmark import load_problem, run_benchmark
+from search_stats import SearchStats
+import argparse, glob, json, multiprocessing, signal, sys, time
+
+# The limits use the resource and signal modules which are only available on Unix
+# On other platforms, the files are still solved but the limits are ignored and the peak memory is not reported
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# This script solves many sokoban levels and parking lots on a pool of worker processes
+# and writes one JSON object per file (JSON lines) as soon as the file is solved, for example:
+#   python batch_solve.py "levels/*.txt" "parks/*.txt" -a astar -hf strong -t 60 -m 2048 -o results.jsonl
+# Every file is solved in a fresh worker process, so the memory limit and the peak memory are measured per file.
+
+# The search functions that can be selected by name
+# The functions are looked up in the worker process, so only their names are sent to the workers
+def get_search_function(name: str):
+    import search
+    return {
+        "bfs": search.BreadthFirstSearch,
+        "dfs": search.DepthFirstSearch,
+        "ucs": search.UniformCostSearch,
+        "astar": search.AStarSearch,
+        "gbfs": search.BestFirstSearch,
+        "arastar": search.AnytimeRepairingAStar,
+        "beam": search.BeamSearch,
+    }[name]
+
+# The anytime search functions stop by themselves before the time limit and return the best solution found so far
+# They get this fraction of the time limit so that they finish before the worker is interrupted
+ANYTIME_ALGORITHMS = ("arastar", "beam")
+ANYTIME_BUDGET_FRACTION = 0.9
+
+def zero_heuristic(problem, state) -> float:
+    return 0
+
+# For the parking lots, the weak heuristic is the sum of the car distances and the strong one uses pattern databases
+def get_heuristic(name: str, is_sokoban: bool):
+    if name == "zero":
+        return zero_heuristic
+    if is_sokoban:
+        from sokoban_heuristic import weak_heuristic, strong_heuristic
+        return {"weak": weak_heuristic, "strong": strong_heuristic}[name]
+    from parking_heuristic import car_distance_heuristic, pattern_database_heuristic
+    return {"weak": car_distance_heuristic, "strong": pattern_database_heuristic}[name]
+
+class TimeLimitExceeded(Exception):
+    pass
+
+def raise_time_limit(signum, frame):
+    raise TimeLimitExceeded()
+
+# Return the peak memory of the current process in kilobytes (None if it can not be measured)
+def get_peak_memory() -> Optional[int]:
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+# Solve a single file in a worker process and return its result as a dictionary
+# status is one of "solved", "unsolvable", "no_solution", "timeout", "memory" or "error"
+# The anytime searches are not complete (the time budget may run out and beam search may drop every path to a goal),
+# so when they return no solution, the status is "timeout" if their time budget ran out and "no_solution" otherwise, never "unsolvable".
+def solve_file(path: str, algorithm: str, heuristic: str, time_limit: Optional[float], memory_limit: Optional[int]) -> Dict[str, Any]:
+    result = {"path": path, "algorithm": algorithm, "status": "error", "cost": None, "length": None, "expanded": None}
+    start = time.perf_counter()
+    try:
+        if resource is not None and memory_limit:
+            limit = memory_limit * 1024 * 1024
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        if hasattr(signal, "setitimer") and time_limit:
+            signal.signal(signal.SIGALRM, raise_time_limit)
+            signal.setitimer(signal.ITIMER_REAL, time_limit)
+        problem = load_problem(path)
+        is_sokoban = hasattr(problem, "layout")
+        search_fn = get_search_function(algorithm)
+        if algorithm in ("astar", "gbfs"):
+            informed_fn, heuristic_fn = search_fn, get_heuristic(heuristic, is_sokoban)
+            search_fn = lambda problem, state: informed_fn(problem, state, heuristic_fn)
+        elif algorithm in ANYTIME_ALGORITHMS:
+            # An anytime search records how far its solution can be from the optimal one in its statistics (infinite if it found none)
+            anytime_fn, heuristic_fn, stats = search_fn, get_heuristic(heuristic, is_sokoban), SearchStats()
+            time_budget = time_limit * ANYTIME_BUDGET_FRACTION if time_limit else None
+            search_fn = lambda problem, state: anytime_fn(problem, state, heuristic_fn, time_budget=time_budget, stats=stats)
+        solution, expanded, elapsed = run_benchmark(problem, search_fn)
+        result["expanded"] = expanded
+        if algorithm in ANYTIME_ALGORITHMS:
+            result["bound"] = stats.bound
+        if solution is None and algorithm in ANYTIME_ALGORITHMS:
+            result["status"] = "timeout" if time_budget is not None and elapsed >= time_budget else "no_solution"
+        elif solution is None:
+            result["status"] = "unsolvable"
+        else:
+            # The cost is computed by applying the solution from the initial state
+            cost, state = 0, problem.get_initial_state()
+            for action in solution:
+                cost += problem.get_cost(state, action)
+                state = problem.get_successor(state, action)
+            result.update(status="solved", cost=cost, length=len(solution))
+    except TimeLimitExceeded:
+        result["status"] = "timeout"
+    except MemoryError:
+        result["status"] = "memory"
+    except Exception as error:
+        result["error"] = f"{type(error).__name__}: {error}"
+    finally:
+        if hasattr(signal, "setitimer") and time_limit:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    result["wall_time"] = time.perf_counter() - start
+    result["peak_memory_kb"] = get_peak_memory()
+    return result
+
+# The pool calls this function with a single argument, so the arguments of solve_file are packed into a tuple
+def solve_task(task: tuple) -> Dict[str, Any]:
+    return solve_file(*task)
+
+# Solve the files on a pool of worker processes and yield the results in the order in which they are finished
+def solve_files(paths: List[str], algorithm: str, heuristic: str, time_limit: Optional[float] = None,
+                memory_limit: Optional[int] = None, workers: Optional[int] = None) -> Iterable[Dict[str, Any]]:
+    tasks = [(path, algorithm, heuristic, time_limit, memory_limit) for path in paths]
+    # maxtasksperchild=1 gives every file a fresh process, so the limits and the peak memory do not leak between files
+    with multiprocessing.Pool(workers, maxtasksperchild=1) as pool:
+        yield from pool.imap_unordered(solve_task, tasks)
+
+def main(args: argparse.Namespace):
+    paths: List[str] = sorted({path for pattern in args.files for path in glob.glob(pattern)})
+    output = open(args.output, 'w') if args.output else sys.stdout
+    try:
+        for result in solve_files(paths, args.algorithm, args.heuristic, args.time_limit, args.memory_limit, args.workers):
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Solve many sokoban levels and parking lots in parallel and write the results as JSON lines")
+    parser.add_argument("files", nargs="+", help="paths or glob patterns of the levels and parks (e.g. levels/*.txt parks/*.txt)")
+    parser.add_argument("--algorithm", "-a", default="astar", choices=["bfs", "dfs", "ucs", "astar", "gbfs", "arastar", "beam"],
+                        help="the search function used to solve every file (arastar and beam return the best solution found within the time limit)")
+    parser.add_argument("--heuristic", "-hf", default="strong", choices=["zero", "weak", "strong"],
+                        help="the heuristic used by astar and gbfs (see get_heuristic for the parking heuristics)")
+    parser.add_argument("--workers", "-w", type=int, default=None,
+                        help="the number of worker processes (the number of CPUs by default)")
+    parser.add_argument("--time-limit", "-t", type=float, default=None,
+                        help="the time limit (in seconds) for solving a single file")
+    parser.add_argument("--memory-limit", "-m", type=int, default=None,
+                        help="the memory limit (in megabytes) for solving a single file")
+    parser.add_argument("--output", "-o", default=None,
+                        help="the path of the JSON lines file (the results are printed on the console by default)")
+
+    args = parser.parse_args()
+    try:
+        main(args)
+    except KeyboardInterrupt:
+        print("Goodbye!!")
@@ -1,4 +1,4 @@
-from typing import Dict, Iterable, List
+from typing import Dict, Iterable, List, Optional
 from dataclasses import dataclass
 import json
 
@@ -21,11 +21,18 @@ class GraphNode:
 
 # This is the implementation of the graph routing problem
 class GraphRoutingProblem(Problem[GraphNode, GraphNode]):
-    def __init__(self, start: GraphNode, goal: GraphNode, adjacency: Dict[GraphNode, List[GraphNode]]) -> None:
+    # The reverse adjacency maps every node to the nodes that have an edge into it
+    # If it is not given, it is built from the adjacency
+    def __init__(self, start: GraphNode, goal: GraphNode, adjacency: Dict[GraphNode, List[GraphNode]],
+                 reverse_adjacency: Optional[Dict[GraphNode, List[GraphNode]]] = None) -> None:
         super().__init__()
         self.start = start
         self.goal = goal
         self.adjacency = adjacency
+        if reverse_adjacency is None:
+            reverse_adjacency = build_reverse_adjacency(adjacency)
+        self.reverse_adjacency = reverse_adjacency
+        self.reversed: Optional['GraphRoutingProblem'] = None
     
     def get_initial_state(self) -> GraphNode:
         return self.start
@@ -46,6 +53,38 @@ class GraphRoutingProblem(Problem[GraphNode, GraphNode]):
     # The cost of an action is the distance between the current node and the next node 
     def get_cost(self, state: GraphNode, action: GraphNode) -> float:
         return euclidean_distance(state.position, action.position)
+
+    # The fingerprint of a graph routing problem is its goal and its graph (the costs are defined by the positions)
+    def get_fingerprint(self) -> str:
+        nodes = sorted((node.name, node.position.x, node.position.y, sorted(neighbor.name for neighbor in neighbors))
+                       for node, neighbors in self.adjacency.items())
+        return f"graph goal={self.goal.name} nodes={nodes}"
+
+    # An action is stored as the name of its node
+    def encode_action(self, action: GraphNode) -> str:
+        return action.name
+
+    def decode_action(self, value: str) -> GraphNode:
+        nodes = self.cache().get("nodes_by_name")
+        if nodes is None:
+            # Every node has an edge out of it or into it (or both)
+            nodes = self.cache()["nodes_by_name"] = {node.name: node for node in [*self.adjacency, *self.reverse_adjacency]}
+        return nodes[value]
+
+    # Returns the problem of routing from the goal back to the start over the reversed edges
+    # This is used by the bidirectional search to run its backward search
+    # The cost of an edge is the same in both directions since it is the distance between its nodes
+    def reverse(self) -> 'GraphRoutingProblem':
+        if self.reversed is None:
+            self.reversed = GraphRoutingProblem(self.goal, self.start, self.reverse_adjacency, self.adjacency)
+            self.reversed.reversed = self
+        return self.reversed
+
+    # Given an action applied to a state in the reversed problem,
+    # this function returns the action that leads back from the resulting node to the given state in the original problem
+    # Since the action is the next node, this is the given state itself
+    def get_reverse_action(self, state: GraphNode, action: GraphNode) -> GraphNode:
+        return state
     
     # Read a graph routing problem from file
     @staticmethod
@@ -54,13 +93,25 @@ class GraphRoutingProblem(Problem[GraphNode, GraphNode]):
         graph_def: Dict[str, Dict] = problem_def.get("graph", {})
         node_dict = {name: GraphNode(name, Point(*item.get("position", [0,0]))) for name, item in graph_def.items()}
         adjacency: Dict[GraphNode, List[GraphNode]] = {}
-        for name, item in graph_def.items():
+        reverse_adjacency: Dict[GraphNode, List[GraphNode]] = {node: [] for node in node_dict.values()}
+        # Nodes are visited in sorted order so that the reverse adjacency lists are sorted by name too
+        for name in sorted(graph_def.keys()):
             node = node_dict[name]
-            adjacent = [node_dict[adjacent] for adjacent in sorted(item.get("adjacent", [])) if adjacent in node_dict]
+            adjacent = [node_dict[adjacent] for adjacent in sorted(graph_def[name].get("adjacent", [])) if adjacent in node_dict]
             adjacency[node] = adjacent
+            for neighbor in adjacent:
+                reverse_adjacency[neighbor].append(node)
         start = node_dict[problem_def.get("start", "")]
         goal = node_dict[problem_def.get("goal", "")]
-        return GraphRoutingProblem(start, goal, adjacency)
+        return GraphRoutingProblem(start, goal, adjacency, reverse_adjacency)
+
+# Builds the reverse adjacency of a graph, where every node maps to the nodes that have an edge into it
+def build_reverse_adjacency(adjacency: Dict[GraphNode, List[GraphNode]]) -> Dict[GraphNode, List[GraphNode]]:
+    reverse_adjacency: Dict[GraphNode, List[GraphNode]] = {node: [] for node in adjacency}
+    for node in sorted(adjacency.keys(), key=lambda node: node.name):
+        for neighbor in adjacency[node]:
+            reverse_adjacency.setdefault(neighbor, []).append(node)
+    return reverse_adjacency
 
 def graphrouting_heuristic(problem: GraphRoutingProblem, state: GraphNode) -> float:
     return euclidean_distance(state.position, problem.goal.position)
\ No newline at end of file
@@ -0,0 +1,211 @@
+from typing import Iterable, Optional
+from array import array
+import argparse, hashlib, json, math, mmap, struct, sys
+
+from problem import Problem
+from helpers.utils import track_call_count
+
+# This file contains a compact binary format for large graphs and a graph routing problem that reads it without parsing it
+# GraphRoutingProblem.from_file builds a GraphNode for every node and a list for every adjacency, which is too slow and too big
+# for road graphs with millions of edges. Here, the graph is stored in compressed sparse row (CSR) arrays and the file is memory-mapped,
+# so loading is instant, the operating system only reads the pages that the search touches and several processes share the same memory.
+# A node is an integer index, and the nodes are numbered in the order of their names, so the neighbors are visited in the same order
+# as in GraphRoutingProblem (which sorts them by name) and the searches explore the same nodes.
+#
+# The file starts with a header (see HEADER) followed by these arrays, each one starts at a multiple of 8 bytes:
+#   offsets          int64[nodes + 1]  the neighbors of node i are targets[offsets[i]:offsets[i+1]]
+#   targets          int64[edges]
+#   reverse_offsets  int64[nodes + 1]  the same for the reversed edges (used by the bidirectional searches)
+#   reverse_targets  int64[edges]
+#   xs, ys           float64[nodes]    the node positions
+#   name_offsets     int64[nodes + 1]  the name of node i is names[name_offsets[i]:name_offsets[i+1]] (UTF-8)
+#   names            bytes
+# The arrays are stored in the byte order of the machine that wrote them, which is recorded in the header.
+
+# magic, version, byte order (0 = little, 1 = big), node count, edge count, start node, goal node, size of the names in bytes
+HEADER = struct.Struct("<4sHHqqqqq")
+MAGIC = b"CSRG"
+VERSION = 1
+
+# Return the number of padding bytes needed to align the given offset to 8 bytes
+def padding(offset: int) -> int:
+    return -offset % 8
+
+# The graph arrays, memory-mapped from a file
+class CSRGraph:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, byteorder, nodes, edges, self.start, self.goal, names_size = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise Exception(f"{path} is not a CSR graph file (version {VERSION})")
+        if byteorder != (sys.byteorder == "big"):
+            raise Exception(f"{path} was written on a machine with a different byte order, convert it again from the JSON file")
+        self.node_count, self.edge_count = nodes, edges
+        view = memoryview(self.buffer)
+        position = HEADER.size
+        # Return a view of the next array in the file
+        def section(format: str, count: int, size: int) -> memoryview:
+            nonlocal position
+            position += padding(position)
+            start, position = position, position + count * size
+            return view[start:position].cast(format) if format != "B" else view[start:position]
+        self.offsets = section("q", nodes + 1, 8)
+        self.targets = section("q", edges, 8)
+        self.reverse_offsets = section("q", nodes + 1, 8)
+        self.reverse_targets = section("q", edges, 8)
+        self.xs = section("d", nodes, 8)
+        self.ys = section("d", nodes, 8)
+        self.name_offsets = section("q", nodes + 1, 8)
+        self.names = section("B", names_size, 1)
+        self.body = view[HEADER.size:position]
+        self.digest: Optional[str] = None
+
+    # The mapped memory can not be pickled, so the graph is mapped again from its path (this is needed to send it to other processes)
+    def __reduce__(self):
+        return (CSRGraph, (self.path,))
+
+    def get_name(self, node: int) -> str:
+        return bytes(self.names[self.name_offsets[node]:self.name_offsets[node + 1]]).decode()
+
+    # Find a node by its name with a binary search (the nodes are sorted by name)
+    def find_node(self, name: str) -> int:
+        key = name.encode()
+        low, high = 0, self.node_count
+        while low < high:
+            middle = (low + high) // 2
+            if bytes(self.names[self.name_offsets[middle]:self.name_offsets[middle + 1]]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.node_count or self.get_name(low) != name:
+            raise KeyError(name)
+        return low
+
+    # A hash of the arrays (but not of the start and goal in the header), computed once
+    def get_digest(self) -> str:
+        if self.digest is None:
+            self.digest = hashlib.sha256(self.body).hexdigest()
+        return self.digest
+
+# This is the graph routing problem over a CSR graph
+# It behaves like GraphRoutingProblem, except that the states and the actions are node indices
+# (use problem.graph.get_name to print them) and that the heuristic is csr_graphrouting_heuristic
+class CSRGraphRoutingProblem(Problem[int, int]):
+    # If is_reversed is True, the problem follows the reversed edges
+    def __init__(self, graph: CSRGraph, start: int, goal: int, is_reversed: bool = False) -> None:
+        super().__init__()
+        self.graph = graph
+        self.start = start
+        self.goal = goal
+        self.is_reversed = is_reversed
+        if is_reversed:
+            self.offsets, self.targets = graph.reverse_offsets, graph.reverse_targets
+        else:
+            self.offsets, self.targets = graph.offsets, graph.targets
+        self.xs, self.ys = graph.xs, graph.ys
+        self.reversed: Optional['CSRGraphRoutingProblem'] = None
+
+    # The views of the arrays can not be pickled, so the problem is rebuilt from the graph
+    def __reduce__(self):
+        return (CSRGraphRoutingProblem, (self.graph, self.start, self.goal, self.is_reversed))
+
+    def get_initial_state(self) -> int:
+        return self.start
+
+    def is_goal(self, state: int) -> bool:
+        return state == self.goal
+
+    # The neighbors are a slice of the mapped targets array, so no list is built
+    # We use @track_call_count to count the explored nodes (recording the calls would keep every explored node in memory)
+    @track_call_count
+    def get_actions(self, state: int) -> Iterable[int]:
+        return self.targets[self.offsets[state]:self.offsets[state + 1]]
+
+    def get_successor(self, state: int, action: int) -> int:
+        return action
+
+    # The same formula as euclidean_distance so that the costs are exactly the same as in GraphRoutingProblem
+    def get_cost(self, state: int, action: int) -> float:
+        dx, dy = self.xs[state] - self.xs[action], self.ys[state] - self.ys[action]
+        return math.sqrt(dx * dx + dy * dy)
+
+    def get_fingerprint(self) -> str:
+        return f"csr graph goal={self.goal} reversed={self.is_reversed} arrays={self.graph.get_digest()}"
+
+    # Returns the problem of routing from the goal back to the start over the reversed edges (see GraphRoutingProblem.reverse)
+    def reverse(self) -> 'CSRGraphRoutingProblem':
+        if self.reversed is None:
+            self.reversed = CSRGraphRoutingProblem(self.graph, self.goal, self.start, not self.is_reversed)
+            self.reversed.reversed = self
+        return self.reversed
+
+    def get_reverse_action(self, state: int, action: int) -> int:
+        return state
+
+    # Read a graph routing problem from a CSR file
+    # The start and the goal are the ones given in the JSON file unless other node names are given
+    @staticmethod
+    def from_file(path: str, start: Optional[str] = None, goal: Optional[str] = None) -> 'CSRGraphRoutingProblem':
+        graph = CSRGraph(path)
+        start_node = graph.start if start is None else graph.find_node(start)
+        goal_node = graph.goal if goal is None else graph.find_node(goal)
+        return CSRGraphRoutingProblem(graph, start_node, goal_node)
+
+def csr_graphrouting_heuristic(problem: CSRGraphRoutingProblem, state: int) -> float:
+    dx, dy = problem.xs[state] - problem.xs[problem.goal], problem.ys[state] - problem.ys[problem.goal]
+    return math.sqrt(dx * dx + dy * dy)
+
+# Convert a graph from the JSON format of GraphRoutingProblem.from_file to the CSR format
+# The JSON file is still parsed as a whole, but this is only done once per graph
+def convert_json_to_csr(json_path: str, csr_path: str) -> None:
+    with open(json_path, 'r') as f:
+        problem_def = json.load(f)
+    graph_def = problem_def.get("graph", {})
+    names = sorted(graph_def.keys())
+    indices = {name: index for index, name in enumerate(names)}
+    offsets, targets = array("q", [0]), array("q")
+    in_degrees = [0] * len(names)
+    for name in names:
+        # Edges to unknown nodes are dropped, as in GraphRoutingProblem.from_file
+        for adjacent in sorted(graph_def[name].get("adjacent", [])):
+            if adjacent in indices:
+                targets.append(indices[adjacent])
+                in_degrees[indices[adjacent]] += 1
+        offsets.append(len(targets))
+    # The reversed edges are filled by a counting sort, visiting the sources in order so that every reversed list is sorted by name
+    reverse_offsets = array("q", [0])
+    for degree in in_degrees:
+        reverse_offsets.append(reverse_offsets[-1] + degree)
+    reverse_targets = array("q", bytes(8 * len(targets)))
+    fill = reverse_offsets[:-1]
+    for source in range(len(names)):
+        for edge in range(offsets[source], offsets[source + 1]):
+            target = targets[edge]
+            reverse_targets[fill[target]] = source
+            fill[target] += 1
+    positions = [graph_def[name].get("position", [0, 0]) for name in names]
+    xs = array("d", (float(position[0]) for position in positions))
+    ys = array("d", (float(position[1]) for position in positions))
+    encoded = [name.encode() for name in names]
+    name_offsets = array("q", [0])
+    for name in encoded:
+        name_offsets.append(name_offsets[-1] + len(name))
+    names_data = b"".join(encoded)
+    start = indices[problem_def.get("start", "")]
+    goal = indices[problem_def.get("goal", "")]
+    with open(csr_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, int(sys.byteorder == "big"), len(names), len(targets), start, goal, len(names_data)))
+        for section in (offsets, targets, reverse_offsets, reverse_targets, xs, ys, name_offsets, names_data):
+            f.write(bytes(padding(f.tell())))
+            f.write(section)
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Convert a graph from the JSON format to the CSR binary format")
+    parser.add_argument("graph", help="path to the JSON graph (e.g. graphs/graph1.json)")
+    parser.add_argument("output", help="path of the CSR file to write (e.g. graphs/graph1.csr)")
+
+    args = parser.parse_args()
+    convert_json_to_csr(args.graph, args.output)
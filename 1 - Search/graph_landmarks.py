@@ -0,0 +1,241 @@
+from typing import Callable, Iterable, List, Tuple, Union
+from array import array
+import argparse, glob, heapq, mmap, os, struct, sys, time
+
+from graph import GraphRoutingProblem, GraphNode, graphrouting_heuristic
+from graph_csr import CSRGraphRoutingProblem, csr_graphrouting_heuristic
+
+# This file contains the ALT heuristic (A*, landmarks and the triangle inequality) for the graph routing problems
+# The euclidean heuristic only knows the straight line distance, so on graphs where the roads are much longer than the straight lines,
+# it prunes almost nothing. Instead, we pick a few nodes (the landmarks) and compute the exact distances from every landmark
+# to every node and from every node to every landmark. Then, by the triangle inequality, for a landmark L:
+#   d(v, goal) >= d(L, goal) - d(L, v)   and   d(v, goal) >= d(v, L) - d(goal, L)
+# The heuristic is the maximum of these bounds over all the landmarks and the euclidean distance,
+# which is still admissible and consistent since each bound is.
+# The distances can be saved next to the graph (e.g. graphs/graph1.alt) and memory-mapped later instead of being computed again:
+#   python graph_landmarks.py "graphs/*.json" -k 4
+# To compare the expanded nodes of A* with the euclidean heuristic and with the landmarks:
+#   python graph_landmarks.py "graphs/*.json" -k 4 --benchmark
+
+GraphProblem = Union[GraphRoutingProblem, CSRGraphRoutingProblem]
+
+# magic, version, byte order (0 = little, 1 = big), node count, landmark count
+HEADER = struct.Struct("<4sHHqq")
+MAGIC = b"ALTL"
+VERSION = 1
+
+# The landmark distances of a graph
+# The nodes are numbered in the order of their names (the same as in graph_csr.py)
+# landmarks: the indices of the landmark nodes
+# from_landmarks[v * k + i]: the distance from the landmark i to the node v (infinite if v is not reachable)
+# to_landmarks[v * k + i]: the distance from the node v to the landmark i (infinite if the landmark is not reachable)
+# The distance vectors are either arrays (when computed) or views of a memory-mapped file (when loaded)
+class LandmarkTables:
+    def __init__(self, node_count: int, landmarks: List[int], from_landmarks, to_landmarks) -> None:
+        self.node_count = node_count
+        self.landmarks = landmarks
+        self.from_landmarks = from_landmarks
+        self.to_landmarks = to_landmarks
+
+    # The tables of the reversed graph (the distances from a landmark become the distances to it and vice versa)
+    def swapped(self) -> 'LandmarkTables':
+        return LandmarkTables(self.node_count, self.landmarks, self.to_landmarks, self.from_landmarks)
+
+    # Return the best lower bound of the distance from the node v to the node t
+    # If a landmark proves that t can not be reached from v, the bound is infinite
+    def bound(self, v: int, t: int) -> float:
+        k, inf = len(self.landmarks), float('inf')
+        from_landmarks, to_landmarks = self.from_landmarks, self.to_landmarks
+        best = 0
+        for i in range(v * k, v * k + k):
+            j = i + (t - v) * k
+            # d(v, t) >= d(L, t) - d(L, v). If L reaches v but not t, then v can not reach t either.
+            lv, lt = from_landmarks[i], from_landmarks[j]
+            if lv != inf:
+                if lt == inf:
+                    return inf
+                if lt - lv > best:
+                    best = lt - lv
+            # d(v, t) >= d(v, L) - d(t, L). If t reaches L but v does not, then v can not reach t either.
+            vl, tl = to_landmarks[i], to_landmarks[j]
+            if tl != inf:
+                if vl == inf:
+                    return inf
+                if vl - tl > best:
+                    best = vl - tl
+        return best
+
+# Return the nodes of the graph in index order, a function that maps a node to its index,
+# and two functions that return the successors and the predecessors of a node
+# The adjacency is read directly since calling get_actions would count the nodes as explored
+def get_graph_structure(problem: GraphProblem) -> Tuple[List, Callable, Callable, Callable]:
+    if isinstance(problem, CSRGraphRoutingProblem):
+        reverse = problem.reverse()
+        nodes = range(problem.graph.node_count)
+        successors = lambda node: problem.targets[problem.offsets[node]:problem.offsets[node + 1]]
+        predecessors = lambda node: reverse.targets[reverse.offsets[node]:reverse.offsets[node + 1]]
+        return nodes, lambda node: node, successors, predecessors
+    nodes = sorted(set(problem.adjacency) | set(problem.reverse_adjacency), key=lambda node: node.name)
+    indices = {node: index for index, node in enumerate(nodes)}
+    successors = lambda node: problem.adjacency.get(node, [])
+    predecessors = lambda node: problem.reverse_adjacency.get(node, [])
+    return nodes, indices.__getitem__, successors, predecessors
+
+# Compute the distance from the source to every node (or from every node to the source if the neighbors are the predecessors)
+# The edge costs are symmetric (the distance between the nodes), so get_cost is used in both directions
+def compute_distances(problem: GraphProblem, nodes: List, index: Callable, neighbors: Callable, source: int) -> array:
+    distances = array("d", [float('inf')]) * len(nodes)
+    distances[source] = 0
+    queue = [(0, source)]
+    while queue:
+        distance, current = heapq.heappop(queue)
+        if distance > distances[current]:
+            continue
+        node = nodes[current]
+        for neighbor in neighbors(node):
+            next_index = index(neighbor)
+            next_distance = distance + problem.get_cost(node, neighbor)
+            if next_distance < distances[next_index]:
+                distances[next_index] = next_distance
+                heapq.heappush(queue, (next_distance, next_index))
+    return distances
+
+# Compute the tables of k landmarks which are picked far from each other (the "farthest" selection):
+# every new landmark is the node with the largest round-trip distance to its closest landmark.
+# A node that is not connected to any landmark yet is picked first, so that every part of the graph gets a landmark.
+# The first landmark is picked in the same way, as if the first node was a landmark.
+def compute_landmarks(problem: GraphProblem, k: int = 4) -> LandmarkTables:
+    nodes, index, successors, predecessors = get_graph_structure(problem)
+    count, inf = len(nodes), float('inf')
+    k = min(k, count)
+    # The round-trip distance from every node to its closest landmark
+    closest = array("d", [inf]) * count
+    def update_closest(forward: array, backward: array) -> None:
+        for node in range(count):
+            reached = [distance for distance in (forward[node], backward[node]) if distance != inf]
+            if reached and sum(reached) < closest[node]:
+                closest[node] = sum(reached)
+    landmarks, forward_rows, backward_rows = [], [], []
+    update_closest(compute_distances(problem, nodes, index, successors, 0), compute_distances(problem, nodes, index, predecessors, 0))
+    while len(landmarks) < k:
+        landmark = max((node for node in range(count) if node not in landmarks), key=lambda node: closest[node])
+        forward = compute_distances(problem, nodes, index, successors, landmark)
+        backward = compute_distances(problem, nodes, index, predecessors, landmark)
+        landmarks.append(landmark)
+        forward_rows.append(forward)
+        backward_rows.append(backward)
+        update_closest(forward, backward)
+    # The rows are interleaved so that the distances of a node to all the landmarks are next to each other
+    from_landmarks = array("d", (row[node] for node in range(count) for row in forward_rows))
+    to_landmarks = array("d", (row[node] for node in range(count) for row in backward_rows))
+    return LandmarkTables(count, landmarks, from_landmarks, to_landmarks)
+
+# Return the path of the landmark file of a graph (e.g. graphs/graph1.alt for graphs/graph1.json)
+def get_landmarks_path(graph_path: str) -> str:
+    return os.path.splitext(graph_path)[0] + ".alt"
+
+def save_landmarks(tables: LandmarkTables, path: str) -> None:
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, int(sys.byteorder == "big"), tables.node_count, len(tables.landmarks)))
+        f.write(array("q", tables.landmarks))
+        f.write(array("d", tables.from_landmarks))
+        f.write(array("d", tables.to_landmarks))
+
+# Memory-map the landmark file, so only the pages of the visited nodes are read
+def load_landmarks(path: str) -> LandmarkTables:
+    with open(path, 'rb') as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, byteorder, count, k = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC or version != VERSION:
+        raise Exception(f"{path} is not a landmark file (version {VERSION})")
+    if byteorder != (sys.byteorder == "big"):
+        raise Exception(f"{path} was written on a machine with a different byte order, compute the landmarks again")
+    view = memoryview(buffer)
+    start = HEADER.size
+    landmarks = view[start:start + 8 * k].cast("q").tolist()
+    start += 8 * k
+    from_landmarks = view[start:start + 8 * count * k].cast("d")
+    start += 8 * count * k
+    to_landmarks = view[start:start + 8 * count * k].cast("d")
+    return LandmarkTables(count, landmarks, from_landmarks, to_landmarks)
+
+# Store the tables in the problem cache, and the swapped tables in the cache of the reversed problem (used by the bidirectional searches)
+def set_landmark_tables(problem: GraphProblem, tables: LandmarkTables) -> None:
+    nodes, index, _, _ = get_graph_structure(problem)
+    if tables.node_count != len(nodes):
+        raise Exception(f"The landmarks have {tables.node_count} nodes but the graph has {len(nodes)} nodes")
+    problem.cache()["landmark_tables"] = (tables, index)
+    problem.reverse().cache()["landmark_tables"] = (tables.swapped(), index)
+
+# Return the landmark tables and the node indexer of the problem from the problem cache (and compute them if they are not cached yet)
+def get_landmark_tables(problem: GraphProblem) -> Tuple[LandmarkTables, Callable]:
+    cached = problem.cache().get("landmark_tables")
+    if cached is None:
+        set_landmark_tables(problem, compute_landmarks(problem))
+        cached = problem.cache()["landmark_tables"]
+    return cached
+
+# The maximum of the landmark bounds and the euclidean distance
+# It works for both GraphRoutingProblem and CSRGraphRoutingProblem
+def landmark_heuristic(problem: GraphProblem, state: Union[GraphNode, int]) -> float:
+    tables, index = get_landmark_tables(problem)
+    if isinstance(problem, CSRGraphRoutingProblem):
+        euclidean = csr_graphrouting_heuristic(problem, state)
+    else:
+        euclidean = graphrouting_heuristic(problem, state)
+    return max(euclidean, tables.bound(index(state), index(problem.goal)))
+
+# Compare the nodes expanded by A* with the euclidean heuristic and with the landmark heuristic on every graph
+def benchmark(paths: Iterable[str], k: int) -> None:
+    from search import AStarSearch
+    from search_benchmark import load_problem, run_benchmark
+    print(f"{'file':<24}{'landmarks':>10}{'euclidean':>11}{'alt':>8}{'cost':>10}{'prepare s':>11}")
+    for path in paths:
+        problem = load_problem(path)
+        euclidean = csr_graphrouting_heuristic if isinstance(problem, CSRGraphRoutingProblem) else graphrouting_heuristic
+        euclidean_solution, euclidean_expanded, _ = run_benchmark(problem, lambda problem, state: AStarSearch(problem, state, euclidean))
+        # A fresh problem so that nothing is shared between the two runs
+        problem = load_problem(path)
+        start = time.perf_counter()
+        landmarks_path = get_landmarks_path(path)
+        tables = load_landmarks(landmarks_path) if os.path.exists(landmarks_path) else compute_landmarks(problem, k)
+        set_landmark_tables(problem, tables)
+        prepare = time.perf_counter() - start
+        solution, expanded, _ = run_benchmark(problem, lambda problem, state: AStarSearch(problem, state, landmark_heuristic))
+        cost = "-" if solution is None else f"{get_path_cost(problem, solution):.3f}"
+        # Both heuristics are admissible, so both solutions must have the same cost
+        if (solution is None) != (euclidean_solution is None) or (solution is not None and
+                abs(get_path_cost(problem, solution) - get_path_cost(problem, euclidean_solution)) > 1e-9):
+            cost += " (differs)"
+        print(f"{path:<24}{len(tables.landmarks):>10}{euclidean_expanded:>11}{expanded:>8}{cost:>10}{prepare:>11.3f}")
+
+def get_path_cost(problem: GraphProblem, solution: List) -> float:
+    cost, state = 0, problem.get_initial_state()
+    for action in solution:
+        cost += problem.get_cost(state, action)
+        state = problem.get_successor(state, action)
+    return cost
+
+def main(args: argparse.Namespace):
+    paths: List[str] = sorted({path for pattern in args.graphs for path in glob.glob(pattern)})
+    if args.benchmark:
+        benchmark(paths, args.landmarks)
+        return
+    for path in paths:
+        start = time.perf_counter()
+        problem = CSRGraphRoutingProblem.from_file(path) if path.endswith(".csr") else GraphRoutingProblem.from_file(path)
+        tables = compute_landmarks(problem, args.landmarks)
+        save_landmarks(tables, get_landmarks_path(path))
+        print(f"{path}: {len(tables.landmarks)} landmarks in {time.perf_counter() - start:.3f} seconds")
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Compute the landmark distances of graphs (saved next to every graph) or benchmark the landmark heuristic")
+    parser.add_argument("graphs", nargs="+", help="paths or glob patterns of the graphs (e.g. graphs/*.json graphs/*.csr)")
+    parser.add_argument("--landmarks", "-k", type=int, default=4,
+                        help="the number of landmarks")
+    parser.add_argument("--benchmark", "-b", action="store_true",
+                        help="compare the expanded nodes of A* with the euclidean and the landmark heuristics instead of saving the landmarks")
+
+    args = parser.parse_args()
+    main(args)
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from enum import IntEnum
-from typing import Iterator
-import math
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import heapq, math
 
 # the class Point will hold a 2D coordinate on a discrete grid
 # We use dataclass with frozen=True to automatically implement:
@@ -13,6 +13,11 @@ class Point:
     x: int
     y: int
 
+    # Frozen classes with slots can not be unpickled by setting their attributes,
+    # so they are rebuilt with the constructor (this is needed to send points to other processes)
+    def __reduce__(self):
+        return (Point, (self.x, self.y))
+
     # The following functions implement the operators +, -, negative and str
     def __add__(self, other: 'Point') -> 'Point':
         return Point(self.x + other.x, self.y + other.y)
@@ -75,4 +80,183 @@ Direction._Vectors = [
     Point( 0, -1),
     Point(-1,  0),
     Point( 0,  1)
-]
\ No newline at end of file
+]
+
+# A 4-connected grid with uniform step costs, such as the sokoban levels and the parking lots
+# The walkable cells are stored in a flat bytearray where the cell (x, y) has the index (x + 1) + (y + 1) * stride.
+# The grid is padded with a border of walls, so the neighbors of a cell are always at the index offsets
+# (+1, -stride, -1, +stride) and no bound checks are needed while searching.
+# Extra obstacles that change between searches (e.g. the sokoban crates) are passed as "blocked" points.
+# This is much faster than running the generic search on a grid problem since there are no states, no actions and no Point objects
+# during the search, and it is meant to be used by the heuristics and the problems to compute walking distances and paths.
+class GridMap:
+    def __init__(self, width: int, height: int, walkable: Iterable[Point]) -> None:
+        self.width, self.height = width, height
+        self.stride = width + 2
+        self.cells = bytearray(self.stride * (height + 2))
+        for point in walkable:
+            if 0 <= point.x < width and 0 <= point.y < height:
+                self.cells[self.index(point)] = 1
+        # The index offset of a step in every direction (in the order of the Direction enum)
+        self.offsets = tuple(vector.x + vector.y * self.stride for vector in map(Direction.to_vector, Direction))
+
+    # Convert a point to its index in the flat array and back
+    def index(self, point: Point) -> int:
+        return (point.x + 1) + (point.y + 1) * self.stride
+
+    def point(self, index: int) -> Point:
+        y, x = divmod(index, self.stride)
+        return Point(x - 1, y - 1)
+
+    def is_walkable(self, point: Point) -> bool:
+        return 0 <= point.x < self.width and 0 <= point.y < self.height and self.cells[self.index(point)] == 1
+
+    # Return a copy of the cells where the blocked points are not walkable
+    def get_cells(self, blocked: Iterable[Point] = ()) -> bytearray:
+        cells = self.cells[:]
+        for point in blocked:
+            if 0 <= point.x < self.width and 0 <= point.y < self.height:
+                cells[self.index(point)] = 0
+        return cells
+
+    # Compute the walking distance from "source" to every cell within "max_distance" steps (all the reachable cells if it is None)
+    # weights: an optional sequence (indexed like the cells) of the cost to step into every cell, otherwise every step costs 1
+    # With uniform costs, Dijkstra's algorithm reduces to a breadth first search which visits the cells ring by ring,
+    # so the search stops as soon as the ring at "max_distance" is reached.
+    # The result maps every reached point to its distance (the source is included with a distance of 0 even if it is blocked)
+    def distances(self, source: Point, blocked: Iterable[Point] = (), max_distance: Optional[float] = None,
+                  weights: Optional[Sequence[float]] = None) -> Dict[Point, float]:
+        cells = self.get_cells(blocked)
+        start = self.index(source)
+        if weights is None:
+            found = self.ring_distances(cells, start, max_distance)
+        else:
+            found = self.weighted_distances(cells, start, max_distance, weights)
+        point = self.point
+        return {point(index): distance for index, distance in found.items()}
+
+    def ring_distances(self, cells: bytearray, start: int, max_distance: Optional[float]) -> Dict[int, int]:
+        offsets = self.offsets
+        found = {start: 0}
+        ring, distance = [start], 0
+        while ring and (max_distance is None or distance < max_distance):
+            distance += 1
+            next_ring = []
+            for index in ring:
+                for offset in offsets:
+                    neighbor = index + offset
+                    if cells[neighbor] and neighbor not in found:
+                        found[neighbor] = distance
+                        next_ring.append(neighbor)
+            ring = next_ring
+        return found
+
+    def weighted_distances(self, cells: bytearray, start: int, max_distance: Optional[float], weights: Sequence[float]) -> Dict[int, float]:
+        offsets = self.offsets
+        found = {start: 0}
+        queue = [(0, start)]
+        while queue:
+            distance, index = heapq.heappop(queue)
+            if distance > found[index]:
+                continue
+            for offset in offsets:
+                neighbor = index + offset
+                if not cells[neighbor]:
+                    continue
+                next_distance = distance + weights[neighbor]
+                if (max_distance is None or next_distance <= max_distance) and next_distance < found.get(neighbor, math.inf):
+                    found[neighbor] = next_distance
+                    heapq.heappush(queue, (next_distance, neighbor))
+        return found
+
+    # Find a shortest walk from "start" to "goal" and return it as a list of directions (or None if the goal is not reachable)
+    # It is an A* search (with the manhattan distance) over jump points:
+    # Many shortest paths on an open grid only differ in the order of their moves, so we only follow the "canonical" ones
+    # where a vertical move is followed by a horizontal move only if the horizontal move could not be done one step earlier
+    # (the cell beside the previous cell is blocked). Any shortest path can be reordered into a canonical one,
+    # so the search is still optimal. Along a straight line, the cells that do not branch are skipped (jumped over),
+    # and only the cells where the canonical paths turn are pushed to the frontier.
+    def shortest_path(self, start: Point, goal: Point, blocked: Iterable[Point] = ()) -> Optional[List[Direction]]:
+        if start == goal:
+            return []
+        if not self.is_walkable(goal):
+            return None
+        cells = self.get_cells(blocked)
+        stride = self.stride
+        start_index, goal_index = self.index(start), self.index(goal)
+        goal_y, goal_x = divmod(goal_index, stride)
+        def heuristic(index: int) -> int:
+            y, x = divmod(index, stride)
+            return abs(x - goal_x) + abs(y - goal_y)
+        # A node is a jump point and the direction it was reached with, since the direction decides which moves are canonical
+        # The start node has the direction None and all the directions are canonical from it
+        parents: Dict[Tuple[int, Optional[Direction]], Optional[Tuple[int, Optional[Direction]]]] = {(start_index, None): None}
+        costs = {(start_index, None): 0}
+        # The sequence number breaks the ties in the insertion order so that the directions are never compared
+        sequence = 0
+        queue = [(heuristic(start_index), sequence, start_index, None)]
+        while queue:
+            _, _, index, direction = heapq.heappop(queue)
+            node = (index, direction)
+            cost = costs[node]
+            if index == goal_index:
+                return self.unwind(parents, node)
+            for next_direction in self.canonical_directions(cells, index, direction):
+                jump = self.jump(cells, index, next_direction, goal_index)
+                if jump is None:
+                    continue
+                next_node = (jump, next_direction)
+                next_cost = cost + abs(jump - index) // abs(self.offsets[next_direction])
+                if next_cost < costs.get(next_node, math.inf):
+                    costs[next_node] = next_cost
+                    parents[next_node] = node
+                    sequence += 1
+                    heapq.heappush(queue, (next_cost + heuristic(jump), sequence, jump, next_direction))
+        return None
+
+    # Return the directions in which a canonical path, that reached the cell at "index" with "direction", can continue
+    # After a horizontal move, the path can go straight or turn up or down.
+    # After a vertical move, the path can go straight or turn sideways where the cell beside the previous cell is blocked (a forced turn).
+    def canonical_directions(self, cells: bytearray, index: int, direction: Optional[Direction]) -> List[Direction]:
+        if direction is None:
+            return list(Direction)
+        if direction == Direction.RIGHT or direction == Direction.LEFT:
+            return [direction, Direction.UP, Direction.DOWN]
+        previous = index - self.offsets[direction]
+        directions = [direction]
+        for side in (Direction.RIGHT, Direction.LEFT):
+            offset = self.offsets[side]
+            if cells[index + offset] and not cells[previous + offset]:
+                directions.append(side)
+        return directions
+
+    # Walk from the cell at "index" in the given direction and return the first cell where the canonical paths branch
+    # (the goal, a cell with a forced turn, or a cell from which a vertical jump finds a jump point)
+    # Return None if the walk hits an obstacle before reaching such a cell
+    def jump(self, cells: bytearray, index: int, direction: Direction, goal: int) -> Optional[int]:
+        offset = self.offsets[direction]
+        horizontal = direction == Direction.RIGHT or direction == Direction.LEFT
+        while True:
+            previous, index = index, index + offset
+            if not cells[index]:
+                return None
+            if index == goal:
+                return index
+            if horizontal:
+                if self.jump(cells, index, Direction.UP, goal) is not None or self.jump(cells, index, Direction.DOWN, goal) is not None:
+                    return index
+            else:
+                for side in (self.offsets[Direction.RIGHT], self.offsets[Direction.LEFT]):
+                    if cells[index + side] and not cells[previous + side]:
+                        return index
+
+    # Convert the chain of jump points that ends at "node" into the list of single steps
+    def unwind(self, parents: Dict, node: Tuple[int, Optional[Direction]]) -> List[Direction]:
+        path = []
+        while parents[node] is not None:
+            parent = parents[node]
+            index, direction = node
+            path.extend([direction] * (abs(index - parent[0]) // abs(self.offsets[direction])))
+            node = parent
+        path.reverse()
+        return path
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import Any, Dict, Set, Tuple, List
+from typing import Any, Dict, NamedTuple, Set, Tuple, List
 from problem import Problem
 from mathutils import Direction, Point
 from helpers.utils import NotImplemented
@@ -92,6 +92,19 @@ class ParkingProblem(Problem[ParkingState, ParkingAction]):
             return cost
         return -1
     
+    # The fingerprint of a parking problem is its parking lot (the passages and the slots)
+    def get_fingerprint(self) -> str:
+        passages = sorted((point.x, point.y) for point in self.passages)
+        slots = sorted((car, point.x, point.y) for point, car in self.slots.items())
+        return f"parking {self.width}x{self.height} cars={len(self.cars)} passages={passages} slots={slots}"
+
+    # An action is stored as a list of the car index and the letter of the direction
+    def encode_action(self, action: ParkingAction) -> List[Any]:
+        return [action[0], str(action[1])]
+
+    def decode_action(self, value: List[Any]) -> ParkingAction:
+        return (value[0], Direction(value[1]))
+
      # Read a parking problem from text containing a grid of tiles
     @staticmethod
     def from_text(text: str) -> 'ParkingProblem':
@@ -122,4 +135,106 @@ class ParkingProblem(Problem[ParkingState, ParkingAction]):
     def from_file(path: str) -> 'ParkingProblem':
         with open(path, 'r') as f:
             return ParkingProblem.from_text(f.read())
-    
+
+# This is a compact encoding of the parking state where every cell of the parking lot is identified by its index (y * width + x)
+# The cars are stored as a tuple of cell indices (cars[i] is the cell of car 'i'), and the occupied cells are stored as a bit mask
+# where bit "j" is set if cell "j" has a car, so checking if a cell is free is a bit test instead of a scan over the cars.
+# The bit mask is derived from the cars, so including it in the equality and the hash does not change which states are equal.
+class PackedParkingState(NamedTuple):
+    cars: Tuple[int, ...]
+    occupied: int
+
+# This is the parking problem over packed states
+# It wraps a ParkingProblem (as returned by from_text) and precomputes the lookup tables of its parking lot once:
+#   neighbors: for every cell index, the index of the neighbor in every direction (or -1 if the neighbor is not a passage)
+#   slot_owners: for every cell index, the index of the car whose slot is in this cell (or -1 if the cell is not a slot)
+#   moves: for every car, the actions that move it in every direction, so get_actions does not create any new tuple
+#   goal: the cell index of the slot of every car
+# The actions are the same as ParkingProblem and they are generated in the same order, so both problems give the same search results
+class PackedParkingProblem(Problem[PackedParkingState, ParkingAction]):
+    def __init__(self, problem: ParkingProblem) -> None:
+        super().__init__()
+        self.problem = problem
+        width, height = problem.width, problem.height
+        self.cells: List[Point] = [Point(index % width, index // width) for index in range(width * height)]
+        def neighbor(position: Point, direction: Direction) -> int:
+            next_position = position + direction.to_vector()
+            return self.index(next_position) if next_position in problem.passages else -1
+        self.neighbors: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(neighbor(position, direction) for direction in Direction) if position in problem.passages else (-1,) * 4
+            for position in self.cells
+        )
+        self.slot_owners: Tuple[int, ...] = tuple(problem.slots.get(position, -1) for position in self.cells)
+        self.moves: Tuple[Tuple[Tuple[int, ParkingAction], ...], ...] = tuple(
+            tuple((direction, (car, direction)) for direction in ParkingDirections) for car in range(len(problem.cars))
+        )
+        slots = {car: self.index(position) for position, car in problem.slots.items()}
+        self.goal: Tuple[int, ...] = tuple(slots.get(car, -1) for car in range(len(problem.cars)))
+        self.initial_state = self.pack(problem.cars)
+
+    # Convert a point to the index of its cell
+    def index(self, position: Point) -> int:
+        return position.x + position.y * self.problem.width
+
+    # Convert a ParkingState to a PackedParkingState
+    def pack(self, state: ParkingState) -> PackedParkingState:
+        cars = tuple(self.index(car) for car in state)
+        return PackedParkingState(cars, sum(1 << car for car in cars))
+
+    # Convert a PackedParkingState back to a ParkingState
+    def unpack(self, state: PackedParkingState) -> ParkingState:
+        return tuple(self.cells[car] for car in state.cars)
+
+    def get_initial_state(self) -> PackedParkingState:
+        return self.initial_state
+
+    def is_goal(self, state: PackedParkingState) -> bool:
+        return state.cars == self.goal
+
+    def get_actions(self, state: PackedParkingState) -> List[ParkingAction]:
+        cars, occupied = state
+        neighbors, moves = self.neighbors, self.moves
+        actions = []
+        for car, position in enumerate(cars):
+            around = neighbors[position]
+            for direction, action in moves[car]:
+                next_position = around[direction]
+                if next_position >= 0 and not occupied >> next_position & 1:
+                    actions.append(action)
+        return actions
+
+    def get_successor(self, state: PackedParkingState, action: ParkingAction) -> PackedParkingState:
+        cars, occupied = state
+        car, direction = action
+        position = cars[car]
+        next_position = self.neighbors[position][direction]
+        # Like ParkingProblem, an invalid action leaves the state unchanged
+        if next_position < 0 or occupied >> next_position & 1:
+            return state
+        return PackedParkingState(cars[:car] + (next_position,) + cars[car+1:], occupied ^ (1 << position) ^ (1 << next_position))
+
+    def get_cost(self, state: PackedParkingState, action: ParkingAction) -> float:
+        cars, occupied = state
+        car, direction = action
+        next_position = self.neighbors[cars[car]][direction]
+        if next_position < 0 or occupied >> next_position & 1:
+            return -1
+        cost = 26 - car
+        owner = self.slot_owners[next_position]
+        if owner >= 0 and owner != car:
+            cost += 100
+        return cost
+
+    # The packed problem has the same parking lot but different states than the wrapped problem
+    def get_fingerprint(self) -> str:
+        return "packed " + self.problem.get_fingerprint()
+
+    # The actions are the same as the actions of the wrapped problem
+    def encode_action(self, action: ParkingAction) -> List[Any]:
+        return self.problem.encode_action(action)
+
+    def decode_action(self, value: List[Any]) -> ParkingAction:
+        return self.problem.decode_action(value)
+
+# The directions in the order in which ParkingProblem.get_actions checks them (up, right, down, left)
+ParkingDirections = (Direction.UP, Direction.RIGHT, Direction.DOWN, Direction.LEFT)
@@ -0,0 +1,155 @@
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+import heapq
+
+from mathutils import Direction, GridMap, Point
+from parking import ParkingProblem, ParkingAction, ParkingState
+
+# This file contains the heuristics of the parking problem
+# Every action moves a single car, so the cost of a solution can be split between the cars:
+# the cost paid by a car is (26 - car index) per step, plus 100 for every step into the slot of another car.
+# If we ignore some cars, the remaining cars can only reach their slots more cheaply, so:
+#   - the exact cost for a single car to reach its slot, while ignoring all the other cars, is a lower bound of its share
+#   - the exact cost for a group of cars to reach their slots, while ignoring the cars outside the group, is a lower bound of the group's share
+# Since the shares of disjoint groups add up to the solution cost, the sum of the group costs is admissible (additive pattern databases).
+
+# The tables of a parking problem which are computed once and shared by all the states
+# car_costs: for every car, the exact cost to move it from every passage to its slot while ignoring the other cars
+# groups: the groups of cars (tuples of car indices) that have a pattern database
+# databases: for every group, a dictionary that maps the positions of its cars (in the group order) to the exact cost
+#            to move all of them to their slots while ignoring the cars outside the group (unreachable positions are not stored)
+# ungrouped: the cars that are not part of any group
+# car_groups: for every car, the index of its group (or -1 if the car is not part of any group)
+@dataclass(frozen=True)
+class ParkingHeuristicTables:
+    car_costs: Tuple[Dict[Point, float], ...]
+    groups: Tuple[Tuple[int, ...], ...]
+    databases: Tuple[Dict[Tuple[Point, ...], float], ...]
+    ungrouped: Tuple[int, ...]
+    car_groups: Tuple[int, ...]
+
+# The maximum size of a group and the maximum number of entries in a pattern database
+# Groups whose database could be bigger are split into single cars
+PATTERN_GROUP_SIZE = 2
+MAX_PATTERN_ENTRIES = 2**18
+
+# Return the cost of moving the given car into the given position (the same as ParkingProblem.get_cost)
+def step_cost(problem: ParkingProblem, car: int, position: Point) -> float:
+    cost = 26 - car
+    if problem.slots.get(position, car) != car:
+        cost += 100
+    return cost
+
+# Return the slot of every car
+def get_car_slots(problem: ParkingProblem) -> Dict[int, Point]:
+    return {car: position for position, car in problem.slots.items()}
+
+# Compute the cost to move the car from every passage to its slot (ignoring the other cars) via a backward Dijkstra from the slot
+# The car pays step_cost for every cell of its path except the first one, while the grid distances from the slot
+# include every cell except the slot, so both costs differ by the step cost of the first cell and of the slot
+def compute_car_costs(problem: ParkingProblem, car: int, slot: Point) -> Dict[Point, float]:
+    grid = GridMap(problem.width, problem.height, problem.passages)
+    weights = [0] * len(grid.cells)
+    for position in problem.passages:
+        weights[grid.index(position)] = step_cost(problem, car, position)
+    slot_cost = step_cost(problem, car, slot)
+    distances = grid.distances(slot, weights=weights)
+    return {position: distance - weights[grid.index(position)] + slot_cost for position, distance in distances.items()}
+
+# Compute the pattern database of a group of cars via a backward Dijkstra from the configuration where every car is in its slot
+# A configuration is a tuple of the positions of the cars in the group, and the cars in the group can not overlap
+def compute_pattern_database(problem: ParkingProblem, group: Tuple[int, ...], slots: Dict[int, Point]) -> Dict[Tuple[Point, ...], float]:
+    goal = tuple(slots[car] for car in group)
+    costs = {goal: 0}
+    # The sequence number breaks the ties so that the configurations are never compared
+    sequence = 0
+    queue = [(0, sequence, goal)]
+    vectors = [direction.to_vector() for direction in Direction]
+    while queue:
+        cost, _, configuration = heapq.heappop(queue)
+        if cost > costs[configuration]:
+            continue
+        for index, car in enumerate(group):
+            position = configuration[index]
+            previous_cost = cost + step_cost(problem, car, position)
+            for vector in vectors:
+                previous = position + vector
+                if previous not in problem.passages or previous in configuration:
+                    continue
+                previous_configuration = configuration[:index] + (previous,) + configuration[index+1:]
+                if previous_cost < costs.get(previous_configuration, float('inf')):
+                    costs[previous_configuration] = previous_cost
+                    sequence += 1
+                    heapq.heappush(queue, (previous_cost, sequence, previous_configuration))
+    return costs
+
+def compute_heuristic_tables(problem: ParkingProblem) -> ParkingHeuristicTables:
+    slots = get_car_slots(problem)
+    cars = range(len(problem.cars))
+    car_costs = tuple(compute_car_costs(problem, car, slots[car]) if car in slots else {} for car in cars)
+    # The cars are grouped in index order, and a group is only used if its database is small enough
+    groups, ungrouped = [], []
+    for start in range(0, len(cars), PATTERN_GROUP_SIZE):
+        group = tuple(car for car in cars[start:start + PATTERN_GROUP_SIZE] if car in slots)
+        if len(group) > 1 and len(problem.passages) ** len(group) <= MAX_PATTERN_ENTRIES:
+            groups.append(group)
+        else:
+            ungrouped.extend(group)
+    databases = tuple(compute_pattern_database(problem, group, slots) for group in groups)
+    car_groups = [-1] * len(cars)
+    for index, group in enumerate(groups):
+        for car in group:
+            car_groups[car] = index
+    return ParkingHeuristicTables(car_costs, tuple(groups), databases, tuple(ungrouped), tuple(car_groups))
+
+# Return the heuristic tables of the problem from the problem cache (and compute them if they are not cached yet)
+def get_heuristic_tables(problem: ParkingProblem) -> ParkingHeuristicTables:
+    cache = problem.cache()
+    tables = cache.get("parking_heuristic_tables")
+    if tables is None:
+        tables = cache["parking_heuristic_tables"] = compute_heuristic_tables(problem)
+    return tables
+
+# The sum of the exact costs for every car to reach its slot while ignoring the other cars
+# If a car has no slot or can never reach it, the problem can not be solved and the heuristic is infinite
+def car_distance_heuristic(problem: ParkingProblem, state: ParkingState) -> float:
+    car_costs = get_heuristic_tables(problem).car_costs
+    return sum(costs.get(car, float('inf')) for costs, car in zip(car_costs, state))
+
+# The sum of the pattern databases of the groups and the exact costs of the ungrouped cars
+# It is always greater than or equal to the car distance heuristic since the cars of a group also block each other
+def pattern_database_heuristic(problem: ParkingProblem, state: ParkingState) -> float:
+    tables = get_heuristic_tables(problem)
+    total = 0
+    for group, database in zip(tables.groups, tables.databases):
+        total += database.get(tuple(state[car] for car in group), float('inf'))
+    for car in tables.ungrouped:
+        total += tables.car_costs[car].get(state[car], float('inf'))
+    return total
+
+# The incremental versions of the heuristics (see HeuristicDelta in problem.py)
+# An action moves a single car, so only the term of this car (or of its group) changes.
+# The moves are reversible, so if a car (or a group) can not reach its slot from a position, it can not reach it from the next one either,
+# which means that an infinite heuristic stays infinite.
+
+def car_distance_heuristic_delta(problem: ParkingProblem, parent: ParkingState, parent_h: float, action: ParkingAction, state: ParkingState) -> float:
+    if parent_h == float('inf'):
+        return parent_h
+    car = action[0]
+    costs = get_heuristic_tables(problem).car_costs[car]
+    return parent_h - costs[parent[car]] + costs[state[car]]
+
+def pattern_database_heuristic_delta(problem: ParkingProblem, parent: ParkingState, parent_h: float, action: ParkingAction, state: ParkingState) -> float:
+    if parent_h == float('inf'):
+        return parent_h
+    car = action[0]
+    tables = get_heuristic_tables(problem)
+    group = tables.car_groups[car]
+    if group < 0:
+        costs = tables.car_costs[car]
+        return parent_h - costs[parent[car]] + costs[state[car]]
+    cars, database = tables.groups[group], tables.databases[group]
+    return parent_h - database[tuple(parent[car] for car in cars)] + database[tuple(state[car] for car in cars)]
+
+car_distance_heuristic.heuristic_delta = car_distance_heuristic_delta
+pattern_database_heuristic.heuristic_delta = pattern_database_heuristic_delta
@@ -4,6 +4,16 @@ from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent
 from helpers.utils import fetch_recorded_calls
 import argparse, os, json
 
+# Stop collecting the search statistics then print them (and save them as JSON if desired by the user)
+def print_stats(args: argparse.Namespace):
+    import search_stats
+    stats = search_stats.stop()
+    print("Search statistics:")
+    print(stats)
+    if args.stats_json:
+        with open(args.stats_json, 'w') as f:
+            f.write(stats.to_json(indent=2))
+
 # Create an agent based on the user selections
 def create_agent(args: argparse.Namespace):
     agent_type: str = args.agent
@@ -41,6 +51,23 @@ def create_agent(args: argparse.Namespace):
     if agent_type == "gbfs":
         from search import BestFirstSearch
         return InformedSearchAgent(BestFirstSearch, graphrouting_heuristic)
+    if agent_type == "bucs":
+        from search import BidirectionalUniformCostSearch
+        return UninformedSearchAgent(BidirectionalUniformCostSearch)
+    if agent_type == "bastar":
+        from search import BidirectionalAStarSearch
+        return InformedSearchAgent(BidirectionalAStarSearch, graphrouting_heuristic)
+    if agent_type == "portfolio":
+        from search import BreadthFirstSearch, UniformCostSearch, AStarSearch, BidirectionalAStarSearch
+        from portfolio import PortfolioStrategy, portfolio_search
+        # BFS ignores the edge costs, so its solution is not guaranteed to be optimal
+        args.portfolio = portfolio_search([
+            PortfolioStrategy("bfs", BreadthFirstSearch, optimal=False),
+            PortfolioStrategy("ucs", UniformCostSearch),
+            PortfolioStrategy("astar", AStarSearch, graphrouting_heuristic),
+            PortfolioStrategy("bastar", BidirectionalAStarSearch, graphrouting_heuristic),
+        ], optimal=not args.any_solution)
+        return UninformedSearchAgent(args.portfolio)
     print(f"Requested Agent '{agent_type}' is invalid")
     exit(-1)
 
@@ -61,6 +88,15 @@ def main(args: argparse.Namespace):
         print(figure)
     print("Current Node:", state)
     agent = create_agent(args)
+    # If desired by the user, the search agents reuse the solutions stored by the previous runs
+    if args.solution_cache and isinstance(agent, (UninformedSearchAgent, InformedSearchAgent)):
+        from solution_cache import SolutionCache
+        agent.solution_cache = SolutionCache(args.solution_cache, args.cache_size)
+        agent.cache_name = args.agent + (":any" if args.any_solution else "")
+    # If desired by the user, the search engine collects statistics until the game ends
+    if args.stats:
+        import search_stats
+        search_stats.start()
     step = 0 # This will store the current step
     path_cost = 0 # This will store the total path cost
     traversed_nodes = [] # This will store all the traversed nodes in order of traversal
@@ -90,8 +126,13 @@ def main(args: argparse.Namespace):
     if not unsolvable: print("YOU WON!!")
     print("Path Cost:", path_cost)
     # This was a search agent, display the traversed nodes
-    if not isinstance(agent, HumanAgent):
+    # The portfolio agent searches in other processes, so only the winner is displayed
+    if args.agent == "portfolio":
+        print(f"Portfolio winner: {args.portfolio.winner}")
+    elif not isinstance(agent, HumanAgent):
         print(f"Traversal Order: {'->'.join(traversed_nodes)}")
+    if args.stats:
+        print_stats(args)
     # Finally print the elapsed time for the whole process
     print(f"Elapsed time: {time.time() - start} seconds")
 
@@ -100,8 +141,18 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Graph as Human or AI")
     parser.add_argument("graph", help="path to the graph to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs'],
+                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs', 'bucs', 'bastar', 'portfolio'],
                         help="the agent that will play the game")
+    parser.add_argument("--any-solution", "-as", action="store_true",
+                        help="Let the portfolio agent return the first solution of any strategy instead of the first optimal one")
+    parser.add_argument("--stats", "-st", action="store_true",
+                        help="Collect and print the statistics of the search engine (expanded and generated nodes, frontier size, times and memory)")
+    parser.add_argument("--stats-json", "-sj", default=None,
+                        help="the path of a JSON file in which the search statistics are saved (requires --stats)")
+    parser.add_argument("--solution-cache", "-sc", default=None,
+                        help="the path of a database in which the search agents store their solutions to reuse them in the next runs")
+    parser.add_argument("--cache-size", "-cs", type=int, default=2**16,
+                        help="the maximum number of solutions in the solution cache (the least recently used ones are removed first)")
 
     args = parser.parse_args()
     try:
@@ -1,8 +1,9 @@
 from typing import List
-from sokoban import SokobanProblem, Direction, SokobanState, SokobanTile
+from sokoban import SokobanProblem, Direction, SokobanState, SokobanTile, PackedSokobanProblem
 from agents import HumanAgent, UninformedSearchAgent, InformedSearchAgent
 from helpers.utils import fetch_tracked_call_count
 from helpers.heuristic_checks import test_heuristic_consistency
+from problem import unpacked_heuristic
 from functools import lru_cache
 import argparse, time
 
@@ -18,18 +19,39 @@ def colored_sokoban(level: str):
     return level
 
 # Return the heuristic selected by the user
-def get_heuristic(name: str):
+# If the problem uses packed states, the heuristic is adapted to unpack the states before calling it
+def get_heuristic(name: str, packed: bool = False):
     if name == "zero":
         return lambda *_: 0
     if name == "weak":
         from sokoban_heuristic import weak_heuristic
-        return weak_heuristic
+        return unpacked_heuristic(weak_heuristic) if packed else weak_heuristic
     if name == "strong":
         from sokoban_heuristic import strong_heuristic
-        return strong_heuristic
+        return unpacked_heuristic(strong_heuristic) if packed else strong_heuristic
     print(f"Requested Heuristic '{name}' is invalid")
     exit(-1)
 
+# If desired by the user, we track every transition and check for the heuristic consistency for each transition
+def add_consistency_checks(args: argparse.Namespace, heuristic):
+    if not args.checks:
+        return
+    if args.packed:
+        describe = lambda state: str(args.problem.unpack(state))
+        PackedSokobanProblem.get_successor = test_heuristic_consistency(heuristic, describe)(PackedSokobanProblem.get_successor)
+    else:
+        SokobanProblem.get_successor = test_heuristic_consistency(heuristic)(SokobanProblem.get_successor)
+
+# Stop collecting the search statistics then print them (and save them as JSON if desired by the user)
+def print_stats(args: argparse.Namespace):
+    import search_stats
+    stats = search_stats.stop()
+    print("Search statistics:")
+    print(stats)
+    if args.stats_json:
+        with open(args.stats_json, 'w') as f:
+            f.write(stats.to_json(indent=2))
+
 # Create an agent based on the user selections
 def create_agent(args: argparse.Namespace):
     agent_type: str = args.agent
@@ -62,19 +84,47 @@ def create_agent(args: argparse.Namespace):
     if agent_type == "astar":
         from search import AStarSearch
         # We cache the heuristic calls to speed up the search process if the heuristic is not fast
-        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic))
-        # If desired by the user, we track every transition and check for the heuristic consistency for each transition
-        if args.checks:
-            SokobanProblem.get_successor = test_heuristic_consistency(heuristic)(SokobanProblem.get_successor)
+        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic, args.packed))
+        add_consistency_checks(args, heuristic)
         return InformedSearchAgent(AStarSearch, heuristic)
     if agent_type == "gbfs":
         from search import BestFirstSearch
         # We cache the heuristic calls to speed up the search process if the heuristic is not fast
-        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic))
-        # If desired by the user, we track every transition and check for the heuristic consistency for each transition
-        if args.checks:
-            SokobanProblem.get_successor = test_heuristic_consistency(heuristic)(SokobanProblem.get_successor)
+        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic, args.packed))
+        add_consistency_checks(args, heuristic)
         return InformedSearchAgent(BestFirstSearch, heuristic)
+    if agent_type == "idastar":
+        from search import IterativeDeepeningAStar
+        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic, args.packed))
+        # The node budget bounds the size of the transposition table
+        return InformedSearchAgent(lambda problem, state, heuristic: IterativeDeepeningAStar(problem, state, heuristic, args.node_budget, stats=args.search_stats), heuristic)
+    if agent_type == "smastar":
+        from search import SimplifiedMemoryBoundedAStar
+        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic, args.packed))
+        # The node budget bounds the number of search tree nodes in memory
+        return InformedSearchAgent(lambda problem, state, heuristic: SimplifiedMemoryBoundedAStar(problem, state, heuristic, args.node_budget, stats=args.search_stats), heuristic)
+    if agent_type == "arastar":
+        from search import AnytimeRepairingAStar
+        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic, args.packed))
+        # The search returns the best solution found within the time budget
+        arastar = lambda problem, state, heuristic, **kwargs: AnytimeRepairingAStar(problem, state, heuristic, stats=args.search_stats, **kwargs)
+        return InformedSearchAgent(arastar, heuristic, time_budget=args.time_budget)
+    if agent_type == "beam":
+        from search import BeamSearch
+        heuristic = lru_cache(2**16)(get_heuristic(args.heuristic, args.packed))
+        beam_search = lambda problem, state, heuristic, **kwargs: BeamSearch(problem, state, heuristic, beam_width=args.beam_width, stats=args.search_stats, **kwargs)
+        return InformedSearchAgent(beam_search, heuristic, time_budget=args.time_budget)
+    if agent_type == "portfolio":
+        from search import BreadthFirstSearch, AStarSearch
+        from sokoban_heuristic import weak_heuristic, strong_heuristic
+        from portfolio import PortfolioStrategy, portfolio_search
+        # BFS is only optimal if every action costs 1, which is not the case for the pushes
+        args.portfolio = portfolio_search([
+            PortfolioStrategy("bfs", BreadthFirstSearch, optimal=not args.push_level),
+            PortfolioStrategy("astar-weak", AStarSearch, weak_heuristic),
+            PortfolioStrategy("astar-strong", AStarSearch, strong_heuristic),
+        ], optimal=not args.any_solution)
+        return UninformedSearchAgent(args.portfolio)
     print(f"Requested Agent '{agent_type}' is invalid")
     exit(-1)
 
@@ -83,15 +133,50 @@ def main(args: argparse.Namespace):
     if args.ansicolors: state_printer = lambda state: print(colored_sokoban(str(state)))
     start = time.time() # Track run time
     problem = SokobanProblem.from_file(args.level) # create the problem
+    if args.packed:
+        # The search runs on packed states, which are unpacked for printing
+        problem = args.problem = PackedSokobanProblem(problem)
+        state_printer = lambda state, printer=state_printer: printer(problem.unpack(state))
+    if args.zobrist:
+        # The search engine keys the states by their Zobrist keys (and checks every key if requested)
+        from zobrist import ZobristSokobanProblem
+        problem = ZobristSokobanProblem(problem, check_keys=(args.zobrist == "check"))
+    if args.symmetry:
+        # The search engine keys the states by their canonical keys so that the mirrored copies of a state are only explored once
+        from sokoban_symmetry import SymmetricSokobanProblem
+        problem = SymmetricSokobanProblem(problem)
+        print(f"Layout symmetries: {len(problem.automorphisms)}")
     state = problem.get_initial_state() # Get the initial state
     print("Initial State:")
     state_printer(state)
+    # If desired by the user, the search engine collects statistics until the game ends
+    # Otherwise, the memory bounded and the anytime searches still record their peak frontier size and bound in their own statistics
+    import search_stats
+    if args.stats:
+        search_stats.start()
+    args.search_stats = search_stats.active or search_stats.SearchStats()
     agent = create_agent(args)
+    # If desired by the user, the search agents search over crate pushes then expand them into primitive moves
+    explored_counter = type(problem).get_actions
+    if args.push_level and isinstance(agent, (UninformedSearchAgent, InformedSearchAgent)):
+        from sokoban_push import SokobanPushProblem, push_level_search
+        agent.search_fn = push_level_search(agent.search_fn)
+        explored_counter = SokobanPushProblem.get_actions
+    # If desired by the user, the search agents reuse the solutions stored by the previous runs
+    if args.solution_cache and isinstance(agent, (UninformedSearchAgent, InformedSearchAgent)):
+        from solution_cache import SolutionCache
+        agent.solution_cache = SolutionCache(args.solution_cache, args.cache_size)
+        agent.cache_name = f"{args.agent}:{args.heuristic}" + (":push-level" if args.push_level else "") + (":any" if args.any_solution else "")
+        # The solutions of the memory bounded and the anytime searches depend on their budgets
+        if args.agent in ("idastar", "smastar"):
+            agent.cache_name += f":{args.node_budget}"
+        if args.agent in ("arastar", "beam"):
+            agent.cache_name += f":{args.time_budget}s" + (f":{args.beam_width}" if args.agent == "beam" else "")
     step = 0 # This will store the current step
     total_explored_nodes = 0 # This will store the number of traversed nodes during search
     unsolvable = False # This will store whether the problem is unsolvable or not
     while not problem.is_goal(state):
-        fetch_tracked_call_count(SokobanProblem.is_goal) # Clear the call counter
+        fetch_tracked_call_count(explored_counter) # Clear the call counter
         action = agent.act(problem, state) # Request an action from the agent
         # If no solution was found, break
         if action is None:
@@ -99,7 +184,7 @@ def main(args: argparse.Namespace):
             unsolvable = True
             break
         # Get the number of traversed nodes
-        total_explored_nodes += fetch_tracked_call_count(SokobanProblem.is_goal)
+        total_explored_nodes += fetch_tracked_call_count(explored_counter)
         # Apply the action to the state
         state = problem.get_successor(state, action)
         step += 1
@@ -117,6 +202,17 @@ def main(args: argparse.Namespace):
     # This was a search agent, display the number of traversed nodes
     if not isinstance(agent, HumanAgent):
         print(f"Search explored {total_explored_nodes} nodes")
+    # The memory bounded searches also report the peak size of their frontier
+    if args.agent in ("idastar", "smastar"):
+        print(f"Peak frontier size: {args.search_stats.peak_frontier_size} nodes")
+    # The anytime searches also report how far their solution can be from the optimal one
+    # (no search runs if the solution is taken from the cache)
+    if args.agent in ("arastar", "beam") and args.search_stats.bound is not None:
+        print(f"Suboptimality bound: {args.search_stats.bound:.3f}")
+    if args.agent == "portfolio":
+        print(f"Portfolio winner: {args.portfolio.winner}")
+    if args.stats:
+        print_stats(args)
     # Finally print the elapsed time for the whole process
     print(f"Elapsed time: {time.time() - start} seconds")
 
@@ -126,17 +222,51 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Sokoban as Human or AI")
     parser.add_argument("level", help="path to the sokoban level to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs'],
+                        choices=['human', 'bfs', 'dfs', 'ucs', 'astar', 'gbfs', 'idastar', 'smastar', 'arastar', 'beam', 'portfolio'],
                         help="the agent that will play the game")
     parser.add_argument("--heuristic", '-hf', default="zero",
                         choices=["zero", "weak", "strong"],
-                        help="choose the heuristic to use with A* or Greedy Best First Search")
+                        help="choose the heuristic to use with A*, IDA*, SMA* or Greedy Best First Search")
+    parser.add_argument("--node-budget", "-nb", type=int, default=2**16,
+                        help="the memory budget (in nodes) of IDA* (transposition table size) and SMA* (search tree size)")
+    parser.add_argument("--time-budget", "-tb", type=float, default=None,
+                        help="the time budget (in seconds) of the anytime searches (arastar and beam), they return the best solution found in time")
+    parser.add_argument("--beam-width", "-bw", type=int, default=100,
+                        help="the number of states kept in every layer of the beam search")
+    parser.add_argument("--any-solution", "-as", action="store_true",
+                        help="Let the portfolio agent return the first solution of any strategy instead of the first optimal one")
     parser.add_argument("--checks", "-c", action='store_true', default=False,
                         help="Enable consistency checks for the heuristic")
+    parser.add_argument("--packed", "-p", action="store_true",
+                        help="Search over packed states (cell indices and bit masks) instead of sets of points")
+    parser.add_argument("--push-level", "-pl", action="store_true",
+                        help="Search over crate pushes (the walking between pushes is folded into the push cost) instead of single steps")
+    parser.add_argument("--zobrist", "-z", choices=["on", "check"],
+                        help="Key the explored states by incremental Zobrist hashes ('check' also verifies every key and detects collisions)")
+    parser.add_argument("--symmetry", "-sy", action="store_true",
+                        help="Detect the rotations and reflections of the layout and explore only one of the mirrored copies of every state")
+    parser.add_argument("--solution-cache", "-sc", default=None,
+                        help="the path of a database in which the search agents store their solutions to reuse them in the next runs")
+    parser.add_argument("--cache-size", "-cs", type=int, default=2**16,
+                        help="the maximum number of solutions in the solution cache (the least recently used ones are removed first)")
+    parser.add_argument("--stats", "-st", action="store_true",
+                        help="Collect and print the statistics of the search engine (expanded and generated nodes, frontier size, times and memory)")
+    parser.add_argument("--stats-json", "-sj", default=None,
+                        help="the path of a JSON file in which the search statistics are saved (requires --stats)")
     parser.add_argument("--ansicolors", "-ac", action="store_true",
                         help="Print the level on the console with ANSI colors (only works on some terminals)")
 
     args = parser.parse_args()
+    if args.packed and args.push_level:
+        parser.error("--packed and --push-level can not be used together")
+    if args.packed and args.agent == "portfolio":
+        parser.error("--packed can not be used with the portfolio agent (the packed heuristics can not be sent to the worker processes)")
+    if args.packed and args.zobrist:
+        parser.error("--packed and --zobrist can not be used together")
+    if args.push_level and (args.zobrist or args.symmetry):
+        parser.error("--push-level can not be used with --zobrist or --symmetry (the push-level search builds its own problem from the level)")
+    if args.symmetry and (args.packed or args.zobrist):
+        parser.error("--symmetry can not be used with --packed or --zobrist (the canonical keys replace the other keys)")
     try:
         main(args)
     except KeyboardInterrupt:
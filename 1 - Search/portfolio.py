@@ -0,0 +1,100 @@
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+import multiprocessing, queue
+
+from problem import HeuristicFunction, Problem, S, A, Solution
+from helpers.utils import fetch_recorded_calls, fetch_tracked_call_count
+
+# This file contains a portfolio solver which runs several search strategies in parallel on the same problem
+# Which strategy finishes first depends on the problem (e.g. BFS may beat A* with a slow heuristic on small levels),
+# so instead of guessing, every strategy runs in its own process and the first useful answer wins.
+# The strategies (the search functions and the heuristics) and the problem are sent to the worker processes,
+# so they must be picklable (module level functions are, but lambdas and closures are not).
+
+# A strategy of the portfolio
+# name: the name used to report the winner
+# search_fn: a function from search.py
+# heuristic: the heuristic passed to the search function (None for uninformed search functions)
+# optimal: whether the search function is guaranteed to return an optimal solution for the problem
+@dataclass(frozen=True)
+class PortfolioStrategy:
+    name: str
+    search_fn: Callable[..., Solution]
+    heuristic: Optional[HeuristicFunction] = None
+    optimal: bool = True
+
+# Return and clear the number of calls of a function decorated with track_call_count or record_calls (0 otherwise)
+def fetch_call_count(fn: Callable) -> int:
+    calls = getattr(fn, "calls", None)
+    if isinstance(calls, int):
+        return fetch_tracked_call_count(fn)
+    if calls is not None:
+        return len(fetch_recorded_calls(fn))
+    return 0
+
+# Run a strategy in a worker process and return its solution and the number of get_actions calls
+def run_strategy(problem: Problem[S, A], initial_state: S, strategy: PortfolioStrategy) -> Tuple[Solution, int]:
+    counter = type(problem).get_actions
+    fetch_call_count(counter)
+    if strategy.heuristic is None:
+        solution = strategy.search_fn(problem, initial_state)
+    else:
+        solution = strategy.search_fn(problem, initial_state, strategy.heuristic)
+    return solution, fetch_call_count(counter)
+
+# Create a search function (problem, initial_state) -> solution that runs the given strategies in parallel
+# If "optimal" is True, the search returns the first solution found by an optimal strategy,
+# otherwise, it returns the first solution found by any strategy.
+# Since all the strategies are complete, the first strategy that finds no solution proves that there is none.
+# A strategy that fails with an exception (e.g. a bidirectional search on a problem that can not be reversed) is ignored,
+# unless all the strategies fail, in which case the first exception is raised.
+# The winner's name and its number of expanded nodes are stored in the attributes "winner" and "expanded_nodes" of the returned function
+# and the expanded nodes are also added to the tracked call count of the problem's get_actions (if it is tracked),
+# so that the caller can count them as if the winner ran in this process.
+def portfolio_search(strategies: List[PortfolioStrategy], optimal: bool = True, max_workers: Optional[int] = None) -> Callable[[Problem[S, A], S], Solution]:
+    def search(problem: Problem[S, A], initial_state: S) -> Solution:
+        search.winner, search.expanded_nodes = None, 0
+        pool = multiprocessing.Pool(max_workers or len(strategies))
+        # The callbacks run in a thread of this process and put (strategy index, result, exception) in the queue when a strategy is done
+        finished = queue.Queue()
+        try:
+            for index, strategy in enumerate(strategies):
+                pool.apply_async(run_strategy, (problem, initial_state, strategy),
+                                 callback=lambda result, index=index: finished.put((index, result, None)),
+                                 error_callback=lambda exception, index=index: finished.put((index, None, exception)))
+            # The best answer so far from a strategy that is not optimal (used if no optimal strategy succeeds)
+            fallback: Optional[Tuple[PortfolioStrategy, Solution, int]] = None
+            error: Optional[BaseException] = None
+            remaining = len(strategies)
+            while remaining:
+                # The strategies that are done at the same time are checked in the order of the list
+                done = [finished.get()]
+                while not finished.empty():
+                    done.append(finished.get())
+                remaining -= len(done)
+                for index, result, exception in sorted(done, key=lambda item: item[0]):
+                    strategy = strategies[index]
+                    if exception is not None:
+                        error = error or exception
+                        continue
+                    solution, expanded = result
+                    if solution is None or strategy.optimal or not optimal:
+                        return report(search, problem, strategy, solution, expanded)
+                    fallback = fallback or (strategy, solution, expanded)
+            if fallback is not None:
+                return report(search, problem, *fallback)
+            raise error
+        finally:
+            # The pool has no way to cancel a running task, so the strategies that are still running are stopped with their workers
+            pool.terminate()
+            pool.join()
+    search.winner, search.expanded_nodes = None, 0
+    return search
+
+# Store the result of the winning strategy on the search function and return its solution
+def report(search: Callable, problem: Problem[S, A], strategy: PortfolioStrategy, solution: Solution, expanded: int) -> Solution:
+    search.winner, search.expanded_nodes = strategy.name, expanded
+    counter = type(problem).get_actions
+    if isinstance(getattr(counter, "calls", None), int):
+        counter.calls += expanded
+    return solution
@@ -0,0 +1,74 @@
+from typing import Any, Dict, Generic, Hashable, List, Tuple, TypeVar
+import heapq, itertools
+
+# T is the type of the items stored in the queue (they must be hashable since they are used as dictionary keys)
+T = TypeVar("T", bound=Hashable)
+
+# This is a min priority queue that holds at most one live entry per item
+# It keeps an index from every queued item to its heap entry so that:
+#   - pushing an item that is already queued with an equal or higher priority does nothing
+#   - pushing it with a strictly lower priority decreases its key (decrease-key)
+# Decrease-key is done by invalidating the old entry and pushing a new one (as recommended by the heapq docs)
+# since re-heapifying in place would need a heap written in python which is slower than the builtin heapq.
+# So the heap can only grow past the number of queued items by the number of decrease-key operations,
+# while a plain heapq frontier grows by every rediscovery of a queued item.
+# Priorities can be any comparable values, the search engine uses (priority, order) tuples
+# where the order is a counter that breaks ties in favor of the item that was enqueued first.
+# Items are identified by a key which is the item itself unless another key is given to "push"
+# (the search engine pushes (state, key) pairs identified by the state key).
+class IndexedPriorityQueue(Generic[T]):
+    def __init__(self) -> None:
+        # Each heap entry is a list [priority, sequence, item, live, key]
+        # The sequence number guarantees that two entries never compare their items
+        self.heap: List[List[Any]] = []
+        self.entries: Dict[T, List[Any]] = {}
+        self.sequence = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __bool__(self) -> bool:
+        return len(self.entries) > 0
+
+    def __contains__(self, item: T) -> bool:
+        return item in self.entries
+
+    # Returns the current priority of a queued item given its key
+    def priority(self, key: Hashable) -> Any:
+        return self.entries[key][0]
+
+    # Adds the item if it is not queued, otherwise decreases its priority if the new one is strictly lower
+    # Returns True if the item was added or its priority was decreased, and False if the queue was not changed
+    def push(self, item: T, priority: Any, key: Hashable = None) -> bool:
+        if key is None:
+            key = item
+        entry = self.entries.get(key)
+        if entry is not None:
+            if not priority < entry[0]:
+                return False
+            # The old entry stays in the heap but it will be skipped when it reaches the top
+            entry[3] = False
+        entry = [priority, next(self.sequence), item, True, key]
+        self.entries[key] = entry
+        heapq.heappush(self.heap, entry)
+        return True
+
+    # Returns the item with the lowest priority as a tuple (item, priority) without removing it
+    def peek(self) -> Tuple[T, Any]:
+        heap = self.heap
+        # Discard the invalidated entries on the top of the heap
+        while heap and not heap[0][3]:
+            heapq.heappop(heap)
+        if not heap:
+            raise IndexError("peek from an empty priority queue")
+        return heap[0][2], heap[0][0]
+
+    # Removes and returns the item with the lowest priority as a tuple (item, priority)
+    def pop(self) -> Tuple[T, Any]:
+        heap = self.heap
+        while heap:
+            priority, _, item, live, key = heapq.heappop(heap)
+            if live:
+                del self.entries[key]
+                return item, priority
+        raise IndexError("pop from an empty priority queue")
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Callable, Generic, Iterable, List, TypeVar, Union
+from typing import Any, Callable, Generic, Hashable, Iterable, List, Tuple, TypeVar, Union
 from helpers.utils import CacheContainer, with_cache
 
 # S and A are used for generic typing where S represents the state type and A represents the action type
@@ -34,8 +34,71 @@ class Problem(ABC, Generic[S, A], CacheContainer):
     def get_cost(self, state: S, action: A) -> float:
         return 1.0
 
+    # The search engine keys its explored and parent tables by the keys returned from the following 2 functions
+    # By default, the key of a state is the state itself, but a problem can opt in to incremental (Zobrist) hashing
+    # by returning an int that is updated from the key of the parent state (see zobrist.py)
+
+    # This function returns the key of the given state (it is only called for the initial state)
+    def get_state_key(self, state: S) -> Hashable:
+        return state
+
+    # Given a state, its key, an action and the successor returned by get_successor, this function returns the key of the successor
+    def get_successor_key(self, state: S, key: Hashable, action: A, successor: S) -> Hashable:
+        return successor
+
+    # Problems with symmetries can override this function to return the same key for all the states that are equivalent
+    # by a symmetry (e.g. mirrored sokoban states), as long as equivalent states have the same cost to reach a goal.
+    # The search engine then keys its tables by these keys instead of the keys above, so only one of the equivalent states is explored.
+    # By default, it returns None which means that the problem has no symmetries (see get_key_functions)
+    def canonical(self, state: S) -> Union[Hashable, None]:
+        return None
+
+    # This function returns a text that describes everything that defines the problem except the initial state
+    # (2 problems have the same fingerprint if and only if they have the same states, actions and costs).
+    # It is used to store and share the solutions between runs (see solution_cache.py)
+    # By default, it returns None which means that the solutions of the problem can not be shared
+    def get_fingerprint(self) -> Union[str, None]:
+        return None
+
+    # These functions convert an action to a value that can be written as JSON (strings, numbers and lists) and back.
+    # They are used to store the solutions (see solution_cache.py), so decode_action(encode_action(action)) must be equal to the action.
+    # By default, the actions are stored as they are, which only works for actions that are strings or numbers
+    def encode_action(self, action: A) -> Any:
+        return action
+
+    def decode_action(self, value: Any) -> A:
+        return value
+
 # These are type aliases for:
 # A solution which is a list of actions (or None if no solution is found)
 Solution = Union[List[A], None]
 # A heuristic function which estimates the path cost to the goal for a given state with a certain problem
-HeuristicFunction = Callable[[Problem[S, A], S],float]
\ No newline at end of file
+HeuristicFunction = Callable[[Problem[S, A], S],float]
+
+# A heuristic function can optionally have an attribute "heuristic_delta" which is a function of this type
+# It receives (problem, parent_state, parent_h, action, child_state) where parent_h is the heuristic of the parent state
+# and returns the heuristic of the child state (the same value the heuristic function would return for it).
+# Since an action only changes a small part of the state, this is usually much cheaper than computing the heuristic from scratch.
+# The search engine uses it when it is available (see get_heuristic_delta)
+HeuristicDelta = Callable[[Problem[S, A], S, float, A, S], float]
+
+# Returns the heuristic delta function of the given heuristic (or None if it does not have one)
+def get_heuristic_delta(heuristic: HeuristicFunction) -> Union[HeuristicDelta, None]:
+    return getattr(heuristic, "heuristic_delta", None)
+
+# Returns the functions (state_key, successor_key) that the search engine uses to key its tables
+# If the problem has symmetries (canonical returns a key for the initial state), the states are keyed by their canonical keys,
+# otherwise, they are keyed by get_state_key and get_successor_key
+def get_key_functions(problem: Problem[S, A], initial_state: S) -> Tuple[Callable[[S], Hashable], Callable[[S, Hashable, A, S], Hashable]]:
+    if problem.canonical(initial_state) is None:
+        return problem.get_state_key, problem.get_successor_key
+    canonical = problem.canonical
+    return canonical, lambda state, key, action, successor: canonical(successor)
+
+# Adapt a heuristic written for a problem so that it can be used with a packed version of the problem
+# The packed problem must hold the original problem in "problem" and convert its states back with "unpack"
+# (see PackedSokobanProblem and PackedParkingProblem)
+def unpacked_heuristic(heuristic: HeuristicFunction) -> HeuristicFunction:
+    def packed_heuristic(problem: Problem[S, A], state: S) -> float:
+        return heuristic(problem.problem, problem.unpack(state))
+    return packed_heuristic
\ No newline at end of file
@@ -1,9 +1,13 @@
-from problem import HeuristicFunction, Problem, S, A, Solution
+from problem import HeuristicFunction, Problem, S, A, Solution, get_heuristic_delta, get_key_functions
 from collections import deque
+from typing import Callable, Dict, Generic, List, Optional, Sequence, Set, Tuple
+from dataclasses import dataclass, field
 from helpers.utils import NotImplemented
 
 #TODO: Import any modules you want to use
-import heapq
+from priority_queue import IndexedPriorityQueue
+import heapq, itertools, time
+import search_stats
 
 # All search functions take a problem and a state
 # If it is an informed search function, it will also receive a heuristic function
@@ -13,195 +17,678 @@ import heapq
 # 1. A list of actions which represent the path from the initial state to the final state
 # 2. None if there is no solution
 
+# The parent table maps every reached state to the (parent state, action) pair through which it was reached
+# The initial state is mapped to None since it is the root of the search tree
+# The engine keys its tables by "problem.get_state_key" which is the state itself unless the problem provides Zobrist keys
+# or canonical keys (see get_key_functions in problem.py), in which case the parent table maps the key of every reached state
+# to the (key of the parent, action) pair
+ParentTable = Dict[S, Optional[Tuple[S, A]]]
+
+# Follow the parent pointers from the given state (or key) back to the root and return the actions along the way
+# The actions are collected in reverse then flipped once, so the reconstruction is linear in the path length
+def backtrack(parents: ParentTable, state: S) -> List[A]:
+    actions = []
+    link = parents[state]
+    while link is not None:
+        state, action = link
+        actions.append(action)
+        link = parents[state]
+    actions.reverse()
+    return actions
+
+# A priority function receives the path cost of a state from the initial state (g) and its heuristic (h)
+# and returns the value by which the frontier is ordered (lower values are expanded first)
+PriorityFunction = Callable[[float, float], float]
+
+# This is the engine shared by Uniform Cost Search, A* Search and Greedy Best First Search
+# They only differ by the priority function used to order the frontier (and the heuristic, which is 0 for UCS)
+# The frontier is an indexed priority queue that holds at most one entry per state, keyed by (priority, order)
+# where the order is a counter used as a priority fallback in case 2 nodes have the same priority
+# (the earlier discovered node is expanded first)
+# The heuristic of every frontier state is kept, so if the heuristic has a "heuristic_delta" function (see problem.py),
+# the heuristic of a successor is computed from the heuristic of its parent instead of from scratch.
+# The engine reports its statistics to "search_stats.active" if they are being collected (see search_stats.py)
+def GraphSearch(problem: Problem[S, A], initial_state: S, priority: PriorityFunction, heuristic: Optional[HeuristicFunction] = None) -> Solution:
+    if heuristic is None:
+        heuristic = lambda problem, state: 0
+    heuristic_delta = get_heuristic_delta(heuristic)
+    get_actions, get_successor = problem.get_actions, problem.get_successor
+    stats = search_stats.active
+    if stats is not None:
+        stats.searches += 1
+        get_actions, get_successor = stats.time_successors(get_actions), stats.time_successors(get_successor)
+        heuristic = stats.time_heuristic(heuristic)
+        if heuristic_delta is not None:
+            heuristic_delta = stats.time_heuristic(heuristic_delta)
+    state_key, successor_key = get_key_functions(problem, initial_state)
+    initial_key = state_key(initial_state)
+    parents: ParentTable = {initial_key: None}
+    # The path cost (g) of the best known path to every state in the frontier
+    costs: Dict[S, float] = {initial_key: 0}
+    # The heuristic (h) of every state in the frontier
+    initial_heuristic = heuristic(problem, initial_state)
+    heuristics: Dict[S, float] = {initial_key: initial_heuristic}
+    explored = set()
+    order = 0
+    # The frontier holds (state, key) pairs identified by the key
+    frontier = IndexedPriorityQueue()
+    frontier.push((initial_state, initial_key), (priority(0, initial_heuristic), order), initial_key)
+    while frontier:
+        (state, key), _ = frontier.pop()
+        cost = costs.pop(key)
+        state_heuristic = heuristics.pop(key)
+        explored.add(key)
+        # The goal test is done on expansion, since a cheaper path to the goal may still be in the frontier
+        if problem.is_goal(state):
+            return backtrack(parents, key)
+        actions = get_actions(state)
+        if stats is not None:
+            # Every successful push adds one entry to the heap, so the difference in the heap size is the number of added successors
+            actions, heap_size = list(actions), len(frontier.heap)
+        for action in actions:
+            successor = get_successor(state, action)
+            key_of_successor = successor_key(state, key, action, successor)
+            if key_of_successor in explored:
+                continue
+            successor_cost = cost + problem.get_cost(state, action)
+            if heuristic_delta is None:
+                successor_heuristic = heuristic(problem, successor)
+            else:
+                successor_heuristic = heuristic_delta(problem, state, state_heuristic, action, successor)
+            order += 1
+            # The push only succeeds if the successor is new or the new path has a strictly lower priority,
+            # so ties keep the entry (and the parent) that was discovered first
+            if frontier.push((successor, key_of_successor), (priority(successor_cost, successor_heuristic), order), key_of_successor):
+                costs[key_of_successor] = successor_cost
+                heuristics[key_of_successor] = successor_heuristic
+                parents[key_of_successor] = (key, action)
+        if stats is not None:
+            stats.record_expansion(len(actions), len(frontier.heap) - heap_size, len(frontier))
+    return None
+
 def BreadthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
     #TODO: ADD YOUR CODE HERE
-    # NotImplemented()
-    # print('BFS', problem)
     if problem.is_goal(initial_state):
         return []
-    explored = { initial_state: True }
-    child_parent = {}
-    queue = [initial_state]
-    while len(queue) > 0:
-        state = queue.pop(0)
-        # print('STATE:', state)
-        
-        for action in problem.get_actions(state):
-            # print('ACTION:', action)
-            successor = problem.get_successor(state, action)
-            if successor in explored:
+    get_actions, get_successor = problem.get_actions, problem.get_successor
+    stats = search_stats.active
+    if stats is not None:
+        stats.searches += 1
+        get_actions, get_successor = stats.time_successors(get_actions), stats.time_successors(get_successor)
+    state_key, successor_key = get_key_functions(problem, initial_state)
+    initial_key = state_key(initial_state)
+    # Every state in the parent table has been reached, so it doubles as the explored set
+    parents: ParentTable = {initial_key: None}
+    # A deque gives an O(1) pop from the front of the FIFO queue, it holds (state, key) pairs
+    frontier = deque([(initial_state, initial_key)])
+    while frontier:
+        state, key = frontier.popleft()
+        actions = get_actions(state)
+        if stats is not None:
+            actions, reached = list(actions), len(parents)
+        for action in actions:
+            successor = get_successor(state, action)
+            key_of_successor = successor_key(state, key, action, successor)
+            if key_of_successor in parents:
                 continue
-            child_parent[successor] = (state, action)
-            if problem.is_goal(successor) == True:
-                # print('FOUND GOAL, PATH DICT:', child_parent)
-                solution_list = []
-                node = successor
-                while node in child_parent and node != initial_state:
-                    node, _action = child_parent[node]
-                    solution_list.insert(0, _action)
-                # print('SOLUTION:', solution_list)
-                return solution_list
-            explored[successor] = True
-            queue.append(successor)
+            parents[key_of_successor] = (key, action)
+            # All actions have the same depth increment, so the first time we reach a goal it is the shallowest one
+            if problem.is_goal(successor):
+                if stats is not None:
+                    stats.record_expansion(len(actions), len(parents) - reached, len(frontier))
+                return backtrack(parents, key_of_successor)
+            frontier.append((successor, key_of_successor))
+        if stats is not None:
+            stats.record_expansion(len(actions), len(parents) - reached, len(frontier))
     return None
 
 def DepthFirstSearch(problem: Problem[S, A], initial_state: S) -> Solution:
     #TODO: ADD YOUR CODE HERE
-    # NotImplemented()
-    # print('DFS', problem)
-    explored = {}
-    child_parent = {}
-    stack = [initial_state]
-    while len(stack) > 0:
-        state = stack.pop()
-        # print('STATE:', state)
-        if state in explored:
+    get_actions, get_successor = problem.get_actions, problem.get_successor
+    stats = search_stats.active
+    if stats is not None:
+        stats.searches += 1
+        get_actions, get_successor = stats.time_successors(get_actions), stats.time_successors(get_successor)
+    state_key, successor_key = get_key_functions(problem, initial_state)
+    initial_key = state_key(initial_state)
+    parents: ParentTable = {initial_key: None}
+    explored = set()
+    # The stack holds (state, key) pairs
+    stack = [(initial_state, initial_key)]
+    while stack:
+        state, key = stack.pop()
+        # A state can be pushed more than once before being expanded, so we skip the duplicates here
+        if key in explored:
             continue
-        explored[state] = True
-        if problem.is_goal(state) == True:
-            # print('FOUND GOAL, PATH DICT:', child_parent)
-            solution_list = []
-            node = state
-            while node in child_parent and node != initial_state:
-                node, _action = child_parent[node]
-                solution_list.insert(0, _action)
-            # print(solution_list)
-            return solution_list
-
-        for action in problem.get_actions(state):
-            # print('ACTION:', action)
-            successor = problem.get_successor(state, action)
-            if successor in explored:
+        explored.add(key)
+        if problem.is_goal(state):
+            return backtrack(parents, key)
+        actions = get_actions(state)
+        if stats is not None:
+            actions, stack_size = list(actions), len(stack)
+        for action in actions:
+            successor = get_successor(state, action)
+            key_of_successor = successor_key(state, key, action, successor)
+            if key_of_successor in explored:
                 continue
-            child_parent[successor] = (state, action)
-            stack.append(successor)
+            # The latest push is the one that will be popped first, so it also owns the parent pointer
+            parents[key_of_successor] = (key, action)
+            stack.append((successor, key_of_successor))
+        if stats is not None:
+            stats.record_expansion(len(actions), len(stack) - stack_size, len(stack))
     return None
 
-def UniformCostSearch(problem: Problem[S, A], initial_state: S) -> Solution:
-    #TODO: ADD YOUR CODE HERE
-    # NotImplemented()
-    # print('UCS', problem)
-    explored = {}
-    child_parent = {}
-    priority_queue = []
+# This holds one direction of the bidirectional search
+# sign is +1 for the forward search and -1 for the backward search, it is multiplied by the potential of the states
+@dataclass
+class SearchDirection(Generic[S, A]):
+    problem: Problem[S, A]
+    sign: int
+    costs: Dict[S, float]
+    parents: ParentTable
+    explored: Set[S]
+    frontier: IndexedPriorityQueue
+
+# This is a bidirectional version of the engine which runs a forward search from the initial state
+# and a backward search from the goal at the same time until they meet in the middle.
+# The problem should implement:
+#   - "reverse()" which returns the problem of going from the goal back to the initial state over reversed actions
+#   - "get_reverse_action(state, action)" which converts an action of the reversed problem back to an action of the problem
+# If a heuristic is given, both searches are ordered by the average of the forward and backward heuristics:
+#   p(s) = (h_forward(s) - h_backward(s)) / 2 for the forward search and -p(s) for the backward search
+# where h_backward is the heuristic applied to the reversed problem (the estimate of the cost from the initial state to s).
+# This keeps the reduced edge costs non-negative in both directions as long as the heuristic is consistent.
+# The best path found so far through a meeting state has cost mu. Since the keys of the two frontiers are lower bounds
+# on the paths that are not yet found, the search stops once top(forward) + top(backward) >= mu which keeps the path optimal.
+def BidirectionalSearch(problem: Problem[S, A], initial_state: S, heuristic: Optional[HeuristicFunction] = None) -> Solution:
+    if problem.is_goal(initial_state):
+        return []
+    reverse = problem.reverse()
+    goal_state = reverse.get_initial_state()
+    if heuristic is None:
+        potential = lambda state: 0
+    else:
+        potential = lambda state: (heuristic(problem, state) - heuristic(reverse, state)) / 2
+    directions = []
+    for side_problem, root, sign in ((problem, initial_state, 1), (reverse, goal_state, -1)):
+        frontier = IndexedPriorityQueue()
+        frontier.push(root, (sign * potential(root), 0))
+        directions.append(SearchDirection(side_problem, sign, {root: 0}, {root: None}, set(), frontier))
+    forward, backward = directions
     order = 0
-    # the order is used as a priority fallback in case 2 nodes have the same cost
-    heapq.heappush(priority_queue, (0, order, initial_state))
-    while priority_queue:
-        p, o, state = heapq.heappop(priority_queue)
-        # print('STATE:', state)
-        if state in explored:
-            continue
-        explored[state] = True
-        if problem.is_goal(state) == True:
-            # print('FOUND GOAL, PATH DICT:', child_parent)
-            solution_list = []
-            node = state
-            while node in child_parent and node != initial_state:
-                node, c, a = child_parent[node]
-                solution_list.insert(0, a)
-            # print(solution_list)
-            return solution_list
-
-        for action in problem.get_actions(state):
-            # print('ACTION:', action)
-            successor = problem.get_successor(state, action)
-            if successor in explored:
+    best_cost, meeting_state = float('inf'), None
+    while forward.frontier and backward.frontier:
+        # The stopping rule: no path through the remaining frontier states can be cheaper than the best one found
+        if forward.frontier.peek()[1][0] + backward.frontier.peek()[1][0] >= best_cost:
+            break
+        # Expand the direction with the smaller frontier to keep both search trees balanced
+        side, other = (forward, backward) if len(forward.frontier) <= len(backward.frontier) else (backward, forward)
+        state, _ = side.frontier.pop()
+        side.explored.add(state)
+        for action in side.problem.get_actions(state):
+            successor = side.problem.get_successor(state, action)
+            if successor in side.explored:
                 continue
-            cost = problem.get_cost(state, action) + p
-            if successor in child_parent:
-                _state, _cost, _action = child_parent[successor]
-                if _cost > cost:
-                    child_parent[successor] = (state, cost, action)
-            else:
-                child_parent[successor] = (state, cost, action)
-
+            successor_cost = side.costs[state] + side.problem.get_cost(state, action)
             order += 1
-            heapq.heappush(priority_queue, (cost, order, successor))
-    return None
+            if side.frontier.push(successor, (successor_cost + side.sign * potential(successor), order)):
+                side.costs[successor] = successor_cost
+                side.parents[successor] = (state, action)
+            # If the other direction already reached the successor, we found a path through it
+            if successor in other.costs and side.costs[successor] + other.costs[successor] < best_cost:
+                best_cost = side.costs[successor] + other.costs[successor]
+                meeting_state = successor
+    if meeting_state is None:
+        return None
+    # The first half of the path is read from the forward parents, the second half is read from the backward parents
+    # where every backward action is converted to the forward action that undoes it
+    actions = backtrack(forward.parents, meeting_state)
+    link = backward.parents[meeting_state]
+    while link is not None:
+        parent, action = link
+        actions.append(reverse.get_reverse_action(parent, action))
+        link = backward.parents[parent]
+    return actions
+
+def UniformCostSearch(problem: Problem[S, A], initial_state: S) -> Solution:
+    #TODO: ADD YOUR CODE HERE
+    # The frontier is ordered by the path cost only
+    return GraphSearch(problem, initial_state, lambda cost, heuristic: cost)
 
 def AStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
     #TODO: ADD YOUR CODE HERE
-    # NotImplemented()
-    # print('A* SEARCH', problem)
-    explored = {}
-    child_parent = {}
-    priority_queue = []
-    order = 0
-    h = heuristic(problem, initial_state)
-    heapq.heappush(priority_queue, (h, order, 0, initial_state))
-    while priority_queue:
-        state_f, o, _c, state = heapq.heappop(priority_queue)
-        # print('STATE:', state)
-        if state in explored:
-            continue
-        explored[state] = True
-        if problem.is_goal(state) == True:
-            # print('FOUND GOAL, PATH DICT:', child_parent)
-            solution_list = []
-            node = state
-            while node in child_parent and node != initial_state:
-                node, c, _a = child_parent[node]
-                solution_list.insert(0, _a)
-            # print(solution_list)
-            return solution_list
-        for action in problem.get_actions(state):
-            # print('ACTION:', action)
-            successor = problem.get_successor(state, action)
-            if successor in explored:
+    # The frontier is ordered by f = g + h
+    return GraphSearch(problem, initial_state, lambda cost, h: h + cost, heuristic)
+
+def BidirectionalUniformCostSearch(problem: Problem[S, A], initial_state: S) -> Solution:
+    return BidirectionalSearch(problem, initial_state)
+
+def BidirectionalAStarSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
+    return BidirectionalSearch(problem, initial_state, heuristic)
+
+# Iterative Deepening A* runs depth first searches bounded by f = g + h.
+# Each iteration raises the bound to the smallest f that exceeded the bound in the previous iteration,
+# so the first goal found is optimal if the heuristic is admissible.
+# The memory used is the current path (the stack) plus a transposition table which holds the smallest g with which
+# every state was visited in the current iteration (a state reached again with an equal or higher g is pruned).
+# The table stops growing once it holds "table_size" states, so the memory is bounded by the table size and the depth.
+# The statistics (see search_stats.py) are the given ones or the ones that are being collected (if any).
+# A state is counted as expanded once its frame leaves the stack, with the successors it pushed on the stack as the added ones,
+# and the peak stack size is recorded as the peak frontier size.
+def IterativeDeepeningAStar(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, table_size: int = 2**16,
+                            stats: Optional[search_stats.SearchStats] = None) -> Solution:
+    get_actions, get_successor = problem.get_actions, problem.get_successor
+    if stats is None:
+        stats = search_stats.active
+    if stats is not None:
+        stats.searches += 1
+        get_actions, get_successor = stats.time_successors(get_actions), stats.time_successors(get_successor)
+        heuristic = stats.time_heuristic(heuristic)
+    peak_frontier_size = 0
+    solution = None
+    bound = heuristic(problem, initial_state)
+    while solution is None and bound < float('inf'):
+        next_bound = float('inf')
+        table: Dict[S, float] = {}
+        on_path: Set[S] = set()
+        # The stack holds a frame [state, g, iterator over the remaining actions, number of actions, number of pushed successors]
+        # for every state on the current path
+        # and path[i] is the action that leads from the state of frame i to the state of frame i+1
+        stack: List[list] = []
+        path: List[A] = []
+        # Try to push a state on the stack, returns False if it is pruned
+        def enter(state: S, cost: float) -> bool:
+            nonlocal next_bound, solution
+            f = cost + heuristic(problem, state)
+            if f > bound:
+                next_bound = min(next_bound, f)
+                return False
+            if problem.is_goal(state):
+                solution = list(path)
+                return False
+            if table.get(state, float('inf')) <= cost:
+                return False
+            if state in table or len(table) < table_size:
+                table[state] = cost
+            actions = get_actions(state)
+            if stats is not None:
+                actions = list(actions)
+            stack.append([state, cost, iter(actions), len(actions) if stats is not None else 0, 0])
+            on_path.add(state)
+            return True
+        enter(initial_state, 0)
+        while stack and solution is None:
+            peak_frontier_size = max(peak_frontier_size, len(stack))
+            frame = stack[-1]
+            state, cost, actions = frame[0], frame[1], frame[2]
+            action = next(actions, None)
+            if action is None:
+                # All the actions of this state are done, so we go back to its parent
+                stack.pop()
+                on_path.discard(state)
+                if path: path.pop()
+                if stats is not None:
+                    stats.record_expansion(frame[3], frame[4], len(stack))
                 continue
-            h = heuristic(problem, successor)
-            cost = problem.get_cost(state, action) + _c
-            f = h + cost
-            if successor in child_parent:
-                parent, _f, _action = child_parent[successor]
-                if _f > f:
-                    child_parent[successor] = (state, f, action)
-            else:
-                child_parent[successor] = (state, f, action)
+            successor = get_successor(state, action)
+            # Going back to a state on the current path is a cycle which can never be part of an optimal path
+            if successor in on_path:
+                continue
+            path.append(action)
+            if enter(successor, cost + problem.get_cost(state, action)):
+                frame[4] += 1
+            elif solution is None:
+                path.pop()
+        # The states that are still on the stack when the goal is found were expanded too
+        if stats is not None:
+            for frame in reversed(stack):
+                stats.record_expansion(frame[3], frame[4], len(stack))
+        bound = next_bound
+    if stats is not None:
+        stats.peak_frontier_size = max(stats.peak_frontier_size, peak_frontier_size)
+    return solution
 
-            order += 1
-            heapq.heappush(priority_queue, (f, order, cost, successor))
-    return None
+# A node of the search tree kept by the Simplified Memory-bounded A* search
+# We disable the automatic equality implementation since nodes are compared by identity
+# "children" maps the index of an action to the child node if it is in memory,
+# and "forgotten" maps the index of an action to the backed-up f of the child if it was pruned from memory
+@dataclass(eq=False)
+class MemoryBoundedNode(Generic[S, A]):
+    state: S
+    parent: Optional['MemoryBoundedNode']
+    action_index: int
+    g: float
+    f: float
+    depth: int
+    actions: Optional[List[A]] = None
+    children: Dict[int, 'MemoryBoundedNode'] = field(default_factory=dict)
+    forgotten: Dict[int, float] = field(default_factory=dict)
+    in_frontier: bool = False
+    version: int = 0
 
-def BestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
-    #TODO: ADD YOUR CODE HERE
-    # NotImplemented()
-    # print('GREEDY BEST FIRST SEARCH', problem)
-    explored = {}
-    child_parent = {}
-    priority_queue = []
-    order = 0
-    h = heuristic(problem, initial_state)
-    heapq.heappush(priority_queue, (h, order, initial_state))
-    while priority_queue:
-        p, o, state = heapq.heappop(priority_queue)
-        # print('STATE:', state)
-        if state in explored:
-            continue
-        explored[state] = True
-        if problem.is_goal(state) == True:
-            # print('FOUND GOAL, PATH DICT:', child_parent)
-            solution_list = []
-            node = state
-            while node in child_parent and node != initial_state:
-                node, _heuristic, _action = child_parent[node]
-                solution_list.insert(0, _action)
-            # print(solution_list)
-            return solution_list
-        for action in problem.get_actions(state):
-            # print('ACTION:', action)
-            successor = problem.get_successor(state, action)
-            if successor in explored:
+# Simplified Memory-bounded A* (SMA*) keeps at most "node_budget" nodes of the search tree in memory.
+# It expands the node with the lowest f (the deepest one on ties) like A*.
+# When the memory is full, it prunes the leaf with the highest f (the shallowest one on ties),
+# and backs up its f into its parent so that the parent remembers how good its forgotten subtree was.
+# A parent with forgotten children stays in the frontier and regenerates them once they become the best option.
+# Nodes that are deeper than the budget can hold get f = infinity since their path cannot fit in memory.
+# Duplicates are only detected among the nodes in memory: a successor is skipped if a node in memory
+# already reached its state with an equal or lower path cost.
+# The statistics (see search_stats.py) are the given ones or the ones that are being collected (if any).
+# Regenerating the forgotten children of a node is counted as another expansion of the node (without a get_actions call).
+def SimplifiedMemoryBoundedAStar(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction, node_budget: int = 2**16,
+                                 stats: Optional[search_stats.SearchStats] = None) -> Solution:
+    get_actions, get_successor = problem.get_actions, problem.get_successor
+    if stats is None:
+        stats = search_stats.active
+    if stats is not None:
+        stats.searches += 1
+        get_actions, get_successor = stats.time_successors(get_actions), stats.time_successors(get_successor)
+        heuristic = stats.time_heuristic(heuristic)
+    # The frontier is kept in two heaps (one for the best node and one for the worst node)
+    # Every change to a node increments its version, so heap entries with an older version are stale
+    # and they are skipped when they reach the top
+    sequence = itertools.count()
+    best_heap, worst_heap = [], []
+    frontier_size = 0
+    def add_to_frontier(node: MemoryBoundedNode):
+        nonlocal frontier_size
+        if not node.in_frontier:
+            node.in_frontier = True
+            frontier_size += 1
+        node.version += 1
+        heapq.heappush(best_heap, (node.f, -node.depth, next(sequence), node.version, node))
+        heapq.heappush(worst_heap, (-node.f, node.depth, next(sequence), node.version, node))
+    def remove_from_frontier(node: MemoryBoundedNode):
+        nonlocal frontier_size
+        if node.in_frontier:
+            node.in_frontier = False
+            frontier_size -= 1
+            node.version += 1
+    # Recompute the f of an expanded node from its children and propagate the change to its ancestors
+    def backup(node: MemoryBoundedNode):
+        while node is not None and node.actions is not None:
+            f = min(min((child.f for child in node.children.values()), default=float('inf')),
+                    min(node.forgotten.values(), default=float('inf')))
+            if f == node.f:
+                break
+            node.f = f
+            if node.in_frontier: add_to_frontier(node)
+            node = node.parent
+    # Remove a leaf from memory and remember its f in its parent
+    def prune(node: MemoryBoundedNode):
+        nonlocal memory
+        parent = node.parent
+        del parent.children[node.action_index]
+        parent.forgotten[node.action_index] = node.f
+        remove_from_frontier(node)
+        if in_memory.get(node.state) is node:
+            del in_memory[node.state]
+        memory -= 1
+        add_to_frontier(parent)
+        backup(parent)
+
+    root = MemoryBoundedNode(initial_state, None, -1, 0, heuristic(problem, initial_state), 0)
+    add_to_frontier(root)
+    # The node in memory with the lowest path cost for every state
+    in_memory: Dict[S, MemoryBoundedNode] = {initial_state: root}
+    memory = 1
+    peak_frontier_size = 1
+    solution = None
+    while True:
+        while best_heap and best_heap[0][3] != best_heap[0][4].version:
+            heapq.heappop(best_heap)
+        if not best_heap or best_heap[0][0] == float('inf'):
+            break
+        node: MemoryBoundedNode = best_heap[0][4]
+        if problem.is_goal(node.state):
+            solution = []
+            while node.parent is not None:
+                solution.append(node.parent.actions[node.action_index])
+                node = node.parent
+            solution.reverse()
+            break
+        if node.actions is None:
+            # The node was never expanded, so we generate all of its children
+            node.actions = list(get_actions(node.state))
+            indices = list(range(len(node.actions)))
+        else:
+            # The node was expanded before, so we regenerate its best forgotten children
+            threshold = min(node.forgotten.values())
+            indices = [index for index, f in node.forgotten.items() if f <= threshold]
+            for index in indices: del node.forgotten[index]
+        remove_from_frontier(node)
+        if node.forgotten: add_to_frontier(node)
+        generated = set()
+        for index in indices:
+            action = node.actions[index]
+            successor = get_successor(node.state, action)
+            g = node.g + problem.get_cost(node.state, action)
+            # This also skips cycles since the ancestors are in memory with a lower path cost
+            duplicate = in_memory.get(successor)
+            if duplicate is not None and duplicate.g <= g:
                 continue
-            h = heuristic(problem, successor)
-            if successor in child_parent:
-                _state, _h, _a = child_parent[successor]
-                if _h > h:
-                    child_parent[successor] = (state, h, action)
+            if node.depth + 2 >= node_budget and not problem.is_goal(successor):
+                f = float('inf')
             else:
-                child_parent[successor] = (state, h, action)
+                # Pathmax: the f of a child is never lower than the f of its parent
+                f = max(node.f, g + heuristic(problem, successor))
+            child = MemoryBoundedNode(successor, node, index, g, f, node.depth + 1)
+            node.children[index] = child
+            in_memory[successor] = child
+            generated.add(child)
+            add_to_frontier(child)
+            memory += 1
+        if stats is not None:
+            stats.record_expansion(len(indices), len(generated), frontier_size)
+        if not node.children and not node.forgotten:
+            # This node is a dead end
+            if node.parent is None:
+                break
+            node.f = float('inf')
+            prune(node)
+            continue
+        backup(node)
+        # While the memory is over budget, prune the worst leaves except the children that were just generated
+        skipped = []
+        while memory > node_budget and worst_heap:
+            entry = heapq.heappop(worst_heap)
+            candidate: MemoryBoundedNode = entry[4]
+            if entry[3] != candidate.version:
+                continue
+            if candidate.children or candidate.parent is None or candidate in generated:
+                skipped.append(entry)
+                continue
+            prune(candidate)
+        for entry in skipped:
+            heapq.heappush(worst_heap, entry)
+        peak_frontier_size = max(peak_frontier_size, frontier_size)
+    if stats is not None:
+        stats.peak_frontier_size = max(stats.peak_frontier_size, peak_frontier_size)
+    return solution
 
+def BestFirstSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction) -> Solution:
+    #TODO: ADD YOUR CODE HERE
+    # The frontier is ordered by the heuristic only
+    return GraphSearch(problem, initial_state, lambda cost, h: h, heuristic)
+
+# The weights used by AnytimeRepairingAStar, from the first (fastest) search to the last (optimal) one
+ANYTIME_WEIGHTS = (5, 3, 2, 1.5, 1.2, 1)
+
+# Anytime Repairing A* (ARA*) runs weighted A* searches (ordered by f = g + w * h) with decreasing weights.
+# With an admissible heuristic, a weighted search returns a solution whose cost is at most w times the optimal cost,
+# and the higher the weight, the sooner it usually finds it.
+# Instead of starting over, every search reuses the costs and the parents found by the previous ones:
+# the states whose cost improved after they were expanded (the inconsistent states) are put back into the frontier,
+# so only them (and the states that they improve) are expanded again.
+# The goal test is done on generation and the best goal reached so far is kept.
+# A search stops once the best goal has a lower f than every state in the frontier.
+# The whole search stops when the time budget (in seconds) runs out or when the search with the last weight is done,
+# and it returns the best solution found so far (None if no solution was found in time or if there is none).
+# The search records the suboptimality bound of the returned solution in "stats.bound" (see search_stats.py):
+# its cost is at most "bound" times the optimal cost (1 means optimal, infinity means that no solution was found).
+# The bound is the cost of the solution divided by the lowest g + h in the frontier and among the inconsistent states,
+# since every cheaper path must go through one of them.
+# It also records in "stats.solutions" a tuple (seconds, cost, bound) for every search that improved the solution or its bound.
+# The statistics are the given ones or the ones that are being collected (nothing is recorded if there are none).
+def AnytimeRepairingAStar(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction,
+                          time_budget: Optional[float] = None, weights: Sequence[float] = ANYTIME_WEIGHTS,
+                          stats: Optional[search_stats.SearchStats] = None) -> Solution:
+    start = time.perf_counter()
+    deadline = float('inf') if time_budget is None else start + time_budget
+    get_actions, get_successor = problem.get_actions, problem.get_successor
+    if stats is None:
+        stats = search_stats.active
+    if stats is not None:
+        stats.searches += 1
+        get_actions, get_successor = stats.time_successors(get_actions), stats.time_successors(get_successor)
+        heuristic = stats.time_heuristic(heuristic)
+    state_key, successor_key = get_key_functions(problem, initial_state)
+    initial_key = state_key(initial_state)
+    parents: ParentTable = {initial_key: None}
+    # The path cost (g) and the heuristic (h) of every reached state
+    costs: Dict[S, float] = {initial_key: 0}
+    heuristics: Dict[S, float] = {initial_key: heuristic(problem, initial_state)}
+    goal_key, goal_cost = (initial_key, 0) if problem.is_goal(initial_state) else (None, float('inf'))
+    solutions: List[Tuple[float, float, float]] = []
+    # The bound proven by the last completed search
+    bound = float('inf')
+    order = 0
+    # The frontier holds (state, key) pairs identified by the key, and the inconsistent states are kept in a dictionary from key to state
+    frontier = IndexedPriorityQueue()
+    frontier.push((initial_state, initial_key), (weights[0] * heuristics[initial_key], order), initial_key)
+    inconsistent: Dict[S, S] = {}
+    timed_out = False
+    for iteration, weight in enumerate(weights):
+        explored = set()
+        while frontier and frontier.peek()[1][0] < goal_cost:
+            if time.perf_counter() > deadline:
+                timed_out = True
+                break
+            (state, key), _ = frontier.pop()
+            explored.add(key)
+            cost = costs[key]
+            actions = get_actions(state)
+            if stats is not None:
+                actions, added = list(actions), 0
+            for action in actions:
+                successor = get_successor(state, action)
+                key_of_successor = successor_key(state, key, action, successor)
+                successor_cost = cost + problem.get_cost(state, action)
+                if successor_cost >= costs.get(key_of_successor, float('inf')):
+                    continue
+                costs[key_of_successor] = successor_cost
+                parents[key_of_successor] = (key, action)
+                if key_of_successor not in heuristics:
+                    heuristics[key_of_successor] = heuristic(problem, successor)
+                if successor_cost < goal_cost and problem.is_goal(successor):
+                    goal_key, goal_cost = key_of_successor, successor_cost
+                if key_of_successor in explored:
+                    inconsistent[key_of_successor] = successor
+                else:
+                    order += 1
+                    frontier.push((successor, key_of_successor), (successor_cost + weight * heuristics[key_of_successor], order), key_of_successor)
+                if stats is not None:
+                    added += 1
+            if stats is not None:
+                stats.record_expansion(len(actions), added, len(frontier))
+        if goal_key is None:
+            if timed_out:
+                break
+        else:
+            # Every path that is cheaper than the solution goes through a state in the frontier or an inconsistent state
+            lower_bound = min([goal_cost] + [costs[key] + heuristics[key] for key in frontier.entries] +
+                              [costs[key] + heuristics[key] for key in inconsistent])
+            solution_bound = goal_cost / lower_bound if lower_bound > 0 else 1
+            bound = min(solution_bound, bound if timed_out else weight)
+            if not solutions or goal_cost < solutions[-1][1] or bound < solutions[-1][2]:
+                solutions.append((time.perf_counter() - start, goal_cost, bound))
+            if timed_out or bound <= 1:
+                break
+        if not frontier and not inconsistent:
+            break
+        # The next search starts from the frontier and the inconsistent states, ordered by the next weight
+        states = [item for item, _ in (frontier.pop() for _ in range(len(frontier)))] + [(state, key) for key, state in inconsistent.items()]
+        next_weight = weights[min(iteration + 1, len(weights) - 1)]
+        frontier, inconsistent = IndexedPriorityQueue(), {}
+        for state, key in states:
             order += 1
-            heapq.heappush(priority_queue, (h, order, successor))
-    return None
\ No newline at end of file
+            frontier.push((state, key), (costs[key] + next_weight * heuristics[key], order), key)
+    if stats is not None:
+        stats.bound = bound if goal_key is not None else float('inf')
+        stats.solutions.extend(solutions)
+    return None if goal_key is None else backtrack(parents, goal_key)
+
+# Beam search expands the states layer by layer like breadth first search,
+# but it only keeps the "beam_width" states with the lowest f = g + h in every layer, so its memory per layer is bounded.
+# It finds a solution quickly but it may miss the optimal solution (or every solution) because of the dropped states.
+# After the first solution, it keeps searching to improve it, and the states whose f is not lower than the cost of the best solution
+# are pruned since they can not lead to a cheaper one (if the heuristic is admissible).
+# A state is reached again if a later layer finds a cheaper path to it.
+# It stops when the beam is empty or when the time budget (in seconds) runs out and returns the best solution found.
+# The search records the suboptimality bound of the returned solution in "stats.bound" (as AnytimeRepairingAStar does):
+# a cheaper solution can only go through a dropped state (or a state still in the beam if the time ran out),
+# so the bound is the cost of the solution divided by the lowest f among them (1 if no state was dropped).
+def BeamSearch(problem: Problem[S, A], initial_state: S, heuristic: HeuristicFunction,
+               time_budget: Optional[float] = None, beam_width: int = 100,
+               stats: Optional[search_stats.SearchStats] = None) -> Solution:
+    start = time.perf_counter()
+    deadline = float('inf') if time_budget is None else start + time_budget
+    get_actions, get_successor = problem.get_actions, problem.get_successor
+    if stats is None:
+        stats = search_stats.active
+    if stats is not None:
+        stats.searches += 1
+        get_actions, get_successor = stats.time_successors(get_actions), stats.time_successors(get_successor)
+        heuristic = stats.time_heuristic(heuristic)
+    state_key, successor_key = get_key_functions(problem, initial_state)
+    initial_key = state_key(initial_state)
+    parents: ParentTable = {initial_key: None}
+    costs: Dict[S, float] = {initial_key: 0}
+    goal_key, goal_cost = (initial_key, 0) if problem.is_goal(initial_state) else (None, float('inf'))
+    # The lowest f among the states that were dropped from the beam
+    dropped = float('inf')
+    order = 0
+    # The beam holds (f, order, state, key) tuples
+    beam = [] if goal_key is not None else [(heuristic(problem, initial_state), order, initial_state, initial_key)]
+    while beam:
+        if time.perf_counter() > deadline:
+            dropped = min(dropped, beam[0][0])
+            break
+        # The successors of the layer, the cheapest path to every successor is kept
+        layer: Dict[S, Tuple[float, int, S, S]] = {}
+        for _, _, state, key in beam:
+            cost = costs[key]
+            actions = get_actions(state)
+            if stats is not None:
+                actions, layer_size = list(actions), len(layer)
+            for action in actions:
+                successor = get_successor(state, action)
+                key_of_successor = successor_key(state, key, action, successor)
+                successor_cost = cost + problem.get_cost(state, action)
+                if successor_cost >= costs.get(key_of_successor, float('inf')):
+                    continue
+                costs[key_of_successor] = successor_cost
+                parents[key_of_successor] = (key, action)
+                if problem.is_goal(successor):
+                    # Going through a goal can not lead to a cheaper goal, so the goal is not added to the beam
+                    if successor_cost < goal_cost:
+                        goal_key, goal_cost = key_of_successor, successor_cost
+                    continue
+                f = successor_cost + heuristic(problem, successor)
+                order += 1
+                layer[key_of_successor] = (f, order, successor, key_of_successor)
+            if stats is not None:
+                stats.record_expansion(len(actions), len(layer) - layer_size, len(beam) + len(layer))
+        candidates = sorted(entry for entry in layer.values() if entry[0] < goal_cost)
+        if len(candidates) > beam_width:
+            dropped = min(dropped, candidates[beam_width][0])
+        beam = candidates[:beam_width]
+    if goal_key is None:
+        if stats is not None:
+            stats.bound = float('inf')
+        return None
+    if stats is not None:
+        lower_bound = min(goal_cost, dropped)
+        stats.bound = goal_cost / lower_bound if lower_bound > 0 else 1
+    return backtrack(parents, goal_key)
@@ -0,0 +1,145 @@
+from typing import Callable, Dict, List, Tuple
+from problem import Problem, S, A, Solution
+from sokoban import SokobanProblem, PackedSokobanProblem
+from parking import ParkingProblem, PackedParkingProblem
+import argparse, glob, heapq, time
+
+# This script measures how many nodes per second the search functions expand on sokoban levels and parking lots
+# It also contains the list based implementations that search.py used before the shared engine
+# so that the difference between the two can be measured on the same machine
+
+# The old Breadth First Search: the queue is a list (pop(0) is linear)
+# and the path is rebuilt by inserting at the front of a list (insert(0, ...) is linear)
+def legacy_breadth_first_search(problem: Problem[S, A], initial_state: S) -> Solution:
+    if problem.is_goal(initial_state):
+        return []
+    explored = { initial_state: True }
+    child_parent = {}
+    queue = [initial_state]
+    while len(queue) > 0:
+        state = queue.pop(0)
+        for action in problem.get_actions(state):
+            successor = problem.get_successor(state, action)
+            if successor in explored:
+                continue
+            child_parent[successor] = (state, action)
+            if problem.is_goal(successor):
+                solution_list = []
+                node = successor
+                while node in child_parent and node != initial_state:
+                    node, _action = child_parent[node]
+                    solution_list.insert(0, _action)
+                return solution_list
+            explored[successor] = True
+            queue.append(successor)
+    return None
+
+# The old Uniform Cost Search: same as above but with a heap as a frontier
+def legacy_uniform_cost_search(problem: Problem[S, A], initial_state: S) -> Solution:
+    explored = {}
+    child_parent = {}
+    priority_queue = []
+    order = 0
+    heapq.heappush(priority_queue, (0, order, initial_state))
+    while priority_queue:
+        p, o, state = heapq.heappop(priority_queue)
+        if state in explored:
+            continue
+        explored[state] = True
+        if problem.is_goal(state):
+            solution_list = []
+            node = state
+            while node in child_parent and node != initial_state:
+                node, c, a = child_parent[node]
+                solution_list.insert(0, a)
+            return solution_list
+        for action in problem.get_actions(state):
+            successor = problem.get_successor(state, action)
+            if successor in explored:
+                continue
+            cost = problem.get_cost(state, action) + p
+            if successor not in child_parent or child_parent[successor][1] > cost:
+                child_parent[successor] = (state, cost, action)
+            order += 1
+            heapq.heappush(priority_queue, (cost, order, successor))
+    return None
+
+def get_search_functions() -> Dict[str, Callable[[Problem[S, A], S], Solution]]:
+    import search
+    return {
+        "legacy-bfs": legacy_breadth_first_search,
+        "legacy-ucs": legacy_uniform_cost_search,
+        "bfs": search.BreadthFirstSearch,
+        "dfs": search.DepthFirstSearch,
+        "ucs": search.UniformCostSearch,
+    }
+
+# Sokoban levels and parking lots are both grids of characters, but only sokoban levels contain a player
+# If packed is True, sokoban levels and parking lots are searched over packed states
+# If zobrist is True, the states are keyed by their Zobrist keys (packed states are not since they are already small integers)
+def load_problem(path: str, packed: bool = False, zobrist: bool = False) -> Problem:
+    from zobrist import ZobristSokobanProblem, ZobristParkingProblem
+    # Graphs are either JSON files or CSR files (see graph_csr.py)
+    if path.endswith(".csr"):
+        from graph_csr import CSRGraphRoutingProblem
+        return CSRGraphRoutingProblem.from_file(path)
+    if path.endswith(".json"):
+        from graph import GraphRoutingProblem
+        return GraphRoutingProblem.from_file(path)
+    with open(path, 'r') as f:
+        text = f.read()
+    if '@' in text or '+' in text:
+        problem = SokobanProblem.from_text(text)
+        if packed:
+            return PackedSokobanProblem(problem)
+        return ZobristSokobanProblem(problem) if zobrist else problem
+    problem = ParkingProblem.from_text(text)
+    if packed:
+        return PackedParkingProblem(problem)
+    return ZobristParkingProblem(problem) if zobrist else problem
+
+# Run a search function on the problem and return (solution, expanded nodes, elapsed seconds)
+# The expanded nodes are counted by wrapping "get_actions" on the problem instance only
+def run_benchmark(problem: Problem[S, A], search_fn: Callable[[Problem[S, A], S], Solution]) -> Tuple[Solution, int, float]:
+    get_actions = problem.get_actions
+    expanded = 0
+    def counted_get_actions(state):
+        nonlocal expanded
+        expanded += 1
+        return get_actions(state)
+    problem.get_actions = counted_get_actions
+    try:
+        start = time.perf_counter()
+        solution = search_fn(problem, problem.get_initial_state())
+        elapsed = time.perf_counter() - start
+    finally:
+        del problem.get_actions
+    return solution, expanded, elapsed
+
+def main(args: argparse.Namespace):
+    search_functions = get_search_functions()
+    paths: List[str] = sorted({path for pattern in args.files for path in glob.glob(pattern)})
+    print(f"{'file':<24}{'algorithm':<12}{'length':>8}{'expanded':>10}{'seconds':>10}{'nodes/s':>12}")
+    for path in paths:
+        for name in args.algorithms:
+            # Every run gets a fresh problem so that no cached data is shared between the algorithms
+            problem = load_problem(path, args.packed, args.zobrist)
+            solution, expanded, elapsed = run_benchmark(problem, search_functions[name])
+            length = "-" if solution is None else len(solution)
+            rate = expanded / elapsed if elapsed > 0 else float('inf')
+            print(f"{path:<24}{name:<12}{length:>8}{expanded:>10}{elapsed:>10.3f}{rate:>12.0f}")
+
+if __name__ == "__main__":
+    # Read the arguments from the command line
+    parser = argparse.ArgumentParser(description="Measure the search speed (nodes per second) on sokoban levels and parking lots")
+    parser.add_argument("files", nargs="+", help="paths or glob patterns of the levels, parks and graphs (e.g. levels/*.txt parks/*.txt graphs/*.csr)")
+    parser.add_argument("--algorithms", "-a", nargs="+", default=["legacy-bfs", "bfs"],
+                        choices=list(get_search_functions().keys()),
+                        help="the search functions to benchmark")
+    parser.add_argument("--packed", "-p", action="store_true",
+                        help="search the sokoban levels and parking lots over packed states (cell indices and bit masks)")
+    parser.add_argument("--zobrist", "-z", action="store_true",
+                        help="key the explored states by incremental Zobrist hashes")
+
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,138 @@
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from contextlib import contextmanager
+import json, sys, time, tracemalloc
+
+# The resource module is only available on Unix, on other platforms the peak memory is only measured with tracemalloc
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# This file contains the statistics that the search engine (GraphSearch, BreadthFirstSearch and DepthFirstSearch) can collect
+# The statistics are disabled by default. To collect them, run the searches inside "collect":
+#   with collect() as stats:
+#       solution = AStarSearch(problem, initial_state, heuristic)
+#   print(stats)
+# When no statistics are collected, the engine only checks "stats is not None" twice per expansion
+# and the timers are not installed, so the searches run at the same speed.
+
+class SearchStats:
+    # sample_every: the number of expansions between 2 samples of the frontier size
+    def __init__(self, sample_every: int = 1000) -> None:
+        self.sample_every = sample_every
+        self.searches = 0               # The number of searches that ran while collecting
+        self.expanded = 0               # The number of expanded nodes (the number of get_actions calls)
+        self.generated = 0              # The number of generated successors
+        self.duplicates = 0             # The generated successors that were already explored or already in the frontier with a better priority
+        self.peak_frontier_size = 0     # The peak number of states in the frontier
+        self.frontier_samples: List[Tuple[int, int]] = []  # Samples of (expanded nodes, frontier size)
+        self.heuristic_time = 0.0       # The seconds spent in the heuristic
+        self.successor_time = 0.0       # The seconds spent in get_actions and get_successor
+        self.wall_time = 0.0            # The seconds spent while collecting
+        self.peak_memory_kb: Optional[int] = None
+        self.trace_memory = False       # Whether the peak memory is measured by tracemalloc
+        # The anytime searches (AnytimeRepairingAStar and BeamSearch) record the suboptimality bound of their last solution
+        # (None if no anytime search ran) and AnytimeRepairingAStar records a tuple (seconds, cost, bound) for every improvement
+        self.bound: Optional[float] = None
+        self.solutions: List[Tuple[float, float, float]] = []
+
+    # Called by the engine after every expansion with the number of generated successors,
+    # the number of them that were added to the frontier and the size of the frontier
+    def record_expansion(self, generated: int, added: int, frontier_size: int) -> None:
+        self.expanded += 1
+        self.generated += generated
+        self.duplicates += generated - added
+        if frontier_size > self.peak_frontier_size:
+            self.peak_frontier_size = frontier_size
+        if self.expanded % self.sample_every == 0:
+            self.frontier_samples.append((self.expanded, frontier_size))
+
+    # Wrap a function so that its run time is added to the heuristic time
+    def time_heuristic(self, fn: Callable) -> Callable:
+        def timed(*args):
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self.heuristic_time += time.perf_counter() - start
+        return timed
+
+    # Wrap a function so that its run time is added to the successor time
+    def time_successors(self, fn: Callable) -> Callable:
+        def timed(*args):
+            start = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                self.successor_time += time.perf_counter() - start
+        return timed
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "searches": self.searches,
+            "expanded": self.expanded,
+            "generated": self.generated,
+            "duplicates": self.duplicates,
+            "peak_frontier_size": self.peak_frontier_size,
+            "frontier_samples": self.frontier_samples,
+            "heuristic_time": self.heuristic_time,
+            "successor_time": self.successor_time,
+            "wall_time": self.wall_time,
+            "peak_memory_kb": self.peak_memory_kb,
+            "bound": self.bound,
+            "solutions": self.solutions,
+        }
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def __str__(self) -> str:
+        memory = "-" if self.peak_memory_kb is None else f"{self.peak_memory_kb} KB"
+        return "\n".join([
+            f"Expanded nodes: {self.expanded}",
+            f"Generated nodes: {self.generated} ({self.duplicates} duplicates)",
+            f"Peak frontier size: {self.peak_frontier_size}",
+            f"Time in heuristic: {self.heuristic_time:.3f} seconds",
+            f"Time in successor generation: {self.successor_time:.3f} seconds",
+            f"Wall time: {self.wall_time:.3f} seconds",
+            f"Peak memory: {memory}",
+        ] + ([] if self.bound is None else [f"Suboptimality bound: {self.bound:.3f}"]))
+
+# The statistics that are being collected (None if they are disabled)
+# The search functions read it once when they start
+active: Optional[SearchStats] = None
+
+# Start collecting the statistics of the following searches and return them
+# If trace_memory is True, the peak memory is measured by tracemalloc (precise but it slows down the searches),
+# otherwise, it is the peak resident memory of the whole process (which includes the memory used before the searches)
+def start(sample_every: int = 1000, trace_memory: bool = False) -> SearchStats:
+    global active
+    active = SearchStats(sample_every)
+    active.trace_memory = trace_memory
+    if trace_memory:
+        tracemalloc.start()
+    active.wall_time = time.perf_counter()
+    return active
+
+# Stop collecting the statistics and return them
+def stop() -> SearchStats:
+    global active
+    stats, active = active, None
+    stats.wall_time = time.perf_counter() - stats.wall_time
+    if stats.trace_memory:
+        stats.peak_memory_kb = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+    elif resource is not None:
+        # ru_maxrss is in kilobytes on Linux but in bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        stats.peak_memory_kb = peak // 1024 if sys.platform == "darwin" else peak
+    return stats
+
+# Collect the statistics of the searches that run inside the "with" block
+@contextmanager
+def collect(sample_every: int = 1000, trace_memory: bool = False) -> Iterable[SearchStats]:
+    stats = start(sample_every, trace_memory)
+    try:
+        yield stats
+    finally:
+        stop()
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import FrozenSet, Iterable
+from typing import FrozenSet, Iterable, List, NamedTuple, Tuple
 from enum import Enum
 
 from mathutils import Direction, Point
@@ -34,6 +34,10 @@ class SokobanLayout:
     walkable: FrozenSet[Point]
     goals: FrozenSet[Point]
 
+    # Rebuild the layout with the constructor when unpickling (see Point.__reduce__)
+    def __reduce__(self):
+        return (SokobanLayout, (self.width, self.height, self.walkable, self.goals))
+
 # For the sokoban state, we use dataclass with frozen=True to automatically implement:
 #   the constructor, the == operator, the hash function and to make the class immutable
 # Now it can be added to sets and used as keys in dictionaries
@@ -46,6 +50,10 @@ class SokobanState:
     player: Point
     crates: FrozenSet[Point]
 
+    # Rebuild the state with the constructor when unpickling (see Point.__reduce__)
+    def __reduce__(self):
+        return (SokobanState, (self.layout, self.player, self.crates))
+
     # This operator will convert the state to a string containing the grid representation of the level at the current state
     def __str__(self) -> str:
         def position_to_str(position):
@@ -116,6 +124,19 @@ class SokobanProblem(Problem[SokobanState, Direction]):
         # All actions have the same cost
         return 1
 
+    # The fingerprint of a sokoban problem is its layout
+    def get_fingerprint(self) -> str:
+        layout = self.layout
+        sort = lambda points: sorted((point.x, point.y) for point in points)
+        return f"sokoban {layout.width}x{layout.height} walkable={sort(layout.walkable)} goals={sort(layout.goals)}"
+
+    # An action is stored as the letter of its direction
+    def encode_action(self, action: Direction) -> str:
+        return str(action)
+
+    def decode_action(self, value: str) -> Direction:
+        return Direction(value)
+
     # Read a sokoban problem from text containing a grid of tiles
     @staticmethod
     def from_text(text: str) -> 'SokobanProblem':
@@ -148,4 +169,109 @@ class SokobanProblem(Problem[SokobanState, Direction]):
     @staticmethod
     def from_file(path: str) -> 'SokobanProblem':
         with open(path, 'r') as f:
-            return SokobanProblem.from_text(f.read())
\ No newline at end of file
+            return SokobanProblem.from_text(f.read())
+
+# This is a compact encoding of the sokoban state where every cell of the layout is identified by its index (y * width + x)
+# The player is stored as the index of its cell and the crates are stored as a bit mask where bit "i" is set if cell "i" has a crate
+# We use a NamedTuple since hashing and comparing tuples of ints is much cheaper than hashing frozensets of points
+# Unlike SokobanState, it does not hold a reference to the layout, so it is converted back to a SokobanState
+# (via PackedSokobanProblem.unpack) for printing or for the heuristics that are written for SokobanState
+class PackedSokobanState(NamedTuple):
+    player: int
+    crates: int
+
+# This is the sokoban problem over packed states
+# It wraps a SokobanProblem and precomputes the lookup tables of its layout once:
+#   neighbors: for every cell index, the index of the neighbor in every direction (or -1 if the neighbor is not walkable)
+#   goal_mask: the bit mask of the goals
+# The actions are generated in the same order as SokobanProblem, so both problems give the same search results
+class PackedSokobanProblem(Problem[PackedSokobanState, Direction]):
+    def __init__(self, problem: SokobanProblem) -> None:
+        super().__init__()
+        self.problem = problem
+        layout = self.layout = problem.layout
+        width, height = layout.width, layout.height
+        self.cells: List[Point] = [Point(index % width, index // width) for index in range(width * height)]
+        def neighbor(position: Point, direction: Direction) -> int:
+            next_position = position + direction.to_vector()
+            return self.index(next_position) if next_position in layout.walkable else -1
+        self.neighbors: Tuple[Tuple[int, ...], ...] = tuple(
+            tuple(neighbor(position, direction) for direction in Direction) if position in layout.walkable else (-1,) * 4
+            for position in self.cells
+        )
+        self.goal_mask = sum(1 << self.index(goal) for goal in layout.goals)
+        self.initial_state = self.pack(problem.initial_state)
+
+    # Convert a point to the index of its cell
+    def index(self, position: Point) -> int:
+        return position.x + position.y * self.layout.width
+
+    # Convert a SokobanState to a PackedSokobanState
+    def pack(self, state: SokobanState) -> PackedSokobanState:
+        return PackedSokobanState(self.index(state.player), sum(1 << self.index(crate) for crate in state.crates))
+
+    # Convert a PackedSokobanState back to a SokobanState
+    def unpack(self, state: PackedSokobanState) -> SokobanState:
+        crates, cells = state.crates, self.cells
+        positions = []
+        while crates:
+            lowest = crates & -crates
+            positions.append(cells[lowest.bit_length() - 1])
+            crates ^= lowest
+        return SokobanState(self.layout, cells[state.player], frozenset(positions))
+
+    def get_initial_state(self) -> PackedSokobanState:
+        return self.initial_state
+
+    def is_goal(self, state: PackedSokobanState) -> bool:
+        return state.crates == self.goal_mask
+
+    # We use @track_call_count to track the number of times this function was called to count the number of explored nodes
+    @track_call_count
+    def get_actions(self, state: PackedSokobanState) -> Iterable[Direction]:
+        player, crates = state
+        neighbors = self.neighbors
+        actions = []
+        for direction, position in zip(AllDirections, neighbors[player]):
+            # Disallow walking into walls
+            if position < 0: continue
+            # If walking into a crate, make sure that the crate is not pushed into a wall or another crate
+            if crates >> position & 1:
+                crate_position = neighbors[position][direction]
+                if crate_position < 0 or crates >> crate_position & 1:
+                    continue
+            actions.append(direction)
+        return actions
+
+    def get_successor(self, state: PackedSokobanState, action: Direction) -> PackedSokobanState:
+        player, crates = state
+        position = self.neighbors[player][action]
+        if position < 0:
+            # If we try to walk into a wall, then this action is wrong
+            raise Exception(f"Invalid action {action} in state:" + "\n" + str(self.unpack(state)))
+        if crates >> position & 1:
+            crate_position = self.neighbors[position][action]
+            if crate_position < 0 or crates >> crate_position & 1:
+                # If we try to push a crate into a wall or another crate, then this action is wrong
+                raise Exception(f"Invalid action {action} in state:" + "\n" + str(self.unpack(state)))
+            # If we walk to a crate, we push it
+            crates ^= (1 << position) | (1 << crate_position)
+        return PackedSokobanState(position, crates)
+
+    def get_cost(self, state: PackedSokobanState, action: Direction) -> float:
+        # All actions have the same cost
+        return 1
+
+    # The packed problem has the same layout but different states than the wrapped problem
+    def get_fingerprint(self) -> str:
+        return "packed " + self.problem.get_fingerprint()
+
+    # The actions are the same as the actions of the wrapped problem
+    def encode_action(self, action: Direction) -> str:
+        return self.problem.encode_action(action)
+
+    def decode_action(self, value: str) -> Direction:
+        return self.problem.decode_action(value)
+
+# The directions in the order of the Direction enum (which is the order in which SokobanProblem.get_actions checks them)
+AllDirections = tuple(Direction)
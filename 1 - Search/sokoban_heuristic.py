@@ -8,91 +8,159 @@ def weak_heuristic(problem: SokobanProblem, state: SokobanState):
     return min(manhattan_distance(state.player, crate) for crate in state.crates) - 1
 
 #TODO: Import any modules and write any functions you want to use
-def is_deadlocked(state: SokobanState, problem: SokobanProblem):
-    # count of border crates for this state
-    border_crates = {
-        't': 0,
-        'b': 0,
-        'r': 0,
-        'l': 0,
-    }
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, List, Tuple
+from collections import deque
+from sokoban import SokobanLayout
 
-    for crate in state.crates:
-        # in case a crate is at a goal position, it can't cause a deadlock
-        if crate in state.layout.goals:
-            continue
-        # combine the results of the three possible deadlock situations (double box, corner, border)
-        blocked = double_box_deadlock(problem, state, crate) or corner_deadlock(state, crate) or border_deadlock(state, crate, problem.cache(), border_crates)
-        if blocked == True:
-            return True
+# These are the distance tables of a sokoban layout which are computed once and shared by all the states of the layout
+# goals: the goals in a fixed order
+# push_distances: for every walkable cell, the minimum number of pushes needed to move a crate from this cell to each goal
+#                 (in the same order as "goals") while ignoring the other crates.
+# dead_squares: the cells from which a crate can never be pushed to any goal
+# walls: for every walkable cell, a bit mask where bit "d" is set if there is a wall next to the cell in the direction "d"
+# neighbors: for every walkable cell, the adjacent cells in the order of the Direction enum
+@dataclass(frozen=True)
+class SokobanDistanceTable:
+    goals: Tuple[Point, ...]
+    push_distances: Dict[Point, Tuple[float, ...]]
+    dead_squares: FrozenSet[Point]
+    walls: Dict[Point, int]
+    neighbors: Dict[Point, Tuple[Point, ...]]
 
-    return False
+# Compute the push distance from every cell to the given goal via a reverse BFS that pulls the crate away from the goal
+# A crate at "position" can be pushed in direction "d" to "position + d" if the player can stand at "position - d".
+# So going backward, a crate at "position" could have come from "position - d" if the player could stand at "position - 2d".
+def compute_pull_distances(layout: SokobanLayout, goal: Point) -> Dict[Point, int]:
+    distances = {goal: 0}
+    queue = deque([goal])
+    while queue:
+        position = queue.popleft()
+        for direction in Direction:
+            vector = direction.to_vector()
+            previous = position - vector
+            player = previous - vector
+            if previous in distances or previous not in layout.walkable or player not in layout.walkable:
+                continue
+            distances[previous] = distances[position] + 1
+            queue.append(previous)
+    return distances
 
-# Detect if a crate in a corner
-def corner_deadlock(state: SokobanState, box: Point):
+def compute_distance_table(layout: SokobanLayout) -> SokobanDistanceTable:
+    goals = tuple(sorted(layout.goals, key=lambda goal: (goal.y, goal.x)))
+    goal_distances = [compute_pull_distances(layout, goal) for goal in goals]
+    push_distances = {
+        position: tuple(distances.get(position, float('inf')) for distances in goal_distances)
+        for position in layout.walkable
+    }
+    dead_squares = frozenset(position for position, distances in push_distances.items() if min(distances, default=float('inf')) == float('inf'))
+    neighbors = {position: tuple(position + direction.to_vector() for direction in Direction) for position in layout.walkable}
+    walls = {
+        position: sum(1 << direction for direction, neighbor in zip(Direction, neighbors[position]) if neighbor not in layout.walkable)
+        for position in layout.walkable
+    }
+    return SokobanDistanceTable(goals, push_distances, dead_squares, walls, neighbors)
 
-    up_block = (Point(box.x, box.y - 1) not in state.layout.walkable) 
-    down_block = (Point(box.x, box.y + 1)  not in state.layout.walkable)   
+# Return the distance table of the layout from the problem cache (and compute it if it is not cached yet)
+# The tables are keyed by the layout object itself since layouts are compared by identity
+def get_distance_table(problem: SokobanProblem, layout: SokobanLayout) -> SokobanDistanceTable:
+    cache = problem.cache()
+    table = cache.get(layout)
+    if table is None:
+        table = cache[layout] = compute_distance_table(layout)
+    return table
 
-    left_block = (Point(box.x - 1, box.y) not in state.layout.walkable)
-    right_block = (Point(box.x + 1, box.y) not in state.layout.walkable)    
+# Compute the cost of the minimum cost matching between rows and columns
+# where the number of rows is less than or equal to the number of columns and every row must be matched.
+# Infinite costs are supported, and the result is infinite if every matching contains an infinite cost.
+# For a few columns, a dynamic program over the subsets of used columns is faster than the Hungarian algorithm.
+def minimum_cost_matching(costs: List[Tuple[float, ...]]) -> float:
+    rows = len(costs)
+    if rows == 0:
+        return 0
+    columns = len(costs[0])
+    if rows > columns:
+        return float('inf')
+    if columns <= 8:
+        return subset_matching(costs)
+    return hungarian_matching(costs)
 
-    return (up_block or down_block) and (left_block or right_block)
+# The dynamic program keeps the minimum cost to match the rows processed so far for every subset (bit mask) of used columns
+def subset_matching(costs: List[Tuple[float, ...]]) -> float:
+    best = {0: 0}
+    for row in costs:
+        next_best = {}
+        for used, total in best.items():
+            for column, cost in enumerate(row):
+                bit = 1 << column
+                if used & bit or cost == float('inf'):
+                    continue
+                mask, total_cost = used | bit, total + cost
+                if total_cost < next_best.get(mask, float('inf')):
+                    next_best[mask] = total_cost
+        if not next_best:
+            return float('inf')
+        best = next_best
+    return min(best.values())
 
-# Detect if a crate at a border while there is no more goals for this crate at this border
-def border_deadlock(state: SokobanState, box: Point, cache, border_crates):
-    if box.y == 1:
-        border_crates['t'] += 1
-        if cache.get('t_goal') - border_crates['t'] < 0:
-            return True
-    if box.y == state.layout.height - 2:
-        border_crates['b'] += 1
-        if cache.get('b_goal') - border_crates['b'] < 0:
-            return True
-    if box.x == 1:
-        border_crates['l'] += 1
-        if cache.get('l_goal') - border_crates['l'] < 0:
-            return True
-    if box.x == state.layout.width - 2:
-        border_crates['r'] += 1
-        if cache.get('r_goal') - border_crates['r'] < 0:
-            return True
-    return False
+# The Hungarian algorithm (with row and column potentials) for the minimum cost matching
+def hungarian_matching(costs: List[Tuple[float, ...]]) -> float:
+    rows, columns = len(costs), len(costs[0])
+    # Infinite costs are replaced by a big finite cost so that the potentials stay finite
+    big = 1 + sum(max((cost for cost in row if cost != float('inf')), default=0) for row in costs)
+    matrix = [[big if cost == float('inf') else cost for cost in row] for row in costs]
+    # The potentials of the rows (u) and columns (v) and the row matched to every column (1-based, 0 means unmatched)
+    u = [0] * (rows + 1)
+    v = [0] * (columns + 1)
+    match = [0] * (columns + 1)
+    for row in range(1, rows + 1):
+        match[0] = row
+        column = 0
+        minimum = [float('inf')] * (columns + 1)
+        way = [0] * (columns + 1)
+        used = [False] * (columns + 1)
+        while match[column] != 0:
+            used[column] = True
+            current_row = match[column]
+            delta, next_column = float('inf'), 0
+            for j in range(1, columns + 1):
+                if used[j]: continue
+                reduced = matrix[current_row - 1][j - 1] - u[current_row] - v[j]
+                if reduced < minimum[j]:
+                    minimum[j], way[j] = reduced, column
+                if minimum[j] < delta:
+                    delta, next_column = minimum[j], j
+            for j in range(columns + 1):
+                if used[j]:
+                    u[match[j]] += delta
+                    v[j] -= delta
+                else:
+                    minimum[j] -= delta
+            column = next_column
+        # Augment along the alternating path
+        while column != 0:
+            previous = way[column]
+            match[column] = match[previous]
+            column = previous
+    total = sum(matrix[match[j] - 1][j - 1] for j in range(1, columns + 1) if match[j] != 0)
+    return float('inf') if total >= big else total
 
-# Detect if there are 2 boxes preventing each other from moving
-def double_box_deadlock(problem: SokobanProblem, state: SokobanState, box: Point):
-    walkable = state.layout.walkable
-    for box_2 in state.crates:
-        if box_2 == box:
+# The wall bits of the sides across which 2 vertically (or horizontally) adjacent crates can not move
+HORIZONTAL_WALLS = (1 << Direction.RIGHT) | (1 << Direction.LEFT)
+VERTICAL_WALLS = (1 << Direction.UP) | (1 << Direction.DOWN)
+
+# Detect if there are 2 adjacent crates that block each other from moving
+# For example, if 2 crates are on top of each other and both of them have a wall on their left (or both on their right),
+# neither of them can move horizontally (there is no place for the player or the crate) and neither can move vertically
+# (the other crate is in the way), so if one of them is not on a goal, the state is deadlocked.
+def frozen_pair_deadlock(table: SokobanDistanceTable, state: SokobanState) -> bool:
+    goals, crates, walls = state.layout.goals, state.crates, table.walls
+    for crate in crates:
+        if crate in goals:
             continue
-        # check if they are on the same vertical axis
-        if box.x == box_2.x:
-            # check if they are on top of each other
-            if abs(box.y - box_2.y) == 1:
-                l = box.__add__(Point(-1, 0))
-                r = box.__add__(Point(1, 0))
-                l2 = box_2.__add__(Point(-1, 0))
-                r2 = box_2.__add__(Point(1, 0))
-                if ((l not in walkable) and (l2 not in walkable)) or ((r not in walkable) and (r2 not in walkable)):
-                    return True
-            if box.x == 1 and problem.cache().get('l_goal') < 2:
-                return True
-            if box.x == state.layout.width - 2 and problem.cache().get('r_goal') < 2:
-                return True
-        
-        # check if they are on the same horizontal axis
-        if box.y == box_2.y:
-            # check if they are beside each other
-            if abs(box.x - box_2.x) == 1:
-                t = box.__add__(Point(0, -1))
-                b = box.__add__(Point(0, 1))
-                t2 = box_2.__add__(Point(0, -1))
-                b2 = box_2.__add__(Point(0, 1))
-                if ((t not in walkable) and (t2 not in walkable)) or ((b not in walkable) and (b2 not in walkable)):
-                    return True
-            if box.y == 1 and problem.cache().get('t_goal') < 2:
-                return True
-            if box.y == state.layout.height - 2 and problem.cache().get('b_goal') < 2:
+        right, up, left, down = table.neighbors[crate]
+        for other, sides in ((up, HORIZONTAL_WALLS), (down, HORIZONTAL_WALLS), (left, VERTICAL_WALLS), (right, VERTICAL_WALLS)):
+            if other in crates and walls[crate] & walls[other] & sides:
                 return True
     return False
 
@@ -103,39 +171,34 @@ def strong_heuristic(problem: SokobanProblem, state: SokobanState) -> float:
     # which is the number of get_actions calls during the search
     #NOTE: you can use problem.cache() to get a dictionary in which you can store information that will persist between calls of this function
     # This could be useful if you want to store the results heavy computations that can be cached and used across multiple calls of this function
-    # NotImplemented()
-
-    t_goal, b_goal, r_goal, l_goal = 0, 0, 0, 0
-    for goal in state.layout.goals:
-        if goal.y == 1:
-            t_goal += 1
-        elif goal.y == state.layout.height - 2:
-            b_goal += 1
-        if goal.x == 1:
-            l_goal += 1
-        elif goal.x == state.layout.width - 2:
-            r_goal += 1
-    
-    # cache the count of goal at each border to use it in the `border_deadlock` detection
-    cache = problem.cache()
-    cache['t_goal'] = t_goal
-    cache['b_goal'] = b_goal
-    cache['r_goal'] = r_goal
-    cache['l_goal'] = l_goal
 
     # heuristic of the goal state is zero
     if problem.is_goal(state):
         return 0
-    if is_deadlocked(state, problem):
+    table = get_distance_table(problem, state.layout)
+    # A crate on a dead square can never reach a goal
+    if any(crate in table.dead_squares for crate in state.crates):
         return float('inf')
-    
-    total_distance = 0
-    
-    for crate in state.crates:
-        min_distance = float('inf')
-        for goal in problem.layout.goals:
-            distance = manhattan_distance(crate, goal)
-            min_distance = min(min_distance, distance)
-        total_distance += min_distance
+    if frozen_pair_deadlock(table, state):
+        return float('inf')
+    # Every crate needs its own goal, so the minimum total number of pushes is the minimum cost matching
+    # between the crates and the goals. A single push changes the push distance of one crate by at most 1,
+    # so the matching cost can not drop by more than the action cost.
+    pushes = minimum_cost_matching([table.push_distances[crate] for crate in state.crates])
+    # In addition, the player has to walk next to a crate before the next push (like the weak heuristic).
+    # This term is 0 before and after every push, so it only changes with the walking actions (by at most 1).
+    return pushes + weak_heuristic(problem, state)
+
+# The incremental version of the strong heuristic (see HeuristicDelta in problem.py)
+# Everything except the weak heuristic term only depends on the crates, so if the action did not push a crate
+# (SokobanProblem.get_successor keeps the same crates object), only the weak term is updated.
+# After a push, the matching has to be recomputed, so the heuristic is computed from scratch.
+def strong_heuristic_delta(problem: SokobanProblem, parent: SokobanState, parent_h: float, action: Direction, state: SokobanState) -> float:
+    if state.crates is not parent.crates:
+        return strong_heuristic(problem, state)
+    # The goal (h = 0) and the deadlocks (h = inf) only depend on the crates
+    if problem.is_goal(state) or parent_h == float('inf'):
+        return parent_h
+    return parent_h - weak_heuristic(problem, parent) + weak_heuristic(problem, state)
 
-    return total_distance
\ No newline at end of file
+strong_heuristic.heuristic_delta = strong_heuristic_delta
@@ -0,0 +1,134 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, FrozenSet, Iterable, List, Tuple
+
+from mathutils import Direction, GridMap, Point
+from problem import Problem, Solution
+from sokoban import SokobanLayout, SokobanProblem, SokobanState
+from helpers.utils import track_call_count
+
+# This file contains a push-level formulation of the Sokoban problem
+# In SokobanProblem, every single step of the player is an action, so the search branches on every empty tile the player walks over.
+# Here, an action is a crate push, and the walking needed to reach the push position is folded into the action cost.
+# After a push, the player always stands where the crate was, so the search only reaches the states that follow a push
+# and skips all the states where the player is walking between pushes.
+
+# A push action is a tuple (crate position, direction) where the crate at the given position is pushed in the given direction
+SokobanPush = Tuple[Point, Direction]
+
+# For the push state, we use dataclass with frozen=True to automatically implement:
+#   the constructor, the == operator, the hash function and to make the class immutable
+# The exact player position is part of the equality since the walking costs of the next pushes depend on it,
+# so merging the states where the player can reach the same cells would make the search miss the cheapest solutions.
+@dataclass(frozen=True)
+class SokobanPushState:
+    layout: SokobanLayout
+    crates: FrozenSet[Point]
+    player: Point
+
+    # Convert the push state to a regular sokoban state
+    def to_state(self) -> SokobanState:
+        return SokobanState(self.layout, self.player, self.crates)
+
+    def __str__(self) -> str:
+        return str(self.to_state())
+
+# This is the push-level sokoban problem
+# It wraps a SokobanProblem and uses the same layout
+# The cost of a push is the walking distance from the player to the cell behind the crate, plus 1 for the push itself,
+# so the cost of a solution is its exact number of primitive moves and an optimal search returns an optimal solution.
+class SokobanPushProblem(Problem[SokobanPushState, SokobanPush]):
+    # The flood fills are cached since get_actions and get_cost need the walking distances of the same state
+    # The cache is cleared once it has this many entries to keep the memory bounded
+    max_cached_walks = 2**12
+
+    def __init__(self, problem: SokobanProblem) -> None:
+        super().__init__()
+        self.problem = problem
+        self.layout = problem.layout
+        # The player walks on the layout's grid where the crates are obstacles
+        self.grid = GridMap(self.layout.width, self.layout.height, self.layout.walkable)
+        self.walks: Dict[Tuple[Point, FrozenSet[Point]], Dict[Point, int]] = {}
+        self.initial_state = self.from_state(problem.initial_state)
+
+    # Return the walking distances from the player of the given state to every cell it can reach without pushing a crate
+    # The flood fills are done on the grid (from the cache if possible)
+    def get_walk_distances(self, player: Point, crates: FrozenSet[Point]) -> Dict[Point, int]:
+        key = (player, crates)
+        distances = self.walks.get(key)
+        if distances is None:
+            if len(self.walks) >= self.max_cached_walks:
+                self.walks.clear()
+            distances = self.walks[key] = self.grid.distances(player, crates)
+        return distances
+
+    # Convert a regular sokoban state to a push state
+    def from_state(self, state: SokobanState) -> SokobanPushState:
+        return SokobanPushState(self.layout, state.crates, state.player)
+
+    def get_initial_state(self) -> SokobanPushState:
+        return self.initial_state
+
+    def is_goal(self, state: SokobanPushState) -> bool:
+        return self.layout.goals == state.crates
+
+    # A crate can be pushed in a direction if the player can walk to the cell behind it
+    # and the cell in front of it is walkable and has no crate
+    # We use @track_call_count to track the number of times this function was called to count the number of explored nodes
+    @track_call_count
+    def get_actions(self, state: SokobanPushState) -> Iterable[SokobanPush]:
+        reachable = self.get_walk_distances(state.player, state.crates)
+        actions = []
+        for crate in sorted(state.crates, key=lambda position: (position.y, position.x)):
+            for direction in Direction:
+                vector = direction.to_vector()
+                crate_position = crate + vector
+                if (crate - vector) in reachable and crate_position in self.layout.walkable and crate_position not in state.crates:
+                    actions.append((crate, direction))
+        return actions
+
+    def get_successor(self, state: SokobanPushState, action: SokobanPush) -> SokobanPushState:
+        crate, direction = action
+        crate_position = crate + direction.to_vector()
+        if crate not in state.crates or crate_position not in self.layout.walkable or crate_position in state.crates:
+            # If we try to push a crate into a wall or another crate, then this action is wrong
+            raise Exception(f"Invalid push {crate} {direction} in state:" + "\n" + str(state))
+        # After the push, the player stands where the crate was
+        crates = state.crates.symmetric_difference({crate, crate_position})
+        return self.from_state(SokobanState(self.layout, crate, crates))
+
+    def get_cost(self, state: SokobanPushState, action: SokobanPush) -> float:
+        crate, direction = action
+        reachable = self.get_walk_distances(state.player, state.crates)
+        return reachable[crate - direction.to_vector()] + 1
+
+    # The push problem has the same layout but different states and actions than the wrapped problem
+    def get_fingerprint(self) -> str:
+        return "push " + self.problem.get_fingerprint()
+
+# Convert a list of pushes, applied from the given state, into the primitive moves of the player
+def expand_pushes(problem: SokobanProblem, state: SokobanState, pushes: List[SokobanPush]) -> List[Direction]:
+    grid = GridMap(problem.layout.width, problem.layout.height, problem.layout.walkable)
+    actions = []
+    for crate, direction in pushes:
+        path = grid.shortest_path(state.player, crate - direction.to_vector(), state.crates)
+        if path is None:
+            raise Exception(f"The push {crate} {direction} is not reachable in state:" + "\n" + str(state))
+        for action in path + [direction]:
+            state = problem.get_successor(state, action)
+        actions.extend(path)
+        actions.append(direction)
+    return actions
+
+# Wrap a search function so that it searches the push-level problem, then expands the pushes into primitive moves
+# The returned function takes a SokobanProblem and a SokobanState (and a heuristic for informed search functions, and any keyword arguments)
+# so it can be used by the agents in the same way as the original search function
+# The push problem only uses the layout and the states of the given problem, so the keys of the problem wrappers
+# (ZobristSokobanProblem and SymmetricSokobanProblem) are not used and play_sokoban rejects these combinations
+def push_level_search(search_fn: Callable[..., Solution]) -> Callable[..., Solution]:
+    def search(problem: SokobanProblem, initial_state: SokobanState, *args, **kwargs) -> Solution:
+        push_problem = SokobanPushProblem(problem)
+        pushes = search_fn(push_problem, push_problem.from_state(initial_state), *args, **kwargs)
+        if pushes is None:
+            return None
+        return expand_pushes(problem, initial_state, pushes)
+    return search
@@ -0,0 +1,73 @@
+from typing import Dict, List, Optional, Tuple
+
+from mathutils import Point
+from sokoban import SokobanLayout, SokobanProblem, SokobanState
+
+# This file contains the symmetry reduction of the sokoban problem
+# Many levels are mirrored or rotated copies of themselves (e.g. a room that is symmetric around its middle row).
+# In such a level, a state and its mirrored state have the same cost to reach a goal, so the search only needs to explore one of them.
+# When the problem is created, we look for the automorphisms of the layout: the rotations and reflections of the grid
+# that map the walkable cells to the walkable cells and the goals to the goals.
+# Then the canonical key of a state is the smallest encoding among all of its images (see Problem.canonical),
+# so all the mirrored copies of a state get the same key and the search engine explores only one of them.
+
+# The 8 rotations and reflections of the grid as functions of (x, y) (the first one is the identity)
+GRID_TRANSFORMS = [
+    lambda x, y: ( x,  y),
+    lambda x, y: (-x,  y),
+    lambda x, y: ( x, -y),
+    lambda x, y: (-x, -y),
+    lambda x, y: ( y,  x),
+    lambda x, y: (-y,  x),
+    lambda x, y: ( y, -x),
+    lambda x, y: (-y, -x),
+]
+
+# Return the automorphisms of the layout (except the identity) as dictionaries that map every walkable cell to its image
+# A transform is applied around the bounding box of the walkable cells, so the transformed cells are moved back into the same box
+def find_automorphisms(layout: SokobanLayout) -> List[Dict[Point, Point]]:
+    min_x = min(point.x for point in layout.walkable)
+    min_y = min(point.y for point in layout.walkable)
+    automorphisms = []
+    for transform in GRID_TRANSFORMS[1:]:
+        images = {point: transform(point.x, point.y) for point in layout.walkable}
+        offset_x = min_x - min(x for x, _ in images.values())
+        offset_y = min_y - min(y for _, y in images.values())
+        mapping = {point: Point(x + offset_x, y + offset_y) for point, (x, y) in images.items()}
+        if set(mapping.values()) == layout.walkable and {mapping[goal] for goal in layout.goals} == layout.goals:
+            automorphisms.append(mapping)
+    return automorphisms
+
+# This is a sokoban problem where the search engine keys the states by their canonical keys
+# If the layout has no symmetries, "canonical" returns None, so the search runs exactly as in SokobanProblem
+class SymmetricSokobanProblem(SokobanProblem):
+    def __init__(self, problem: SokobanProblem) -> None:
+        super().__init__()
+        self.layout = problem.layout
+        self.initial_state = problem.initial_state
+        self.automorphisms = find_automorphisms(self.layout)
+        # The encoding of a state is (crates bit mask, player index) where every cell has an index in row order
+        # For every transform (starting with the identity), we precompute the index and the bit of the image of every cell
+        cells = sorted(self.layout.walkable, key=lambda point: (point.y, point.x))
+        index = {point: i for i, point in enumerate(cells)}
+        self.encodings: List[Tuple[Dict[Point, int], Dict[Point, int]]] = []
+        for mapping in [{point: point for point in cells}] + self.automorphisms:
+            players = {point: index[mapping[point]] for point in cells}
+            bits = {point: 1 << index[mapping[point]] for point in cells}
+            self.encodings.append((players, bits))
+
+    # The smallest encoding among the images of the state, so that the images of a state all have the same key
+    def canonical(self, state: SokobanState) -> Optional[Tuple[int, int]]:
+        if not self.automorphisms:
+            return None
+        crates = state.crates
+        return min((sum(bits[crate] for crate in crates), players[state.player]) for players, bits in self.encodings)
+
+    @staticmethod
+    def from_text(text: str) -> 'SymmetricSokobanProblem':
+        return SymmetricSokobanProblem(SokobanProblem.from_text(text))
+
+    @staticmethod
+    def from_file(path: str) -> 'SymmetricSokobanProblem':
+        with open(path, 'r') as f:
+            return SymmetricSokobanProblem.from_text(f.read())
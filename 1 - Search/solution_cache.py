@@ -0,0 +1,137 @@
+from typing import Any, Callable, Optional, Tuple, Union
+from enum import Enum
+import dataclasses, hashlib, json, os, sqlite3, time
+
+from problem import Problem, S, A, Solution
+
+# This file contains a persistent cache of the solutions found by the search agents
+# The solutions are stored in an sqlite database, so they survive between runs
+# and they can be shared by many agents (and processes) on the same machine.
+# A solution is keyed by:
+#   - the name of the search (the agent and its heuristic, since different searches may return different solutions)
+#   - the fingerprint of the problem (see Problem.get_fingerprint)
+#   - the state from which the search started
+# The database holds at most "capacity" solutions, and the least recently used ones are removed first.
+# A solution is stored as a JSON list of its actions (see Problem.encode_action), or as "null" if there is no solution.
+# Since the database may be shared, nothing in it is trusted: a solution that can not be decoded is ignored
+# and a decoded solution is only returned if it reaches a goal.
+
+# Convert a state to a value that does not depend on the order of the sets or on the identity of the objects,
+# so that the same state always gets the same key in every run
+def canonical(value: Any) -> Any:
+    if isinstance(value, Enum):
+        return canonical(value.value)
+    if dataclasses.is_dataclass(value):
+        return [type(value).__name__] + [canonical(getattr(value, field.name)) for field in dataclasses.fields(value) if field.compare]
+    if isinstance(value, (set, frozenset)):
+        return sorted((canonical(item) for item in value), key=json.dumps)
+    if isinstance(value, (tuple, list)):
+        return [canonical(item) for item in value]
+    if isinstance(value, dict):
+        return sorted(([canonical(key), canonical(item)] for key, item in value.items()), key=json.dumps)
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    # Other objects (e.g. sokoban layouts which are compared by identity) are already described by the problem fingerprint
+    return type(value).__name__
+
+# Returns a short hash of the given text
+def digest(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+class SolutionCache:
+    def __init__(self, path: str, capacity: int = 2**16) -> None:
+        self.path = path
+        self.capacity = capacity
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # The timeout lets other processes finish their writes instead of failing immediately
+        self.connection = sqlite3.connect(path, timeout=30)
+        # In the write-ahead log mode, the readers do not block the writer (and vice versa)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS solutions ("
+                "problem TEXT NOT NULL, state TEXT NOT NULL, solution TEXT NOT NULL, last_used REAL NOT NULL, "
+                "PRIMARY KEY (problem, state))"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS solutions_last_used ON solutions (last_used)")
+
+    def close(self) -> None:
+        self.connection.close()
+
+    # Returns the (problem, state) key of the solution or None if the problem does not support caching
+    def get_key(self, name: str, problem: Problem[S, A], state: S) -> Optional[Tuple[str, str]]:
+        fingerprint = problem.get_fingerprint()
+        if fingerprint is None:
+            return None
+        return digest(name + "\n" + fingerprint), digest(json.dumps(canonical(state)))
+
+    # Returns a tuple (found, solution) where solution is None if the problem was found to have no solution
+    # A cached solution is replayed from the state and it is only returned if it still reaches a goal
+    def get(self, name: str, problem: Problem[S, A], state: S) -> Tuple[bool, Solution]:
+        key = self.get_key(name, problem, state)
+        if key is None:
+            return False, None
+        row = self.connection.execute("SELECT solution FROM solutions WHERE problem = ? AND state = ?", key).fetchone()
+        if row is None:
+            return False, None
+        solution = decode_solution(problem, row[0])
+        if solution is False or (solution is not None and not reaches_goal(problem, state, solution)):
+            return False, None
+        with self.connection:
+            self.connection.execute("UPDATE solutions SET last_used = ? WHERE problem = ? AND state = ?", (time.time(), *key))
+        return True, solution
+
+    # Stores the solution (or None if there is no solution) then removes the least recently used solutions beyond the capacity
+    def put(self, name: str, problem: Problem[S, A], state: S, solution: Solution) -> None:
+        key = self.get_key(name, problem, state)
+        if key is None:
+            return
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO solutions (problem, state, solution, last_used) VALUES (?, ?, ?, ?)",
+                (*key, encode_solution(problem, solution), time.time())
+            )
+            self.connection.execute(
+                "DELETE FROM solutions WHERE rowid IN (SELECT rowid FROM solutions ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.capacity,)
+            )
+
+    # Returns the cached solution if there is one, otherwise, it calls "search" and caches its result
+    # If the search is not complete (e.g. it stops when its time budget runs out), not finding a solution
+    # does not prove that there is none, so only the solutions that it finds are cached
+    def search(self, name: str, problem: Problem[S, A], state: S, search: Callable[[], Solution], complete: bool = True) -> Solution:
+        found, solution = self.get(name, problem, state)
+        if not found:
+            solution = search()
+            if solution is not None or complete:
+                self.put(name, problem, state, solution)
+        return solution
+
+# Convert a solution to JSON (the actions are encoded by the problem)
+def encode_solution(problem: Problem[S, A], solution: Solution) -> str:
+    return json.dumps(None if solution is None else [problem.encode_action(action) for action in solution])
+
+# Convert a stored solution back to a list of actions (or None if there is no solution)
+# Returns False if the text is not a valid solution for the problem (e.g. it was written by an older version)
+def decode_solution(problem: Problem[S, A], text: str) -> Union[Solution, bool]:
+    try:
+        actions = json.loads(text)
+        if actions is None:
+            return None
+        if not isinstance(actions, list):
+            return False
+        return [problem.decode_action(value) for value in actions]
+    except (KeyError, IndexError, TypeError, ValueError):
+        return False
+
+# Apply the solution to the state and check that it ends at a goal (an invalid action raises an exception in most problems)
+# We do not call "get_actions" here since it is used to count the explored nodes
+def reaches_goal(problem: Problem[S, A], state: S, solution: Solution) -> bool:
+    try:
+        for action in solution:
+            state = problem.get_successor(state, action)
+    except Exception:
+        return False
+    return problem.is_goal(state)
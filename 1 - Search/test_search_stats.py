@@ -0,0 +1,36 @@
+from sokoban import SokobanProblem
+from sokoban_heuristic import strong_heuristic
+from search import IterativeDeepeningAStar, SimplifiedMemoryBoundedAStar
+from helpers.utils import fetch_tracked_call_count
+import search_stats
+
+# These tests check that the memory bounded searches report their expansions to the search statistics
+# Run them with: python -m pytest test_search_stats.py (or python test_search_stats.py)
+
+# Run the search on level1 while collecting the statistics and return them with the number of get_actions calls
+def collect_level1(search_fn):
+    problem = SokobanProblem.from_file("levels/level1.txt")
+    fetch_tracked_call_count(SokobanProblem.get_actions)
+    with search_stats.collect() as stats:
+        solution = search_fn(problem, problem.get_initial_state(), strong_heuristic)
+    assert solution is not None
+    return stats, fetch_tracked_call_count(SokobanProblem.get_actions)
+
+def test_idastar_stats():
+    stats, explored = collect_level1(IterativeDeepeningAStar)
+    assert stats.searches == 1
+    assert stats.expanded == explored > 0
+    assert stats.generated >= stats.expanded
+    assert stats.peak_frontier_size > 0
+
+def test_smastar_stats():
+    stats, explored = collect_level1(SimplifiedMemoryBoundedAStar)
+    assert stats.searches == 1
+    assert stats.expanded >= explored > 0
+    assert stats.generated > 0
+    assert stats.peak_frontier_size > 0
+
+if __name__ == "__main__":
+    test_idastar_stats()
+    test_smastar_stats()
+    print("All the tests passed")
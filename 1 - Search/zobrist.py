@@ -0,0 +1,131 @@
+from typing import Dict, Hashable, Iterable, Tuple
+import random
+
+from mathutils import Direction, Point
+from sokoban import SokobanProblem, SokobanState
+from parking import ParkingProblem, ParkingAction, ParkingState
+
+# This file contains the Zobrist hashing of the sokoban and parking states
+# The search engine keys its explored and parent tables by "problem.get_state_key" and "problem.get_successor_key" (see problem.py)
+# which return the state itself by default. Hashing a state tuple or a frozenset of points calls the hash function of every point,
+# so instead, the problems here give every state a 64-bit key which is the XOR of a random number for every (piece, position) in the state.
+# An action only moves 1 or 2 pieces, so the key of a successor is computed from the key of its parent in constant time:
+#   key(successor) = key(state) XOR value(piece, old position) XOR value(piece, new position)
+# Since the tables only store the keys, 2 different states with the same key would be merged (a collision).
+# With 64-bit keys, this is very unlikely but to be safe, the problems can be created with "check_keys=True" (the debug mode)
+# which compares every incremental key with the key computed from scratch and raises an exception on any collision.
+
+# The random numbers are generated from a fixed seed so that the keys (and the searches) are reproducible
+ZOBRIST_SEED = 0x5EED
+
+# A table that lazily assigns a random 64-bit number to every feature (a hashable description of a piece at a position)
+class ZobristTable:
+    def __init__(self, seed: int = ZOBRIST_SEED) -> None:
+        self.random = random.Random(seed)
+        self.values: Dict[Hashable, int] = {}
+
+    def __getitem__(self, feature: Hashable) -> int:
+        value = self.values.get(feature)
+        if value is None:
+            value = self.values[feature] = self.random.getrandbits(64)
+        return value
+
+    # Returns the XOR of the values of the given features
+    def combine(self, features: Iterable[Hashable]) -> int:
+        key = 0
+        for feature in features:
+            key ^= self[feature]
+        return key
+
+# The debug mode shared by the problems below
+# Every (key, state) pair computed during the search is checked then remembered, so this mode uses a lot more memory
+class ZobristKeyChecker:
+    def __init__(self) -> None:
+        self.states: Dict[int, Hashable] = {}
+
+    def check(self, key: int, expected_key: int, state: Hashable) -> None:
+        if key != expected_key:
+            raise Exception(f"The incremental key {key:#x} does not match the key {expected_key:#x} of the state:" + "\n" + str(state))
+        other = self.states.setdefault(key, state)
+        if other != state:
+            raise Exception(f"The key {key:#x} collides for the states:" + "\n" + str(other) + "\n" + str(state))
+
+# This is a sokoban problem where the search engine keys the states by their Zobrist keys
+# The features are ("player", position) and ("crate", position)
+class ZobristSokobanProblem(SokobanProblem):
+    def __init__(self, problem: SokobanProblem, check_keys: bool = False) -> None:
+        super().__init__()
+        self.layout = problem.layout
+        self.initial_state = problem.initial_state
+        table = ZobristTable()
+        # The values are precomputed for every walkable cell, so the key updates are plain dictionary lookups
+        self.player_values = {position: table[("player", position)] for position in self.layout.walkable}
+        self.crate_values = {position: table[("crate", position)] for position in self.layout.walkable}
+        self.checker = ZobristKeyChecker() if check_keys else None
+
+    def get_state_key(self, state: SokobanState) -> int:
+        key = self.player_values[state.player]
+        for crate in state.crates:
+            key ^= self.crate_values[crate]
+        return key
+
+    def get_successor_key(self, state: SokobanState, key: int, action: Direction, successor: SokobanState) -> int:
+        player_values = self.player_values
+        successor_key = key ^ player_values[state.player] ^ player_values[successor.player]
+        # If a crate was pushed, it moved from the new player position one step further in the same direction
+        if successor.crates is not state.crates:
+            crate_values = self.crate_values
+            successor_key ^= crate_values[successor.player] ^ crate_values[successor.player + action.to_vector()]
+        if self.checker is not None:
+            self.checker.check(successor_key, self.get_state_key(successor), successor)
+        return successor_key
+
+    @staticmethod
+    def from_text(text: str, check_keys: bool = False) -> 'ZobristSokobanProblem':
+        return ZobristSokobanProblem(SokobanProblem.from_text(text), check_keys)
+
+    @staticmethod
+    def from_file(path: str, check_keys: bool = False) -> 'ZobristSokobanProblem':
+        with open(path, 'r') as f:
+            return ZobristSokobanProblem.from_text(f.read(), check_keys)
+
+# This is a parking problem where the search engine keys the states by their Zobrist keys
+# The features are (car index, position)
+class ZobristParkingProblem(ParkingProblem):
+    def __init__(self, problem: ParkingProblem, check_keys: bool = False) -> None:
+        super().__init__()
+        self.passages = problem.passages
+        self.cars = problem.cars
+        self.slots = problem.slots
+        self.width = problem.width
+        self.height = problem.height
+        table = ZobristTable()
+        # car_values[i] maps every passage to the value of car "i" at this passage
+        self.car_values: Tuple[Dict[Point, int], ...] = tuple(
+            {position: table[(index, position)] for position in self.passages}
+            for index in range(len(self.cars))
+        )
+        self.checker = ZobristKeyChecker() if check_keys else None
+
+    def get_state_key(self, state: ParkingState) -> int:
+        key = 0
+        for values, car in zip(self.car_values, state):
+            key ^= values[car]
+        return key
+
+    def get_successor_key(self, state: ParkingState, key: int, action: ParkingAction, successor: ParkingState) -> int:
+        index = action[0]
+        values = self.car_values[index]
+        successor_key = key ^ values[state[index]] ^ values[successor[index]]
+        if self.checker is not None:
+            self.checker.check(successor_key, self.get_state_key(successor), successor)
+        return successor_key
+
+    @staticmethod
+    def from_text(text: str, check_keys: bool = False) -> 'ZobristParkingProblem':
+        return ZobristParkingProblem(ParkingProblem.from_text(text), check_keys)
+
+    @staticmethod
+    def from_file(path: str, check_keys: bool = False) -> 'ZobristParkingProblem':
+        with open(path, 'r') as f:
+            return ZobristParkingProblem.from_text(f.read(), check_keys)
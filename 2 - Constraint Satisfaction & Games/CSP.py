@@ -1,4 +1,4 @@
-from typing import Callable, Dict, List, Any, Tuple
+from typing import Callable, Dict, List, Any, Optional, Set, Tuple
 from helpers.utils import track_call_count
 
 # This is the type definition for an Assignment
@@ -57,6 +57,115 @@ class BinaryConstraint(Constraint):
         variable1, variable2 = self.variables
         return variable2 if variable == variable1 else variable1
 
+# This is a class for the global "all different" constraint (an n-ary constraint that requires all its variables to have different values).
+# It replaces the binary "!=" constraints between every pair of its variables (n*(n-1)/2 constraints),
+# and it can remove more values than these binary constraints since it considers all the variables together (see "propagate").
+class AllDifferentConstraint(Constraint):
+    variables: List[str]    # The name of the variables that are in the constraint.
+
+    def __init__(self, variables: List[str]) -> None:
+        super().__init__()
+        self.variables = list(variables)
+
+    # This function checks if all the variables are assigned different values.
+    # If any of the variables are unassigned, the assignment does not satisfy the condition.
+    # Important: If the value of a variable in the assignment is None, then it is assumed as if it is unassigned.
+    def is_satisfied(self, assignment: Assignment) -> bool:
+        values = [assignment.get(variable) for variable in self.variables]
+        if any(value is None for value in values): return False
+        return len(set(values)) == len(values)
+
+    # This function removes the values that can not be part of any solution of the constraint (Regin's filtering algorithm).
+    # Only the variables that have a domain in "domains" are considered (the assigned variables are ignored since forward checking
+    # already removed their values from the other domains). The function does not modify the given domains, it returns None
+    # if the constraint can not be satisfied and otherwise, it returns the reduced domains of the variables that lost some values.
+    # The algorithm works on the bipartite graph between the variables and their values:
+    #   - A solution of the constraint is a matching that covers all the variables, so first, we find a maximum matching.
+    #     If it does not cover all the variables, the constraint can not be satisfied.
+    #   - A value that is not matched to a variable belongs to some solution if we can swap the matching along an alternating path or cycle.
+    #     So we direct the matched edges from the variables to the values and the other edges from the values to the variables,
+    #     then an edge belongs to some solution if it is matched, or it is reachable from a free value (an even alternating path),
+    #     or both of its ends are in the same strongly connected component (an even alternating cycle).
+    def propagate(self, domains: Dict[str, set]) -> Optional[Dict[str, set]]:
+        variables = [variable for variable in self.variables if variable in domains]
+        holders: Dict[Any, List[str]] = {} # The variables that have each value in their domains
+        for variable in variables:
+            for value in domains[variable]:
+                holders.setdefault(value, []).append(variable)
+
+        # Find a maximum matching using augmenting paths (Kuhn's algorithm)
+        matched_variable: Dict[Any, str] = {}   # The variable matched to each value
+        matched_value: Dict[str, Any] = {}      # The value matched to each variable
+        def augment(variable: str, visited: Set[Any]) -> bool:
+            for value in domains[variable]:
+                if value in visited: continue
+                visited.add(value)
+                owner = matched_variable.get(value)
+                if owner is None or augment(owner, visited):
+                    matched_variable[value] = variable
+                    matched_value[variable] = value
+                    return True
+            return False
+        for variable in variables:
+            if not augment(variable, set()):
+                return None
+
+        # The nodes of the graph are ("variable", name) and ("value", value) so that the values never collide with the names
+        def successors(node: Tuple[str, Any]) -> List[Tuple[str, Any]]:
+            kind, item = node
+            if kind == "variable":
+                return [("value", matched_value[item])]
+            return [("variable", variable) for variable in holders[item] if matched_value[variable] != item]
+
+        # Mark the nodes that are reachable from the free values
+        reachable = {("value", value) for value in holders if value not in matched_variable}
+        stack = list(reachable)
+        while stack:
+            for successor in successors(stack.pop()):
+                if successor not in reachable:
+                    reachable.add(successor)
+                    stack.append(successor)
+
+        # Find the strongly connected components (Tarjan's algorithm)
+        component: Dict[Tuple[str, Any], int] = {}
+        index: Dict[Tuple[str, Any], int] = {}
+        low: Dict[Tuple[str, Any], int] = {}
+        path: List[Tuple[str, Any]] = []
+        on_path: Set[Tuple[str, Any]] = set()
+        def connect(node: Tuple[str, Any]) -> None:
+            index[node] = low[node] = len(index)
+            path.append(node)
+            on_path.add(node)
+            for successor in successors(node):
+                if successor not in index:
+                    connect(successor)
+                    low[node] = min(low[node], low[successor])
+                elif successor in on_path:
+                    low[node] = min(low[node], index[successor])
+            if low[node] == index[node]:
+                while True:
+                    member = path.pop()
+                    on_path.discard(member)
+                    component[member] = index[node]
+                    if member == node: break
+        for variable in variables:
+            if ("variable", variable) not in index:
+                connect(("variable", variable))
+
+        # Remove the unmatched edges that are neither on an even alternating path nor on an even alternating cycle
+        reduced = {}
+        for variable in variables:
+            node = ("variable", variable)
+            removed = [
+                value for value in domains[variable]
+                if value != matched_value[variable]
+                and ("value", value) not in reachable
+                and component.get(("value", value)) != component[node]
+            ]
+            if removed:
+                reduced[variable] = domains[variable].difference(removed)
+        return reduced
+
 # This defines a generic CSP problem
 class Problem:
     variables: List[str]            # A list of the variable names in the problem
@@ -72,3 +181,32 @@ class Problem:
     # Return True if the assignment satisfies all the constraints.
     def satisfies_constraints(self, assignment: Assignment) -> bool:
         return all(constraint.is_satisfied(assignment) for constraint in self.constraints)
+
+    # Returns the binary constraints that involve the given variable as a list of (constraint, other variable, is first) tuples
+    # where "is first" is True if the given variable is the first argument of the constraint's condition.
+    # The index of all the variables is built on the first call and cached, so the solver only visits the constraints
+    # of a variable instead of scanning all the constraints of the problem for every assignment.
+    # Since 1-Consistency replaces the constraints list, the index is rebuilt whenever the list (or its length) changes.
+    def get_binary_constraints(self, variable: str) -> List[Tuple[BinaryConstraint, str, bool]]:
+        self.build_constraint_index()
+        return self.binary_constraints.get(variable, [])
+
+    # Returns the "all different" constraints that involve the given variable (using the same index as "get_binary_constraints")
+    def get_all_different_constraints(self, variable: str) -> List[AllDifferentConstraint]:
+        self.build_constraint_index()
+        return self.all_different_constraints.get(variable, [])
+
+    def build_constraint_index(self) -> None:
+        source = (id(self.constraints), len(self.constraints))
+        if getattr(self, "constraint_index_source", None) == source: return
+        self.binary_constraints: Dict[str, List[Tuple[BinaryConstraint, str, bool]]] = {}
+        self.all_different_constraints: Dict[str, List[AllDifferentConstraint]] = {}
+        for constraint in self.constraints:
+            if isinstance(constraint, BinaryConstraint):
+                variable1, variable2 = constraint.variables
+                self.binary_constraints.setdefault(variable1, []).append((constraint, variable2, True))
+                self.binary_constraints.setdefault(variable2, []).append((constraint, variable1, False))
+            elif isinstance(constraint, AllDifferentConstraint):
+                for variable in constraint.variables:
+                    self.all_different_constraints.setdefault(variable, []).append(constraint)
+        self.constraint_index_source = source
@@ -1,7 +1,22 @@
-from typing import Any, Dict, List, Optional
-from CSP import Assignment, BinaryConstraint, Problem, UnaryConstraint
+from typing import Any, Dict, List, Optional, Tuple
+from CSP import AllDifferentConstraint, Assignment, BinaryConstraint, Problem, UnaryConstraint
 from helpers.utils import NotImplemented
-import copy
+from bitset_domains import BitsetDomains
+import arc_consistency as ac
+
+# This is the type definition for a Trail (or an undo log)
+# Every time a domain is reduced during the search, the domains dictionary, the variable and its previous domain are appended to the trail.
+# (Other dictionaries that must be restored on backtracking can also be recorded, e.g. the last supports of AC-2001 in arc_consistency.py).
+# To undo all the changes since some point, we remember the trail length at that point
+# and restore the recorded values in the reverse order until the trail is back to that length (see "undo").
+# The reduced domains are always new objects, so the recorded domains are never modified and restoring them needs no copying.
+Trail = List[Tuple[Dict[str, Any], str, Any]]
+
+# This function restores the values that were recorded in the trail after the given mark (a previous length of the trail).
+def undo(trail: Trail, mark: int) -> None:
+    while len(trail) > mark:
+        store, key, value = trail.pop()
+        store[key] = value
 
 # This function applies 1-Consistency to the problem.
 # In other words, it modifies the domains to only include values that satisfy their variables' unary constraints.
@@ -42,27 +57,18 @@ def minimum_remaining_values(problem: Problem, domains: Dict[str, set]) -> str:
 #   - If any variable's domain becomes empty, return False. Otherwise, return True.
 # IMPORTANT: Don't use the domains inside the problem, use and modify the ones given by the "domains" argument 
 #            since they contain the current domains of unassigned variables only.
-def forward_checking(problem: Problem, assigned_variable: str, assigned_value: Any, domains: Dict[str, set]) -> bool:
+# If a trail is given, every reduced domain is replaced by a new set and the previous one is recorded in the trail,
+# so the caller can undo the reductions (even if the function returns False) instead of copying all the domains beforehand.
+# A domain is only copied (and recorded) once, right before its first value is removed, so the domains that do not change stay out of the trail.
+def forward_checking(problem: Problem, assigned_variable: str, assigned_value: Any, domains: Dict[str, set], trail: Optional[Trail] = None) -> bool:
     #TODO: Write this function
     # NotImplemented()
 
-    # loop over all constraints in the problem
-    for constraint in problem.constraints:
-        
-        # check if this constraint is not a UnaryConstraint
-        if isinstance(constraint, UnaryConstraint):
-            continue
-        
-        # cast the constraint to its original class `BinaryConstraint`
-        constraint: BinaryConstraint = constraint
-        v1, v2 = constraint.variables
+    # the variables whose domain was already replaced by a new copy in this call (with a trail), they are reduced in place
+    copied = set()
 
-        # check if the assigned variable is involved in this constraint
-        if assigned_variable not in constraint.variables:
-            continue
-        
-        # get the other involved variable
-        other_variable = constraint.get_other(assigned_variable)
+    # loop over the binary constraints that involve the assigned variable (see Problem.get_binary_constraints)
+    for constraint, other_variable, is_first in problem.get_binary_constraints(assigned_variable):
 
         # get the domain of the other involved variable
         other_variable_domain = domains.get(other_variable, set())
@@ -70,26 +76,58 @@ def forward_checking(problem: Problem, assigned_variable: str, assigned_value: A
         # check if the other involved variable has no domain (already assigned)
         if len(other_variable_domain) == 0:
             continue
-        
+
+        # if the values are removed from the domain itself (without a trail or if it is already a copy made by this call),
         # make a copy of the variable domain to keep the length constant because of deletion in the loop
-        other_variable_domain_copy = other_variable_domain.copy()
+        in_place = trail is None or other_variable in copied
+        other_variable_domain_copy = other_variable_domain.copy() if in_place else other_variable_domain
 
         # loop over all values in the other variable domain
         for other_value in other_variable_domain_copy:
 
             # prepare the variables order
             param1, param2 = other_value, assigned_value
-            if assigned_variable == v1:
+            if is_first:
                 param1, param2 = assigned_value, other_value
 
             # check if the constraint is violated
             if constraint.condition(param1, param2) == False:
+                # with a trail, keep the previous domain as it is in the trail and reduce a new copy of it instead
+                if not in_place:
+                    trail.append((domains, other_variable, other_variable_domain))
+                    other_variable_domain = domains[other_variable] = other_variable_domain.copy()
+                    copied.add(other_variable)
+                    in_place = True
                 # remove the assigned value from the other involved variable domain (if exist)
                 other_variable_domain.discard(other_value)
                 # check if the other involved variable domain became empty
                 if len(other_variable_domain) == 0:
                     return False
 
+    # loop over the "all different" constraints that involve the assigned variable (n-ary constraints)
+    # the assigned value is removed from the domains of the other variables, exactly as a binary "!=" constraint between every pair would do
+    for constraint in problem.get_all_different_constraints(assigned_variable):
+        for other_variable in constraint.variables:
+
+            # get the domain of the other involved variable and skip it if it does not contain the assigned value (or has no domain)
+            other_variable_domain = domains.get(other_variable, set())
+            if other_variable == assigned_variable or assigned_value not in other_variable_domain:
+                continue
+
+            # remove the assigned value from a new copy of the domain (recording the previous domain in the trail)
+            # unless the domain is already a copy made by this call
+            if trail is not None and other_variable in copied:
+                other_variable_domain.discard(assigned_value)
+            else:
+                if trail is not None:
+                    trail.append((domains, other_variable, other_variable_domain))
+                    copied.add(other_variable)
+                other_variable_domain = domains[other_variable] = other_variable_domain - {assigned_value}
+
+            # check if the other involved variable domain became empty
+            if len(other_variable_domain) == 0:
+                return False
+
     # no constraint made any variable's domain empty, valid assignment
     return True
 
@@ -118,32 +156,29 @@ def least_restraining_values(problem: Problem, variable_to_assign: str, domains:
         
         # count the number of remaining values for neighboring variables if 'value' is assigned
         count = 0
-        for constraint in problem.constraints:
-            # check if it is a binary constraint and the variable to assign is involved in this constraint
-            if isinstance(constraint, BinaryConstraint) and variable_to_assign in constraint.variables:
-                # get the variables of this constraint
-                v1, v2 = constraint.variables
+        # loop over the binary constraints that involve the variable to assign (see Problem.get_binary_constraints)
+        for constraint, other_variable, is_first in problem.get_binary_constraints(variable_to_assign):
+            # get the other variable domain
+            other_variable_domain = domains.get(other_variable, set())
+            
+            # loop over all values of the other variable domain
+            for other_value in other_variable_domain:
+                
+                # prepare the variables order
+                param1, param2 = other_value, value
+                if is_first:
+                    param1, param2 = value, other_value
 
-                # get the other variable
-                other_variable = constraint.get_other(variable_to_assign)
+                # check if the condition is not breaked
+                if constraint.condition(param1, param2):
+                    continue
+                # condition is breaked and the count will be incremented
+                else:
+                    count += 1
 
-                # get the other variable domain
-                other_variable_domain = domains.get(other_variable, set())
-                
-                # loop over all values of the other variable domain
-                for other_value in other_variable_domain:
-                    
-                    # prepare the variables order
-                    param1, param2 = other_value, value
-                    if variable_to_assign == v1:
-                        param1, param2 = value, other_value
-
-                    # check if the condition is not breaked
-                    if constraint.condition(param1, param2):
-                        continue
-                    # condition is breaked and the count will be incremented
-                    else:
-                        count += 1
+        # an "all different" constraint rules out the value from the domain of each of its other variables
+        for constraint in problem.get_all_different_constraints(variable_to_assign):
+            count += sum(1 for other_variable in constraint.variables if other_variable != variable_to_assign and value in domains.get(other_variable, set()))
         
         # store the count for the current value
         domain_values_dependency[value] = count
@@ -160,10 +195,18 @@ def least_restraining_values(problem: Problem, variable_to_assign: str, domains:
 # IMPORTANT: To get the correct result for the explored nodes, you should check if the assignment is complete only once using "problem.is_complete"
 #            for every assignment including the initial empty assignment, EXCEPT for the assignments pruned by the forward checking.
 #            Also, if 1-Consistency deems the whole problem unsolvable, you shouldn't call "problem.is_complete" at all.
-def solve(problem: Problem) -> Optional[Assignment]:
+# If bitsets is True, the domains are stored as integer masks and the constraints are checked using support tables (see bitset_domains.py).
+# The search is the same in both cases, so it returns the same solution after exploring the same nodes.
+# If arc_consistency is the name of an arc consistency algorithm ("ac3" or "ac2001", see arc_consistency.py), the search maintains
+# arc consistency (MAC): the domains are made arc consistent before the search, and after the forward checking of every assignment,
+# the reductions are propagated to the other variables. This prunes more assignments, so it explores fewer nodes.
+def solve(problem: Problem, bitsets: bool = False, arc_consistency: Optional[str] = None) -> Optional[Assignment]:
     #TODO: Write this function
     # NotImplemented()
 
+    # the trail of the domain reductions done by the forward checking (see Trail)
+    trail: Trail = []
+
     # define the backtrack function which will do the backtracking algorithm
     def backtrack(problem: Problem, assignment: Assignment, domains: Dict[str, set]) -> Optional[Assignment]:
 
@@ -172,27 +215,29 @@ def solve(problem: Problem) -> Optional[Assignment]:
             return assignment
         
         # get the variable with the minimum remaining values
-        variable = minimum_remaining_values(problem, domains)
+        variable = select_variable(domains)
 
         # get the values of this variable sorted based on the least conflicting with other variables
-        values = least_restraining_values(problem, variable, domains)
+        values = order_values(variable, domains)
 
         # remove the domain of this variable, marking it as assigned
         variable_domain = domains.pop(variable)
 
         # loop over all values of the selected variable
         for value in values:
-            # make a deep copy of the domain
-            domains_copy = copy.deepcopy(domains)
+            # remember the trail length to undo the domain reductions of this value
+            mark = len(trail)
             # add assignation of the variable
             assignment[variable] = value
             # update the domains and check if this assignation will not make another variable wih empty domain
-            if forward_checking(problem, variable, value, domains_copy):
+            if check_value(variable, value, domains, trail):
                 # the assignation is valid, backtrack again with this assignation and the updated domains
-                result = backtrack(problem, assignment, domains_copy)
+                result = backtrack(problem, assignment, domains)
                 # check if the returned result is valid to return it
                 if result is not None:
                     return result
+            # restore the domains that were reduced after assigning this value
+            undo(trail, mark)
             # remove the assigned variable to not conflict with other assignations
             del assignment[variable]
         # add back the deleted domain of the selected variable 
@@ -205,5 +250,37 @@ def solve(problem: Problem) -> Optional[Assignment]:
     if not one_consistency(problem):
         return None
     
+    # select the functions that work on the chosen representation of the domains
+    if bitsets:
+        bitset_domains = BitsetDomains(problem)
+        select_variable = bitset_domains.minimum_remaining_values
+        order_values = bitset_domains.least_restraining_values
+        check_value = bitset_domains.forward_checking
+        domains = bitset_domains.encode(problem.domains)
+    else:
+        select_variable = lambda domains: minimum_remaining_values(problem, domains)
+        order_values = lambda variable, domains: least_restraining_values(problem, variable, domains)
+        check_value = lambda variable, value, domains, trail: forward_checking(problem, variable, value, domains, trail)
+        # only the dictionary is copied since the reduced domains are replaced, not modified
+        domains = dict(problem.domains)
+
+    # maintain arc consistency by propagating the reductions of the forward checking (only with the set domains)
+    if arc_consistency is not None:
+        if bitsets:
+            raise Exception("Arc consistency can not be maintained on the bitset domains")
+        if arc_consistency not in ac.ALGORITHMS:
+            raise Exception(f"Unknown arc consistency algorithm: {arc_consistency}. Valid algorithms are: {', '.join(ac.ALGORITHMS)}")
+        propagator = ac.ALGORITHMS[arc_consistency](problem)
+        forward_check = check_value
+        def check_value(variable: str, value: Any, domains: Dict[str, set], trail: Trail) -> bool:
+            mark = len(trail)
+            if not forward_check(variable, value, domains, trail):
+                return False
+            reduced = [key for store, key, _ in trail[mark:] if store is domains]
+            return propagator.propagate(domains, trail, reduced)
+        # like 1-Consistency, if arc consistency deems the whole problem unsolvable, the search does not start
+        if not propagator.propagate(domains):
+            return None
+
     # start backtracking
-    return backtrack(problem, {}, problem.domains)
\ No newline at end of file
+    return backtrack(problem, {}, domains)
\ No newline at end of file
@@ -0,0 +1,161 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from collections import deque
+from CSP import AllDifferentConstraint, Problem
+
+# This file contains the arc consistency algorithms for the CSP problems
+# An arc (X, Y) of a binary constraint is consistent if every value of X has a support in Y
+# (a value of Y that satisfies the constraint with it). A problem is arc consistent if all its arcs are consistent.
+# Both algorithms keep a queue of the arcs to revise: revising (X, Y) removes the values of X that have no support in Y,
+# and if X loses a value, the arcs (Z, X) are revised again since their supports may have been removed.
+#   - AC-3 looks for a support among all the values of Y every time an arc is revised.
+#   - AC-2001 remembers the last support found for every value. The values of Y are checked in ascending order,
+#     so when the last support is removed, the search continues after it (the values before it were already rejected).
+# The functions "ac3" and "ac2001" apply arc consistency to the domains of a problem (like CSP_solver.one_consistency),
+# and the classes can also maintain arc consistency during the backtracking search (see CSP_solver.solve).
+# The variables that have no domain (the assigned variables in the search) are ignored.
+# The "all different" constraints are propagated in the same queue, using their own algorithm (see AllDifferentConstraint.propagate):
+# they are revised when one of their variables loses a value, and when they reduce some domains, the arcs into these variables are revised.
+
+# This is the type definition for an Arc: (variable, other variable, condition) where the condition
+# takes the value of the variable first then the value of the other variable.
+Arc = Tuple[str, str, Callable[[Any, Any], bool]]
+
+class ArcConsistency(ABC):
+    arcs: List[Arc]                 # All the arcs of the binary constraints (2 arcs per constraint)
+    reverse: List[int]              # The index of the arc (Y, X) of the same constraint for each arc (X, Y)
+    global_constraints: List[AllDifferentConstraint]   # The "all different" constraints, the index of the constraint i in the queue is len(arcs) + i
+    incoming: Dict[str, List[int]]  # The indices of the arcs (Z, X) and of the "all different" constraints to revise when the variable X changes
+
+    def __init__(self, problem: Problem) -> None:
+        self.arcs = []
+        self.incoming = {}
+        indices, reverse_keys = {}, []
+        for variable in problem.domains:
+            for constraint, other_variable, is_first in problem.get_binary_constraints(variable):
+                # a variable without a domain is never revised (as in CSP_solver.forward_checking)
+                if other_variable not in problem.domains: continue
+                condition = constraint.condition
+                if not is_first:
+                    condition = (lambda condition: lambda value, other_value: condition(other_value, value))(condition)
+                indices[(id(constraint), variable)] = len(self.arcs)
+                reverse_keys.append((id(constraint), other_variable))
+                self.incoming.setdefault(other_variable, []).append(len(self.arcs))
+                self.arcs.append((variable, other_variable, condition))
+        self.reverse = [indices[key] for key in reverse_keys]
+        self.global_constraints = []
+        for constraint in problem.constraints:
+            if isinstance(constraint, AllDifferentConstraint):
+                for variable in constraint.variables:
+                    self.incoming.setdefault(variable, []).append(len(self.arcs) + len(self.global_constraints))
+                self.global_constraints.append(constraint)
+
+    # Revise the arc with the given index and return the remaining values of its variable (or None if nothing was removed)
+    @abstractmethod
+    def revise(self, arc: int, domains: Dict[str, set], trail: Optional[List]) -> Optional[set]:
+        pass
+
+    # Revise the arcs until no domain changes, starting from the arcs that lead to the given variables (or from all the arcs if None)
+    # If a trail is given, the reduced domains are recorded in it (see CSP_solver.Trail)
+    # Returns False if a domain becomes empty, and True otherwise.
+    def propagate(self, domains: Dict[str, set], trail: Optional[List] = None, variables: Optional[Iterable[str]] = None) -> bool:
+        if variables is None:
+            queue = deque(range(len(self.arcs) + len(self.global_constraints)))
+        else:
+            queue = deque(dict.fromkeys(arc for variable in variables for arc in self.incoming.get(variable, [])))
+        queued = set(queue)
+        while queue:
+            arc = queue.popleft()
+            queued.discard(arc)
+            if arc >= len(self.arcs):
+                if not self.propagate_global(arc, domains, trail, queue, queued):
+                    return False
+                continue
+            variable, other_variable, _ = self.arcs[arc]
+            if variable not in domains or other_variable not in domains:
+                continue
+            domain = self.revise(arc, domains, trail)
+            if domain is None:
+                continue
+            if trail is not None:
+                trail.append((domains, variable, domains[variable]))
+            domains[variable] = domain
+            if not domain:
+                return False
+            # the arc (Y, X) of the same constraint is skipped since the removed values of X had no support in Y
+            for incoming in self.incoming.get(variable, []):
+                if incoming not in queued and incoming != self.reverse[arc]:
+                    queue.append(incoming)
+                    queued.add(incoming)
+        return True
+
+    # Propagate the "all different" constraint with the given index in the queue and add the arcs and the constraints to revise to the queue
+    # Returns False if the constraint can not be satisfied
+    def propagate_global(self, index: int, domains: Dict[str, set], trail: Optional[List], queue: deque, queued: set) -> bool:
+        reduced = self.global_constraints[index - len(self.arcs)].propagate(domains)
+        if reduced is None:
+            return False
+        for variable, domain in reduced.items():
+            if trail is not None:
+                trail.append((domains, variable, domains[variable]))
+            domains[variable] = domain
+            for incoming in self.incoming.get(variable, []):
+                if incoming not in queued and incoming != index:
+                    queue.append(incoming)
+                    queued.add(incoming)
+        return True
+
+class AC3(ArcConsistency):
+    def revise(self, arc: int, domains: Dict[str, set], trail: Optional[List]) -> Optional[set]:
+        variable, other_variable, condition = self.arcs[arc]
+        domain, other_domain = domains[variable], domains[other_variable]
+        supported = {value for value in domain if any(condition(value, other_value) for other_value in other_domain)}
+        return supported if len(supported) != len(domain) else None
+
+class AC2001(ArcConsistency):
+    values: Dict[str, List[Any]]    # The values of each variable sorted in ascending order
+    supports: List[Dict[Any, int]]  # For each arc, the position (in the sorted values) of the last support of every value (-1 if none yet)
+
+    # The values are taken from the domains of the problem (values that are not in them are never checked)
+    def __init__(self, problem: Problem) -> None:
+        super().__init__(problem)
+        self.values = {variable: sorted(domain) for variable, domain in problem.domains.items()}
+        self.supports = [{} for _ in self.arcs]
+
+    # The last supports only move forward while the domains shrink, so when the search backtracks and the domains are restored,
+    # the last supports must be restored too. So the changes of the last supports are recorded in the trail along with the domains.
+    def revise(self, arc: int, domains: Dict[str, set], trail: Optional[List]) -> Optional[set]:
+        variable, other_variable, condition = self.arcs[arc]
+        domain, other_domain = domains[variable], domains[other_variable]
+        other_values = self.values[other_variable]
+        supports = self.supports[arc]
+        removed = []
+        for value in domain:
+            last = supports.get(value, -1)
+            if last >= 0 and other_values[last] in other_domain:
+                continue
+            for position in range(last + 1, len(other_values)):
+                other_value = other_values[position]
+                if other_value in other_domain and condition(value, other_value):
+                    if trail is not None:
+                        trail.append((supports, value, last))
+                    supports[value] = position
+                    break
+            else:
+                removed.append(value)
+        return domain.difference(removed) if removed else None
+
+# The arc consistency algorithms by name (as selected by the "arc_consistency" argument of CSP_solver.solve)
+ALGORITHMS = {
+    "ac3": AC3,
+    "ac2001": AC2001,
+}
+
+# These functions apply arc consistency to the domains of the problem
+# They should be called after 1-Consistency since the unary constraints are not considered.
+# The functions return False if any domain becomes empty. Otherwise, they return True.
+def ac3(problem: Problem) -> bool:
+    return AC3(problem).propagate(problem.domains)
+
+def ac2001(problem: Problem) -> bool:
+    return AC2001(problem).propagate(problem.domains)
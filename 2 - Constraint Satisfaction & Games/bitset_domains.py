@@ -0,0 +1,133 @@
+from typing import Any, Callable, Dict, List, Tuple
+from CSP import Problem
+import operator
+
+# This file contains a bitset representation of the domains for the backtracking search (see CSP_solver.solve)
+# The values of every variable are sorted and numbered, so a domain is an integer mask where the bit i is set
+# if the value number i is in the domain. Since the masks are integers, a reduced domain is always a new object
+# and the trail of the solver can restore it without copying.
+# For every binary constraint, we also build support tables: the table of a variable in the constraint maps
+# each of its values to the mask of the values of the other variable that satisfy the constraint with it.
+# So forward checking is a single "and" per neighbour: new_domain = domain & table[value]
+# and the least restraining value heuristic counts the bits of: domain & ~table[value].
+# The mask of a value is only computed the first time it is needed, since most values are never assigned or ordered
+# (e.g. the auxiliary variables of a cryptarithmetic puzzle have hundreds of values but only a few of them remain when they are assigned).
+# The conditions are only called while computing the masks and the tables are shared between the constraints that have
+# the same condition and the same values (e.g. all the "!=" constraints of a sudoku share a single table).
+# The masks of the "!=" and "==" conditions (not_equal, operator.ne and operator.eq) are built directly without calling them.
+# An "all different" constraint gets the tables of a "!=" constraint between its variable and each of its other variables.
+
+# The condition of the pairs of variables in an "all different" constraint
+def not_equal(value1: Any, value2: Any) -> bool:
+    return value1 != value2
+
+# A support table maps the number of a value of the variable to the mask of the supported values of the other variable
+# It is a dictionary which computes the mask of a value the first time it is read
+class SupportTable(dict):
+    # condition: the condition of the constraint, which takes the value of the first variable of the constraint first
+    # is_first: whether the variable of the table is the first variable of the constraint
+    # values: the values of the variable (by number), other_bits: the number of each value of the other variable
+    def __init__(self, condition: Callable[[Any, Any], bool], is_first: bool, values: List[Any], other_bits: Dict[Any, int]) -> None:
+        super().__init__()
+        self.condition = condition
+        self.is_first = is_first
+        self.values = values
+        self.other_bits = other_bits
+
+    def __missing__(self, bit: int) -> int:
+        value, other_bits, condition = self.values[bit], self.other_bits, self.condition
+        if condition is not_equal or condition is operator.ne or condition is operator.eq:
+            equal = 1 << other_bits[value] if value in other_bits else 0
+            mask = equal if condition is operator.eq else ((1 << len(other_bits)) - 1) ^ equal
+        elif self.is_first:
+            mask = sum(1 << other_bit for other_value, other_bit in other_bits.items() if condition(value, other_value))
+        else:
+            mask = sum(1 << other_bit for other_value, other_bit in other_bits.items() if condition(other_value, value))
+        self[bit] = mask
+        return mask
+
+# Returns the number of values in a domain mask (int.bit_count is only available since python 3.10)
+if hasattr(int, "bit_count"):
+    count_values: Callable[[int], int] = int.bit_count
+else:
+    def count_values(mask: int) -> int:
+        return bin(mask).count("1")
+
+class BitsetDomains:
+    values: Dict[str, List[Any]]        # The values of each variable sorted in ascending order (the bit i is the value values[variable][i])
+    bits: Dict[str, Dict[Any, int]]     # The number of each value of each variable
+    neighbors: Dict[str, List[Tuple[str, SupportTable]]]    # The other variable and the support table of every binary constraint of a variable
+                                                            # (and of every pair of variables in its "all different" constraints)
+
+    # The values are taken from the domains of the problem so it should be created after 1-Consistency
+    def __init__(self, problem: Problem) -> None:
+        self.problem = problem
+        self.order = {variable: index for index, variable in enumerate(problem.variables)}
+        self.values = {variable: sorted(domain) for variable, domain in problem.domains.items()}
+        self.bits = {variable: {value: bit for bit, value in enumerate(values)} for variable, values in self.values.items()}
+        tables: Dict[Tuple[Callable, bool, Tuple[Any, ...], Tuple[Any, ...]], SupportTable] = {}
+        # Returns the (empty) support table of the variable for the condition (shared between the constraints with the same key)
+        def get_table(condition: Callable[[Any, Any], bool], variable: str, other_variable: str, is_first: bool) -> SupportTable:
+            key = (condition, is_first, tuple(self.values[variable]), tuple(self.values[other_variable]))
+            if key not in tables:
+                tables[key] = SupportTable(condition, is_first, self.values[variable], self.bits[other_variable])
+            return tables[key]
+        self.neighbors = {}
+        for variable in self.values:
+            neighbors = self.neighbors[variable] = []
+            for constraint, other_variable, is_first in problem.get_binary_constraints(variable):
+                # a variable without a domain can never be reduced (as in CSP_solver.forward_checking)
+                if other_variable not in self.values: continue
+                neighbors.append((other_variable, get_table(constraint.condition, variable, other_variable, is_first)))
+            for constraint in problem.get_all_different_constraints(variable):
+                for other_variable in constraint.variables:
+                    if other_variable == variable or other_variable not in self.values: continue
+                    neighbors.append((other_variable, get_table(not_equal, variable, other_variable, True)))
+
+    # Convert the domains from sets to masks
+    def encode(self, domains: Dict[str, set]) -> Dict[str, int]:
+        encoded = {}
+        for variable, domain in domains.items():
+            bits = self.bits[variable]
+            encoded[variable] = sum(1 << bits[value] for value in domain)
+        return encoded
+
+    # Convert a domain mask of the given variable to a list of values in ascending order
+    def decode(self, variable: str, mask: int) -> List[Any]:
+        return [value for bit, value in enumerate(self.values[variable]) if mask >> bit & 1]
+
+    # These are the versions of the functions in CSP_solver that work on the domain masks
+    # They follow exactly the same rules, so the search explores the same assignments in the same order.
+
+    # The variable with the minimum remaining values (ties are broken by the order of "problem.variables")
+    def minimum_remaining_values(self, domains: Dict[str, int]) -> str:
+        order = self.order
+        return min(domains, key=lambda variable: (count_values(domains[variable]), order[variable]))
+
+    # Forward checking: every unassigned neighbour keeps the values that are supported by the assigned value
+    # The previous masks of the reduced domains are recorded in the trail (see CSP_solver.Trail)
+    def forward_checking(self, assigned_variable: str, assigned_value: Any, domains: Dict[str, int], trail: List[Tuple[Dict[str, int], str, int]]) -> bool:
+        bit = self.bits[assigned_variable][assigned_value]
+        for other_variable, table in self.neighbors[assigned_variable]:
+            domain = domains.get(other_variable, 0)
+            if domain == 0:
+                continue
+            reduced = domain & table[bit]
+            if reduced != domain:
+                trail.append((domains, other_variable, domain))
+                domains[other_variable] = reduced
+                if reduced == 0:
+                    return False
+        return True
+
+    # The values of the variable sorted by the number of neighbours' values they rule out, then by the value itself
+    # (the assigned neighbours are skipped since they have no values to rule out)
+    def least_restraining_values(self, variable_to_assign: str, domains: Dict[str, int]) -> List[Any]:
+        neighbors = [(domains[other_variable], table) for other_variable, table in self.neighbors[variable_to_assign] if domains.get(other_variable, 0)]
+        counts = []
+        for bit, value in enumerate(self.values[variable_to_assign]):
+            if domains[variable_to_assign] >> bit & 1:
+                count = sum(count_values(domain & ~table[bit]) for domain, table in neighbors)
+                counts.append((count, value))
+        counts.sort()
+        return [value for _, value in counts]
@@ -1,6 +1,6 @@
 from typing import Tuple
 import re
-from CSP import Assignment, Problem, UnaryConstraint, BinaryConstraint
+from CSP import Assignment, Problem, UnaryConstraint, BinaryConstraint, AllDifferentConstraint
 
 #TODO (Optional): Import any builtin library or define any helper function you want to use
 
@@ -57,10 +57,8 @@ class CryptArithmeticProblem(Problem):
         # add unary constraints to the first characters to prevent zeros at the beginning
         problem.constraints = [ UnaryConstraint(first_letter, lambda x: x != 0) for first_letter in [LHS0[0], LHS1[0], RHS[0]] ]
 
-        # add binary constraints between all variables to make their values unique
-        for idx, variable in enumerate(problem.variables):
-            for other in range(idx + 1, len(problem.variables)):
-                problem.constraints.append(BinaryConstraint((variable, list(problem.variables)[other]), lambda x, y: x != y))
+        # add an "all different" constraint between all variables to make their values unique
+        problem.constraints.append(AllDifferentConstraint(list(problem.variables)))
 
         LHS0 = LHS0[::-1]
         LHS1 = LHS1[::-1]
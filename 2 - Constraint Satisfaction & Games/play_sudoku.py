@@ -52,6 +52,10 @@ def main(args: argparse.Namespace):
         solve_fn = solve_via_human
     elif agent_name == "backtrack":
         solve_fn = solve
+    elif agent_name == "bitset":
+        solve_fn = lambda problem: solve(problem, bitsets=True)
+    elif agent_name == "mac":
+        solve_fn = lambda problem: solve(problem, arc_consistency="ac2001")
     else:
         print(f"Unknown Agent: {agent_name}. Please select a valid agent.")
         return
@@ -79,7 +83,7 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Play Sudoku as Human or AI")
     parser.add_argument("puzzle", help="path to the puzzle to play")
     parser.add_argument("--agent", "-a", default="human",
-                        choices=['human', 'backtrack'],
+                        choices=['human', 'backtrack', 'bitset', 'mac'],
                         help="the agent that will play the game")
     
     args = parser.parse_args()